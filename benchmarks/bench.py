@@ -0,0 +1,341 @@
+"""End-to-end latency benchmarks of bwpyro launches
+
+Runs complete launches, from the process start to the chosen action,
+against stand-in executables and synthetic vaults, so that no desktop
+session or Bitwarden account is required. The fake Rofi always selects
+the first line it is given, and the action is chosen through --enter.
+
+    python benchmarks/bench.py --sizes 100,1000 --modes names,uris
+    python benchmarks/bench.py --concurrency 4 --latency bw=0.3
+    python benchmarks/bench.py --daemon --cold
+"""
+
+import os
+import sys
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import subprocess as sp
+
+from concurrent.futures import ThreadPoolExecutor
+
+import fakes
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = (100, 1000, 10000, 100000)
+MODES = ('names', 'uris', 'logins', 'folders')
+ACTIONS = ('copy', 'password', 'all', 'totp')
+
+# Remove every deliberate delay, leaving only the work done by bwpyro
+CONFIG = '''autotype:
+  start_delay: 0
+  tab_delay: 0
+security:
+  clear: -1
+  # Keep the session key of the user out of reach of the fakes
+  keyring: keyctl
+'''
+
+DAEMON_TIMEOUT = 30
+
+
+class Scenario:
+    """Environment shared by all launches against a single vault"""
+
+    def __init__(self, workdir, size, latency):
+        self.size = size
+        self.home = os.path.join(workdir, f'home-{size}')
+        self.state = os.path.join(self.home, 'state')
+        self.config = os.path.join(self.home, 'config')
+        self.socket = os.path.join(self.home, 'run', 'bwpyro.sock')
+        self.daemon = None
+
+        vault = os.path.join(workdir, f'vault-{size}')
+        fakes.write_vault(vault, size)
+
+        for path in (self.state, os.path.dirname(self.socket)):
+            os.makedirs(path, mode=0o700, exist_ok=True)
+        with open(self.config, 'w', encoding='utf-8') as file:
+            file.write(CONFIG)
+
+        bin_path = os.path.join(workdir, 'bin')
+        self.env = dict(
+            os.environ,
+            PATH=f"{bin_path}:{os.environ.get('PATH', '')}",
+            PYTHONPATH=ROOT,
+            HOME=self.home,
+            XDG_RUNTIME_DIR=os.path.dirname(self.socket),
+            XDG_SESSION_TYPE='x11',
+            DISPLAY=':0',
+            BENCH_VAULT=vault,
+            BENCH_STATE=self.state,
+            BENCH_LOG=os.devnull,
+        )
+        for tool, seconds in latency.items():
+            name = tool.upper().replace('-', '_')
+            self.env[f'BENCH_LATENCY_{name}'] = str(seconds)
+
+    def argv(self, mode, action):
+        """Return the arguments of a single launch"""
+
+        argv = ['--config', self.config, '-w', mode, '-e', action]
+        if self.daemon is None:
+            argv.append('--no-daemon')
+        return argv
+
+    def clear_cache(self):
+        """Delete the item cache, forcing the next launch to query bw"""
+
+        shutil.rmtree(os.path.join(self.home, '.cache'), ignore_errors=True)
+
+    def start_daemon(self, log):
+        """Start a daemon and wait until it accepts connections"""
+
+        env = dict(self.env, BENCH_LOG=log)
+        self.daemon = sp.Popen(
+            [sys.executable, '-m', 'bitwarden_pyro', '--daemon',
+             '--config', self.config],
+            env=env, stdin=sp.DEVNULL, stdout=sp.DEVNULL, stderr=sp.DEVNULL
+        )
+
+        deadline = time.monotonic() + DAEMON_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.daemon.poll() is not None:
+                raise BenchmarkException("Daemon exited during startup")
+            try:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.connect(self.socket)
+                    return
+            except OSError:
+                time.sleep(0.05)
+
+        raise BenchmarkException("Daemon did not start in time")
+
+    def stop_daemon(self):
+        """Stop the daemon and return its peak RSS in kilobytes"""
+
+        if self.daemon is None:
+            return None
+
+        peak = read_peak_rss(self.daemon.pid)
+        self.daemon.terminate()
+        self.daemon.wait()
+        self.daemon = None
+        return peak
+
+
+def read_peak_rss(pid):
+    """Return the peak RSS of a running process in kilobytes"""
+
+    try:
+        with open(f'/proc/{pid}/status', encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (IOError, ValueError):
+        pass
+    return None
+
+
+def count_lines(path):
+    """Return the number of lines in a file, which may not exist"""
+
+    try:
+        with open(path, encoding='utf-8') as file:
+            return sum(1 for _ in file)
+    except IOError:
+        return 0
+
+
+def launch(scenario, argv, log):
+    """Run a single launch, returning its status, duration, peak RSS
+    and the number of child processes it spawned"""
+
+    env = dict(scenario.env, BENCH_LOG=log)
+    cmd = [sys.executable, '-m', 'bitwarden_pyro', *argv]
+
+    start = time.perf_counter()
+    proc = sp.Popen(cmd, env=env, stdin=sp.DEVNULL,
+                    stdout=sp.DEVNULL, stderr=sp.DEVNULL)
+    # Unlike Popen.wait, wait4 reports the resources used by this child
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    return proc.returncode, elapsed, usage.ru_maxrss, count_lines(log)
+
+
+def percentile(values, fraction):
+    """Return a percentile using the nearest-rank method"""
+
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1,
+                      round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def run_case(scenario, mode, action, args, logdir):
+    """Run all iterations of a single mode and action"""
+
+    argv = scenario.argv(mode, action)
+    daemon_log = os.path.join(logdir, 'daemon.log')
+    times, rss, children, failures = [], [], [], 0
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for iteration in range(args.warmup + args.iterations):
+            if args.cold:
+                scenario.clear_cache()
+
+            logs = [os.path.join(logdir, f'{iteration}-{i}.log')
+                    for i in range(args.concurrency)]
+            daemon_start = count_lines(daemon_log)
+
+            results = list(executor.map(
+                lambda log: launch(scenario, argv, log), logs
+            ))
+            for log in logs:
+                if os.path.exists(log):
+                    os.unlink(log)
+            if iteration < args.warmup:
+                continue
+
+            spawned = sum(r[3] for r in results) \
+                + count_lines(daemon_log) - daemon_start
+            children.append(spawned / args.concurrency)
+
+            for status, elapsed, peak, _ in results:
+                if status != 0:
+                    failures += 1
+                times.append(elapsed * 1000)
+                rss.append(peak)
+
+    return {
+        'p50': percentile(times, 0.5),
+        'p95': percentile(times, 0.95),
+        'children': sum(children) / len(children),
+        'rss': max(rss) / 1024,
+        'failures': failures,
+    }
+
+
+def parse_latency(value):
+    """Parse latencies in the form tool=seconds,tool=seconds"""
+
+    latency = {}
+    for pair in filter(None, value.split(',')):
+        tool, _, seconds = pair.partition('=')
+        if tool not in fakes.TOOLS:
+            raise argparse.ArgumentTypeError(f"Unknown tool '{tool}'")
+        latency[tool] = float(seconds)
+    return latency
+
+
+def parse_list(choices, convert=str):
+    """Return an argparse type parsing comma separated values"""
+
+    def parse(value):
+        values = [convert(v) for v in value.split(',') if v]
+        for item in values:
+            if item not in choices:
+                raise argparse.ArgumentTypeError(f"Invalid choice '{item}'")
+        return values
+    return parse
+
+
+def parse_arguments():
+    """Parse command line arguments using argparse"""
+
+    parser = argparse.ArgumentParser(
+        description="Measure end-to-end launches against fake executables"
+    )
+    parser.add_argument(
+        '--sizes', type=parse_list(SIZES, int), default=list(SIZES[:3]),
+        help="comma separated vault sizes (default: 100,1000,10000)"
+    )
+    parser.add_argument(
+        '--modes', type=parse_list(MODES), default=list(MODES),
+        help="comma separated window modes (default: all)"
+    )
+    parser.add_argument(
+        '--actions', type=parse_list(ACTIONS), default=list(ACTIONS),
+        help="comma separated actions (default: all)"
+    )
+    parser.add_argument(
+        '-n', '--iterations', type=int, default=10,
+        help="measured launches per case (default: 10)"
+    )
+    parser.add_argument(
+        '--warmup', type=int, default=1,
+        help="unmeasured launches per case (default: 1)"
+    )
+    parser.add_argument(
+        '--concurrency', type=int, default=1,
+        help="launches started at the same time, like repeated "
+        "hotkey presses (default: 1)"
+    )
+    parser.add_argument(
+        '--latency', type=parse_latency, default={},
+        help="added latency in seconds, e.g. bw=0.3,rofi=0.05"
+    )
+    parser.add_argument(
+        '--cold', action='store_true',
+        help="delete the item cache before every launch"
+    )
+    parser.add_argument(
+        '--daemon', action='store_true',
+        help="send launches to a daemon started for every vault size"
+    )
+    parser.add_argument(
+        '--workdir',
+        default=os.path.join(tempfile.gettempdir(), 'bwpyro-bench'),
+        help="directory holding the generated vaults and fakes"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Run every requested case and print a table of the results"""
+
+    args = parse_arguments()
+    fakes.write_executables(os.path.join(args.workdir, 'bin'))
+
+    header = f"{'items':>7} {'mode':<8} {'action':<8} {'p50 ms':>9} " \
+        f"{'p95 ms':>9} {'children':>8} {'rss MB':>7} {'failed':>6}"
+    print(header)
+    print('-' * len(header))
+
+    for size in args.sizes:
+        scenario = Scenario(args.workdir, size, args.latency)
+        logdir = tempfile.mkdtemp(prefix='logs-', dir=args.workdir)
+
+        try:
+            if args.daemon:
+                scenario.start_daemon(os.path.join(logdir, 'daemon.log'))
+
+            for mode in args.modes:
+                for action in args.actions:
+                    result = run_case(scenario, mode, action, args, logdir)
+                    print(
+                        f"{size:>7} {mode:<8} {action:<8} "
+                        f"{result['p50']:>9.1f} {result['p95']:>9.1f} "
+                        f"{result['children']:>8.1f} "
+                        f"{result['rss']:>7.1f} {result['failures']:>6}",
+                        flush=True
+                    )
+        finally:
+            peak = scenario.stop_daemon()
+            if peak is not None:
+                print(f"{size:>7} daemon peak RSS: {peak / 1024:.1f} MB")
+            shutil.rmtree(logdir, ignore_errors=True)
+
+
+class BenchmarkException(Exception):
+    """Raised when the benchmark environment could not be set up"""
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Stand-in executables and synthetic vaults used by the benchmarks
+
+Every fake is a small shell script that appends its name to the file in
+$BENCH_LOG, optionally sleeps for $BENCH_LATENCY_<TOOL> seconds, and
+answers just enough of the real tool's interface for bwpyro to work.
+"""
+
+import os
+import json
+import random
+import stat
+
+
+FOLDERS = 8
+
+# Tools accepting an optional latency, as they are named in the
+# BENCH_LATENCY_<TOOL> environment variables
+TOOLS = ('bw', 'rofi', 'keyctl', 'xclip', 'wl-copy', 'wl-paste', 'xdotool',
+         'ydotool', 'notify-send', 'slop', 'wmctrl', 'echo', 'sudo')
+
+_PREAMBLE = '''#!/bin/sh
+echo "{name}" >> "$BENCH_LOG"
+if [ "${{{latency}:-0}}" != 0 ]; then sleep "${{{latency}}}"; fi
+'''
+
+_SCRIPTS = {
+    'bw': '''
+case "$1 $2" in
+    "list items") cat "$BENCH_VAULT/items.json" ;;
+    "list folders") cat "$BENCH_VAULT/folders.json" ;;
+    "get item") sed "s/@ID@/$3/" "$BENCH_VAULT/item.json" ;;
+    "get totp") printf '123456' ;;
+    "sync "*) echo "Syncing complete." ;;
+    "lock "*) echo "Your vault is locked." ;;
+    "unlock "*) printf 'Your vault is now unlocked!\\n\\nTo unlock\\n$ export BW_SESSION="YmVuY2htYXJr=="\\n' ;;
+    *) exit 1 ;;
+esac
+''',
+    'rofi': '''
+for arg in "$@"; do
+    case "$arg" in
+        -password) echo "password"; exit 0 ;;
+        -e) exit 0 ;;
+    esac
+done
+IFS= read -r line
+cat > /dev/null
+echo "$line"
+exit "${BENCH_ROFI_CODE:-0}"
+''',
+    'keyctl': '''
+# Keys are identified by their names, which are valid file names
+case "$1" in
+    request) [ -f "$BENCH_STATE/key-$3" ] || exit 1; echo "$3" ;;
+    pipe) cat "$BENCH_STATE/key-$2" ;;
+    padd) cat > "$BENCH_STATE/key-$3"; echo "$3" ;;
+    purge) rm -f "$BENCH_STATE/key-$3" ;;
+esac
+''',
+    'echo': '''
+printf '%s\\n' "$*"
+''',
+    'sudo': '''
+exec "$@"
+''',
+}
+
+# Tools that only need to consume their input
+_SINK = '''
+[ -t 0 ] || cat > /dev/null
+'''
+
+
+def write_executables(directory):
+    """Write all fake executables to a directory, which is added to PATH"""
+
+    os.makedirs(directory, exist_ok=True)
+    for name in TOOLS:
+        latency = 'BENCH_LATENCY_' + name.upper().replace('-', '_')
+        script = _PREAMBLE.format(name=name, latency=latency) \
+            + _SCRIPTS.get(name, _SINK)
+
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(script)
+        os.chmod(path, stat.S_IRWXU)
+
+
+def _item(index, folders, rng):
+    # Roughly one in ten names is shared, producing item groups
+    name = f"site-{rng.randrange(index + 1) if index % 10 == 0 else index}"
+    return {
+        'object': 'item',
+        'id': f'00000000-0000-0000-0000-{index:012d}',
+        'organizationId': None,
+        'folderId': rng.choice(folders)['id'] if index % 3 else None,
+        'type': 1,
+        'name': name,
+        'notes': 'Lorem ipsum dolor sit amet ' * 4,
+        'favorite': False,
+        'fields': [{'name': 'pin', 'value': '1234', 'type': 1}],
+        'login': {
+            'uris': [
+                {'match': None, 'uri': f'https://{name}.example.com/login'},
+                {'match': None, 'uri': f'https://auth.{name}.example.org/'},
+            ],
+            'username': f'user{index}@example.com',
+            'password': 'hunter2',
+            'totp': 'JBSWY3DPEHPK3PXP' if index % 5 == 0 else None,
+            'passwordRevisionDate': None
+        },
+        'collectionIds': [],
+        'revisionDate': '2020-01-01T00:00:00.000Z'
+    }
+
+
+def write_vault(directory, size, seed=0):
+    """Write a synthetic vault with the given number of items"""
+
+    if os.path.isfile(os.path.join(directory, 'items.json')):
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+
+    folders = [
+        {'object': 'folder', 'id': f'folder-{i}', 'name': f'Folder {i}'}
+        for i in range(FOLDERS)
+    ]
+    items = [_item(i, folders, rng) for i in range(size)]
+
+    path = os.path.join(directory, 'items.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(items, file)
+
+    folders.append({'object': 'folder', 'id': None, 'name': 'No Folder'})
+    path = os.path.join(directory, 'folders.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(folders, file)
+
+    # Template answered by 'bw get item', with the id filled in by sed
+    template = dict(items[0], id='@ID@')
+    path = os.path.join(directory, 'item.json')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(template, file)
@@ -1,4 +1,4 @@
-from bitwarden_pyro import bwpyro
+from bitwarden_pyro import client
 
 if __name__ == "__main__":
-    bwpyro.run()
+    client.run()
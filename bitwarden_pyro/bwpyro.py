@@ -1,4 +1,4 @@
-from time import sleep
+from time import sleep, perf_counter
 
 import re
 import sys
@@ -7,17 +7,13 @@ import logging
 from bitwarden_pyro.util.logger import ProjectLogger
 from bitwarden_pyro.util.arguments import parse_arguments
 from bitwarden_pyro.settings import NAME, VERSION
-from bitwarden_pyro.view.rofi import Rofi
-from bitwarden_pyro.controller.session import Session, SessionException
-from bitwarden_pyro.controller.autotype import AutoType, AutoTypeException
-from bitwarden_pyro.controller.clipboard import Clipboard, ClipboardException
-from bitwarden_pyro.controller.vault import Vault, VaultException
 from bitwarden_pyro.model.actions import ItemActions, WindowActions
 from bitwarden_pyro.util.formatter import ItemFormatter, create_converter
-from bitwarden_pyro.util.notify import Notify
-from bitwarden_pyro.util.config import ConfigLoader, ConfigException
-from bitwarden_pyro.controller.cache import CacheException
-from bitwarden_pyro.controller.focus import Focus, FocusException
+from bitwarden_pyro.util.trace import Tracer, TraceException
+from bitwarden_pyro.util.ipc import DaemonClient, IpcException
+
+# Controllers are imported by the methods using them, so that every
+# startup path only pays for the modules it needs.
 
 
 class FlowException(Exception):
@@ -29,34 +25,133 @@ class BwPyro:
     Start and control the execution of the program
     """
 
-    def __init__(self):
+    def __init__(self, argv=None, resident=False):
         self._rofi = None
-        self._session = None
+        self._sessions = None
+        self._accounts = None
         self._vault = None
         self._clipboard = None
         self._autotype = None
         self._notify = None
         self._config = None
         self._focus = None
-        self._args = parse_arguments()
+        self._refresher = None
+        # Whether the instance is kept in memory by the daemon
+        self._resident = resident
+        self._argv = argv if argv is not None else sys.argv[1:]
+        self._args = parse_arguments(self._argv)
         self._logger = ProjectLogger(
-            self._args.verbose, not self._args.no_logging
+            self._args.verbose, not self._args.no_logging,
+            self._args.log_format
         ).get_logger()
 
     def start(self):
         """Start the execution of the program"""
 
-        if self._args.version:
+        tracer = Tracer()
+        if self._args.trace is not None:
+            tracer.enable()
+
+        profiler = None
+        if self._args.profile is not None:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            with tracer.span('launch'):
+                self.__dispatch()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.__save_profile(profiler)
+            if self._args.trace is not None:
+                self.__save_trace(tracer)
+
+    def __dispatch(self):
+        if self._args.startup_report:
+            from bitwarden_pyro.util import startup
+            sys.exit(startup.report(self._argv))
+        elif self._args.version:
             print(f"{NAME} v{VERSION}")
             sys.exit()
         elif self._args.lock:
             self.__lock()
         elif self._args.dump_config:
             self.__dump_config()
+        elif self._args.daemon:
+            self.__daemon()
         else:
             self.__launch_ui()
 
+    def __save_profile(self, profiler):
+        try:
+            profiler.dump_stats(self._args.profile)
+            self._logger.info("Saved profile to %s", self._args.profile)
+        except IOError:
+            self._logger.exception("Failed to save profile")
+
+    def __save_trace(self, tracer):
+        try:
+            tracer.save(self._args.trace)
+        except TraceException:
+            self._logger.exception("Failed to save trace")
+
+    def preload(self):
+        """Initialise the interface and load items without prompting"""
+
+        from bitwarden_pyro.controller.session import SessionException
+        from bitwarden_pyro.controller.vault import VaultException
+
+        self.__init_ui()
+
+        try:
+            if all(session.has_key() for session in self._sessions):
+                for session in self._sessions:
+                    self._vault.set_key(session.get_key(), session.account)
+                self._vault.load_items()
+                self.__revalidate()
+        except (SessionException, VaultException):
+            self._logger.warning("Failed to preload vault items")
+
+    def close(self):
+        """Release resources held by the vault"""
+
+        if self._vault is not None:
+            self._vault.close()
+
+    def get_timeout(self):
+        """Return the session timeout, or None if not initialised"""
+
+        if self._config is None:
+            return None
+
+        return self._config.get_int('security.timeout')
+
+    def __daemon(self):
+        from bitwarden_pyro.controller.daemon import Daemon, DaemonException
+        from bitwarden_pyro.controller.clear import ClearScheduler
+
+        # Launches served by the daemon leave pending clipboard clears to
+        # its timer, instead of starting a helper process for every copy
+        scheduler = ClearScheduler()
+        scheduler.set_resident()
+
+        argv = [a for a in self._argv if a != '--daemon']
+        try:
+            daemon = Daemon(
+                lambda a: BwPyro(['--no-daemon'] + a, resident=True)
+            )
+            daemon.start(argv)
+        except DaemonException:
+            self._logger.exception("Failed to start daemon")
+            sys.exit(1)
+        finally:
+            scheduler.flush()
+
     def __dump_config(self):
+        from bitwarden_pyro.util.config import ConfigLoader, ConfigException
+
         try:
             self._logger.setLevel(logging.ERROR)
             self._config = ConfigLoader(self._args)
@@ -66,32 +161,89 @@ class BwPyro:
             self._logger.exception("Failed to dump config")
 
     def __lock(self):
+        from bitwarden_pyro.controller.session import Session, SessionException
+        from bitwarden_pyro.util.config import ConfigLoader, ConfigException
+        from bitwarden_pyro.view.rofi import Rofi
+
         try:
             self._logger.info("Locking vault and deleting session")
-            self._session = Session()
-            self._session.lock()
-        except SessionException:
+            self.__drop_daemon()
+            # Every account is locked, with the keyring of the config
+            self._config = ConfigLoader(self._args)
+            accounts = self._config.get_accounts('vault.accounts') or [None]
+            for account in accounts:
+                Session(backend=self._config.get('security.keyring'),
+                        account=account).lock()
+        except (SessionException, ConfigException):
             self._logger.exception("Failed to lock session")
             self._rofi = Rofi(None, None, None)
             self._rofi.show_error("Failed to lock and delete session")
 
+    def __drop_daemon(self):
+        """Make a running daemon forget its in-memory state"""
+
+        if self._args.no_daemon:
+            return
+
+        try:
+            DaemonClient().request('drop')
+            self._logger.debug("Dropped in-memory state of the daemon")
+        except IpcException:
+            self._logger.debug("No daemon is running")
+
     def __unlock(self, force=False):
-        self._logger.info("Unlocking bitwarden vault")
-        if force or not self._session.has_key():
-            pwd = self._rofi.get_password()
-            if pwd is not None:
-                self._session.unlock(pwd)
-            else:
-                self._logger.info("Unlocking aborted")
-                sys.exit(0)
+        with Tracer().span('session'):
+            self.__unlock_session(force)
+
+    def __unlock_session(self, force):
+        from concurrent.futures import ThreadPoolExecutor
 
-        k = self._session.get_key()
-        self._vault.set_key(k)
+        self._logger.info("Unlocking bitwarden vault")
+        # Passwords of all locked accounts are asked for first, so that
+        # the accounts are then unlocked at the same time
+        unlocks = []
+        for session in self._sessions:
+            if force or not session.has_key():
+                prompt = "Master Password" if session.account is None \
+                    else f"Master Password ({session.account})"
+                pwd = self._rofi.get_password(prompt)
+                if pwd is None:
+                    self._logger.info("Unlocking aborted")
+                    sys.exit(0)
+                unlocks.append((session, pwd))
+
+        if len(unlocks) == 1:
+            unlocks[0][0].unlock(unlocks[0][1])
+        elif unlocks:
+            with ThreadPoolExecutor(max_workers=len(unlocks)) as executor:
+                futures = [executor.submit(session.unlock, pwd)
+                           for session, pwd in unlocks]
+                for future in futures:
+                    future.result()
+
+        for session in self._sessions:
+            self._vault.set_key(session.get_key(), session.account)
+
+    def __prefetch(self, get_item, positions):
+        """Fetch the items at the top of a menu while Rofi is open, given
+        their positions in the order they are listed"""
+
+        if positions:
+            self._vault.prefetch([get_item(p) for p in positions])
 
     def __show_items(self, prompt):
-        items = self._vault.get_items()
         # Convert items to \n separated strings
-        formatted = ItemFormatter.unique_format(items)
+        _, formatted, top = self._vault.get_menu(
+            WindowActions.NAMES,
+            lambda _: (
+                self._vault.get_group_heads(),
+                ItemFormatter.grouped_format(self._vault.get_groups())
+            ),
+            self._config.get_int('vault.prefetch')
+        )
+        # Groups are prefetched by the first item sharing their name
+        self.__prefetch(self._vault.get_at, top)
+
         selected_name, event = self._rofi.show_items(formatted, prompt)
         self._logger.debug("User selected login: %s", selected_name)
 
@@ -101,8 +253,7 @@ class BwPyro:
             return (None, None)
         # Make sure that the group item isn't a single item where
         # the deduplication marker coincides
-        if selected_name.startswith(ItemFormatter.DEDUP_MARKER) and \
-                len(self._vault.get_by_name(selected_name)) == 0:
+        if self._vault.is_group(selected_name):
             self._logger.debug("User selected item group")
             group_name = selected_name[len(ItemFormatter.DEDUP_MARKER):]
             selected_items = self._vault.get_by_name(group_name)
@@ -118,12 +269,26 @@ class BwPyro:
         return (event, selected_item)
 
     def __show_indexed_items(self, prompt, items=None, fields=None,
-                             ignore=None):
+                             ignore=None, mode=None):
+        converter = create_converter(fields, ignore)
+        count = self._config.get_int('vault.prefetch')
         if items is None:
-            items = self._vault.get_items()
+            # Menus of all items are rendered once per mode and filter
+            positions, formatted, top = self._vault.get_menu(
+                mode, lambda i: ItemFormatter.group_format(i, converter),
+                count
+            )
+            get_item = self._vault.get_at
+        else:
+            # Items sorted by usage are listed in their order
+            items = self._vault.sort_by_usage(items)
+            positions, formatted = ItemFormatter.group_format(
+                items, converter
+            )
+            get_item = items.__getitem__
+            top = positions[:max(count, 0)]
 
-        converter = create_converter(fields, ignore)
-        indexed, formatted = ItemFormatter.group_format(items, converter)
+        self.__prefetch(get_item, top)
         selected_name, event = self._rofi.show_items(formatted, prompt)
 
         # Rofi has been closed
@@ -135,12 +300,13 @@ class BwPyro:
         regex = r"^#([0-9]+): .*"
         match = re.search(regex, selected_name)
         selected_index = int(match.group(1)) - 1
-        selected_item = indexed[selected_index]
+        selected_item = get_item(positions[selected_index])
         return (event, selected_item)
 
     def __show_folders(self, prompt):
         items = self._vault.get_folders()
-        formatted = ItemFormatter.unique_format(items)
+        with Tracer().span('format', mode='folders'):
+            formatted = ItemFormatter.unique_format(items)
         selected_name, event = self._rofi.show_items(formatted, prompt)
         self._logger.info("User selected folder: %s", selected_name)
 
@@ -148,7 +314,7 @@ class BwPyro:
             self._logger.debug("Folder selection has been aborted")
             return (None, None)
 
-        folder = [i for i in items if i['name'] == selected_name][0]
+        folder = self._vault.get_folder(selected_name)
 
         if folder['name'] == 'No Folder':
             self._logger.debug("Clearing vault folder filter")
@@ -162,9 +328,12 @@ class BwPyro:
         return (event, None)
 
     def __load_items(self, use_cache=True):
+        from bitwarden_pyro.controller.vault import VaultException
+
         try:
             # First attempt at loading items
-            self._vault.load_items(use_cache)
+            with Tracer().span('load items'):
+                self._vault.load_items(use_cache)
         except VaultException:
             self._logger.warning(
                 "First attempt at loading vault items failed"
@@ -173,6 +342,42 @@ class BwPyro:
             self.__unlock(force=True)
             self._vault.load_items(use_cache)
 
+    def __is_revalidating(self):
+        """Returns true if expired items are shown while they are refreshed
+        in the background"""
+
+        expiry = self._config.get_int('security.cache')
+        return 0 < expiry < self._config.get_int('security.max_staleness')
+
+    def __revalidate(self, accounts=None):
+        """Sync and reload the items of some accounts in the background,
+        by default those whose items were read from an expired cache"""
+
+        if accounts is None:
+            accounts = self._vault.get_stale_accounts()
+        if not accounts:
+            return
+
+        from bitwarden_pyro.controller.refresh import Refresher
+        from bitwarden_pyro.model.account import Account
+
+        if self._refresher is None:
+            self._refresher = Refresher(self._config.get_int('security.cache'))
+
+        known = {account.name: account
+                 for account in self._accounts or [Account()]}
+        self._refresher.start([
+            (known[session.account], session.get_key())
+            for session in self._sessions if session.account in accounts
+        ])
+
+    def __reload_refreshed(self):
+        """Read the items written by a finished background refresh"""
+
+        if self._refresher is not None and self._refresher.has_finished():
+            self._logger.info("Reading items refreshed in the background")
+            self.__load_items()
+
     def __set_keybinds(self):
         keybinds = {
             'type_password': ItemActions.PASSWORD,
@@ -194,33 +399,153 @@ class BwPyro:
             )
 
     def __init_ui(self):
-        try:
-            self._config = ConfigLoader(self._args)
-            self._session = Session(
-                self._config.get_int('security.timeout'))
-            self._rofi = Rofi(self._args.rofi_args,
-                              self._config.get_itemaction('keyboard.enter'),
-                              self._config.get_boolean('interface.hide_mesg'))
-            self._clipboard = Clipboard(
-                self._config.get_int('security.clear'))
-            self._autotype = AutoType()
-            self._vault = Vault(self._config.get_int('security.cache'))
-            self._notify = Notify()
-            self._focus = Focus(
-                self._config.get_boolean('autotype.select_window'),
-                self._config.get('autotype.slop_args')
-            )
+        from concurrent.futures import ThreadPoolExecutor
+        from bitwarden_pyro.controller.session import SessionException
+        from bitwarden_pyro.controller.autotype import AutoTypeException
+        from bitwarden_pyro.controller.clipboard import ClipboardException
+        from bitwarden_pyro.controller.vault import VaultException
+        from bitwarden_pyro.controller.transport import TransportException
+        from bitwarden_pyro.controller.cache import CacheException
+        from bitwarden_pyro.util.config import ConfigLoader, ConfigException
+        from bitwarden_pyro.util.memory import freeze_heap
+        from bitwarden_pyro.controller.totp import TotpStore
 
+        try:
+            start = perf_counter()
+            with Tracer().span('config'):
+                self._config = ConfigLoader(self._args)
+            config_time = perf_counter() - start
+            self._accounts = self._config.get_accounts('vault.accounts')
+
+            # Everything else only depends on the config, so the session
+            # key, the cached items and the executables are all looked up
+            # at the same time, joining before any Rofi window is shown
+            stages = {
+                'session': self.__init_session,
+                'vault': self.__init_vault,
+                'tools': self.__init_tools
+            }
+            with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+                futures = [executor.submit(self.__run_stage, name, stage)
+                           for name, stage in stages.items()]
+                durations = dict(f.result() for f in futures)
+
+            self.__log_critical_path(config_time, durations)
             self.__set_keybinds()
+            totp_timeout = self._config.get_int('security.totp_timeout')
+            self._vault.set_totp(
+                {session.account: TotpStore.for_session(session, totp_timeout)
+                 for session in self._sessions},
+                self._config.get_int('security.totp_min_validity')
+            )
+            # Everything loaded so far lives as long as the process, unless
+            # the daemon drops the instance, whose objects must be freed
+            if not self._resident:
+                freeze_heap()
         except (ClipboardException, AutoTypeException, CacheException,
-                SessionException, VaultException, ConfigException):
+                SessionException, VaultException, ConfigException,
+                TransportException):
             self._logger.exception("Failed to initialise application")
             sys.exit(1)
 
-    def __display_windows(self):
-        action = self._config.get_windowaction('interface.window_mode')
+    @staticmethod
+    def __run_stage(name, stage):
+        start = perf_counter()
+        with Tracer().span(name):
+            stage()
+        return name, perf_counter() - start
+
+    def __log_critical_path(self, config_time, durations):
+        slowest = max(durations, key=durations.get)
+        others = ", ".join(
+            f"{name} {duration * 1000:.1f} ms"
+            for name, duration in durations.items() if name != slowest
+        )
+        self._logger.info(
+            "Startup critical path: config %.1f ms -> %s %.1f ms (%s)",
+            config_time * 1000, slowest, durations[slowest] * 1000, others,
+            extra={'event': {
+                'type': 'startup',
+                'config_ms': round(config_time * 1000, 3),
+                'stages_ms': {name: round(duration * 1000, 3)
+                              for name, duration in durations.items()},
+                'critical': slowest
+            }}
+        )
+
+    def __init_session(self):
+        from bitwarden_pyro.controller.session import (
+            Session, KeyReadException
+        )
+
+        # Every account has its own session key
+        self._sessions = [
+            Session(self._config.get_int('security.timeout'),
+                    self._config.get('security.keyring'), account)
+            for account in self._accounts or [None]
+        ]
+
+        # Retrieve the keys ahead of time, leaving any prompting to __unlock
+        for session in self._sessions:
+            try:
+                if session.has_key():
+                    session.get_key()
+            except KeyReadException:
+                self._logger.debug(
+                    "Failed to retrieve session key in advance"
+                )
+
+    def __init_vault(self):
+        from bitwarden_pyro.controller.vault import Vault, VaultException
+
+        # A single bw serve can only hold the session of one account. The
+        # server is only started by resident instances, as launches exit
+        # before it would pay for its startup
+        transport = None
+        if self._config.get_boolean('vault.serve') and not self._accounts:
+            from bitwarden_pyro.controller.serve import ServeTransport
+            transport = ServeTransport(
+                self._config.get('vault.serve_address'),
+                autostart=self._resident
+            )
+        self._vault = Vault(self._config.get_int('security.cache'),
+                            transport,
+                            self._config.get_boolean('interface.frecency'),
+                            self._accounts,
+                            self._config.get_int('security.max_staleness'))
+
+        # Cached items can be read and indexed without the session key
+        if self._vault.has_cache():
+            try:
+                with Tracer().span('load items'):
+                    self._vault.load_items()
+            except VaultException:
+                self._logger.debug("Failed to load cached items in advance")
+
+    def __init_tools(self):
+        from bitwarden_pyro.view.rofi import Rofi
+        from bitwarden_pyro.controller.autotype import AutoType
+        from bitwarden_pyro.controller.clipboard import Clipboard
+        from bitwarden_pyro.controller.focus import Focus
+        from bitwarden_pyro.util.notify import Notify
+
+        self._rofi = Rofi(self._args.rofi_args,
+                          self._config.get_itemaction('keyboard.enter'),
+                          self._config.get_boolean('interface.hide_mesg'))
+        self._clipboard = Clipboard(self._config.get_int('security.clear'))
+        self._autotype = AutoType()
+        self._notify = Notify()
+        self._focus = Focus(
+            self._config.get_boolean('autotype.select_window'),
+            self._config.get('autotype.slop_args')
+        )
+
+    def __display_windows(self, action=None, item=None):
+        if action is None:
+            action = self._config.get_windowaction('interface.window_mode')
         while action is not None and isinstance(action, WindowActions):
             self._logger.info("Switch window mode to %s", action)
+            self.__reload_refreshed()
 
             prompt = 'Bitwarden'
             if self._vault.has_filter():
@@ -234,23 +559,32 @@ class BwPyro:
                 action, item = self.__show_indexed_items(
                     prompt=item[0]['name'],
                     items=item,
-                    fields=['login.username']
+                    fields=self.__tagged(['login.username'])
                 )
             elif action == WindowActions.URIS:
                 action, item = self.__show_indexed_items(
                     prompt=prompt,
-                    fields=['login.uris.uri'],
-                    ignore=['http://', 'https://', 'None']
+                    fields=self.__tagged(['login.uris.uri']),
+                    ignore=['http://', 'https://', 'None'],
+                    mode=action
                 )
 
             elif action == WindowActions.LOGINS:
                 action, item = self.__show_indexed_items(
                     prompt=prompt,
-                    fields=['name', 'login.username']
+                    fields=self.__tagged(['name', 'login.username']),
+                    mode=action
                 )
             elif action == WindowActions.SYNC:
-                self._vault.sync()
-                self.__load_items(use_cache=False)
+                if self.__is_revalidating():
+                    # The current items stay listed until the sync is done
+                    self.__revalidate(self._vault.get_accounts())
+                    self._notify.send(
+                        message="Syncing Bitwarden in the background"
+                    )
+                else:
+                    self._vault.sync()
+                    self.__load_items(use_cache=False)
                 action, item = self.__show_items(
                     prompt=prompt
                 )
@@ -261,7 +595,70 @@ class BwPyro:
 
         return action, item
 
+    def __tagged(self, fields):
+        """Add the account to the fields listed for items when the items of
+        several accounts are merged"""
+
+        if len(self._vault.get_accounts()) > 1:
+            return [*fields, 'account']
+
+        return fields
+
+    def __adapt_enter(self, action, item):
+        """Return the action Enter runs on an item, adapted to the action
+        used most on it when adaptive_enter is enabled"""
+
+        if self._config.get_boolean('keyboard.adaptive_enter'):
+            preferred = self._vault.get_preferred_action(item)
+            if preferred is not None and preferred != action:
+                self._logger.info("Adapting Enter to %s", preferred)
+                action = preferred
+
+        return action
+
+    def __select_auto(self, window):
+        """Select the items matching the focused window
+
+        Returns whether Enter selected the item, the action and the item.
+        A single item matching the URL of the window is selected without
+        showing Rofi, unless Enter would type into the window, which always
+        needs confirming as titles are set by the page shown. Items only
+        matching the class of the window are always listed in Rofi. The
+        action is False when the selection of the matches has been aborted.
+        """
+
+        if window is None:
+            return False, None, None
+
+        matches, exact = self._vault.match_window(*window)
+        self._logger.info("%d items match the focused window", len(matches))
+        if not matches:
+            return False, None, None
+        if len(matches) == 1 and exact:
+            action = self.__adapt_enter(
+                self._config.get_itemaction('keyboard.enter'), matches[0]
+            )
+            if action not in (ItemActions.ALL, ItemActions.PASSWORD):
+                return True, action, matches[0]
+
+        action, item = self.__show_indexed_items(
+            prompt=window[0][:40] or 'Bitwarden',
+            items=matches,
+            fields=self.__tagged(['name', 'login.username'])
+        )
+        if action is None:
+            return False, False, None
+        if isinstance(action, WindowActions):
+            # Switching window mode leaves the matched items
+            return False, action, None
+
+        return self._rofi.entered, action, item
+
     def __delay_type(self):
+        with Tracer().span('autotype delay'):
+            self.__wait_for_focus()
+
+    def __wait_for_focus(self):
         # Delay typing, allowing correct window to be focused
         if self._focus.is_enabled():
             okay = self._focus.select_window()
@@ -281,6 +678,21 @@ class BwPyro:
                 )
             sleep(start_delay)
 
+    def __compile_sequence(self, item, template=None):
+        """Compile the autotype template of an item into typed steps"""
+
+        from bitwarden_pyro.controller.autotype import Sequence
+
+        if template is None:
+            template = Sequence.template_of(
+                item, self._config.get('autotype.sequence'),
+                self._config.get('autotype.sequence_field')
+            )
+
+        return Sequence(
+            template, self._config.get_float('autotype.tab_delay')
+        ).compile(item)
+
     def __execute_action(self, action, item):
         if action == ItemActions.COPY:
             self._logger.info("Copying password to clipboard")
@@ -302,12 +714,7 @@ class BwPyro:
                 message="Auto typing username and password"
             )
 
-            tab_delay = self._config.get_float('autotype.tab_delay')
-            self._autotype.string(item['login']['username'])
-            sleep(tab_delay)
-            self._autotype.key('Tab')
-            sleep(tab_delay)
-            self._autotype.string(item['login']['password'])
+            self._autotype.sequence(self.__compile_sequence(item))
         elif action == ItemActions.PASSWORD:
             self._logger.info("Auto typing password")
             # Get item with password
@@ -319,7 +726,9 @@ class BwPyro:
                 message="Auto typing password"
             )
 
-            self._autotype.string(item['login']['password'])
+            self._autotype.sequence(
+                self.__compile_sequence(item, '{PASSWORD}')
+            )
         elif action == ItemActions.TOTP:
             self._logger.info("Copying TOTP to clipboard")
             totp = self._vault.get_item_topt(item)
@@ -332,31 +741,63 @@ class BwPyro:
             self._logger.error("Unknown action received: %s", action)
 
     def __launch_ui(self):
+        from bitwarden_pyro.controller.session import SessionException
+        from bitwarden_pyro.controller.autotype import AutoTypeException
+        from bitwarden_pyro.controller.clipboard import ClipboardException
+        from bitwarden_pyro.controller.vault import VaultException
+        from bitwarden_pyro.controller.focus import FocusException
+
         self._logger.info("Application has been launched")
 
-        self.__init_ui()
+        # Resident instances keep their state between launches
+        if self._config is None:
+            with Tracer().span('init'):
+                self.__init_ui()
+        else:
+            self._vault.set_filter(None)
 
         try:
+            # The window has to be read before Rofi takes the focus
+            window = self._focus.get_active_window() \
+                if self._args.auto else None
+
             self.__unlock()
             self.__load_items()
+            self.__revalidate()
 
-            action, item = self.__display_windows()
+            with Tracer().span('select'):
+                entered, action, item = self.__select_auto(window)
+                if item is None and action is not False:
+                    action, item = self.__display_windows(action, item)
+                    entered = self._rofi.entered
 
             # Selection has been aborted
-            if action is None:
+            if not action:
                 self._logger.info("Exiting. Login selection has been aborted")
                 sys.exit(0)
 
-            self.__execute_action(action, item)
+            if entered:
+                action = self.__adapt_enter(action, item)
+
+            self._vault.record_usage(item, action)
+
+            with Tracer().span('action', action=str(action)):
+                self.__execute_action(action, item)
 
         except (AutoTypeException, ClipboardException,
                 SessionException, VaultException, FocusException) as exc:
             self._logger.exception("Application has received a critical error")
             self._rofi.show_error(f"An error has occurred. {exc}")
+        finally:
+            # Secrets that were not used must not outlive the launch
+            self._vault.discard_prefetched()
 
 
 def run():
     """Initialise the program controller"""
 
     bw_pyro = BwPyro()
-    bw_pyro.start()
+    try:
+        bw_pyro.start()
+    finally:
+        bw_pyro.close()
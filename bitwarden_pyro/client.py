@@ -0,0 +1,81 @@
+import sys
+
+from bitwarden_pyro.settings import NAME, VERSION
+from bitwarden_pyro.util.ipc import DaemonClient, DaemonReplyException, \
+    DaemonUnavailableException
+
+
+# Arguments that always have to be handled by a local process
+LOCAL_ARGS = ('--daemon', '--no-daemon', '--version', '--dump-config',
+              '--trace', '--profile', '-h', '--help')
+
+# Subcommands querying and using items without Rofi, which always run in
+# a local process as their output is written to stdout
+COMMANDS = ('query', 'copy', 'type', 'totp')
+
+
+def has_arg(argv, *names):
+    """Returns true if any of the arguments before '--' is in names"""
+
+    for arg in argv:
+        if arg == '--':
+            break
+        if arg in names or arg.split('=', 1)[0] in names:
+            return True
+
+    return False
+
+
+def is_local(argv):
+    """Returns true if the arguments can't be handled by the daemon"""
+
+    return has_arg(argv, *LOCAL_ARGS)
+
+
+def notify_busy():
+    """Tell the user that the daemon is still running another launch"""
+
+    from bitwarden_pyro.util.notify import Notify, NotifyException
+
+    try:
+        Notify().send(message=f"{NAME} is already open")
+    except NotifyException:
+        print(f"{NAME} is already open", file=sys.stderr)
+
+
+def run():
+    """Forward the launch to a running daemon or start in-process"""
+
+    argv = sys.argv[1:]
+
+    if has_arg(argv, '--startup-report'):
+        from bitwarden_pyro.util import startup
+        sys.exit(startup.report(argv))
+
+    if argv and argv[0] in COMMANDS:
+        from bitwarden_pyro import commands
+        sys.exit(commands.run(argv))
+
+    if has_arg(argv, '--version'):
+        print(f"{NAME} v{VERSION}")
+        sys.exit()
+
+    if not is_local(argv):
+        try:
+            response = DaemonClient().launch(argv)
+        except DaemonUnavailableException:
+            # No daemon is available, fall back to a full launch
+            response = None
+        except DaemonReplyException:
+            # The daemon may have run part of the launch already, so it
+            # is never run a second time
+            print(f"{NAME} daemon failed to run the launch", file=sys.stderr)
+            sys.exit(1)
+
+        if response is not None:
+            if response.get('busy'):
+                notify_busy()
+            sys.exit(response.get('status', 0))
+
+    from bitwarden_pyro import bwpyro
+    bwpyro.run()
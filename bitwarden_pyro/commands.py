@@ -0,0 +1,254 @@
+from time import sleep
+
+import os
+import sys
+import json
+import logging
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.arguments import parse_command
+from bitwarden_pyro.model.actions import ItemActions
+
+
+class Commands:
+    """Query and use vault items from scripts, without showing Rofi
+
+    Items are searched in the item cache, so queries need neither the
+    session key nor bw. Actions read the session key stored by a previous
+    launch, and fail instead of prompting for the master password.
+    """
+
+    def __init__(self, argv):
+        self._args = parse_command(argv)
+        self._logger = ProjectLogger(
+            self._args.verbose, not self._args.no_logging,
+            self._args.log_format
+        ).get_logger()
+        self._config = None
+        self._sessions = None
+        self._accounts = None
+        self._vault = None
+
+    def start(self):
+        """Run the subcommand, returning the exit status"""
+
+        from bitwarden_pyro.controller.session import SessionException
+        from bitwarden_pyro.controller.autotype import AutoTypeException
+        from bitwarden_pyro.controller.clipboard import ClipboardException
+        from bitwarden_pyro.controller.vault import VaultException
+        from bitwarden_pyro.controller.transport import TransportException
+        from bitwarden_pyro.controller.cache import CacheException
+        from bitwarden_pyro.util.config import ConfigException
+        from bitwarden_pyro.util.executable import ExecutableException
+
+        # Only problems are reported, keeping stderr clean for scripts
+        if not self._args.verbose:
+            self._logger.setLevel(logging.WARNING)
+
+        try:
+            self.__init()
+            if self._args.command == 'query':
+                return self.__query()
+
+            return self.__run_action()
+        except CommandException as exc:
+            self._logger.error("%s", exc)
+        except (SessionException, AutoTypeException, ClipboardException,
+                VaultException, TransportException, CacheException,
+                ConfigException, ExecutableException):
+            self._logger.exception("Failed to run %s", self._args.command)
+
+        return 1
+
+    def __init(self):
+        from bitwarden_pyro.controller.session import Session
+        from bitwarden_pyro.controller.vault import Vault
+        from bitwarden_pyro.controller.totp import TotpStore
+        from bitwarden_pyro.util.config import ConfigLoader
+
+        self._config = ConfigLoader(self._args)
+        accounts = self._config.get_accounts('vault.accounts')
+        self._accounts = accounts
+
+        # A single bw serve can only hold the session of one account, and
+        # is only used when already running, as commands exit right away
+        transport = None
+        if self._config.get_boolean('vault.serve') and not accounts:
+            from bitwarden_pyro.controller.serve import ServeTransport
+            transport = ServeTransport(
+                self._config.get('vault.serve_address'), autostart=False
+            )
+        self._vault = Vault(self._config.get_int('security.cache'),
+                            transport,
+                            self._config.get_boolean('interface.frecency'),
+                            accounts,
+                            self._config.get_int('security.max_staleness'))
+        self._sessions = {
+            account.name if account is not None else None:
+                Session(self._config.get_int('security.timeout'),
+                        self._config.get('security.keyring'), account)
+            for account in accounts or [None]
+        }
+        totp_timeout = self._config.get_int('security.totp_timeout')
+        self._vault.set_totp(
+            {name: TotpStore.for_session(session, totp_timeout)
+             for name, session in self._sessions.items()},
+            self._config.get_int('security.totp_min_validity')
+        )
+
+        if not self._vault.has_cache():
+            # Without cached items, they can only be listed by bw
+            for account in self._sessions:
+                self.__set_key(account)
+
+        self._vault.load_items(index=False)
+        self.__revalidate()
+
+    def __revalidate(self):
+        """Refresh the items read from an expired cache in the background,
+        for the accounts whose session key is stored"""
+
+        from bitwarden_pyro.controller.session import SessionException
+
+        stale = [
+            name for name in self._vault.get_stale_accounts()
+            if self._sessions[name].has_key()
+        ]
+        if not stale:
+            return
+
+        from bitwarden_pyro.controller.refresh import Refresher
+        from bitwarden_pyro.model.account import Account
+
+        known = {account.name: account
+                 for account in self._accounts or [Account()]}
+        try:
+            keys = [(known[name], self._sessions[name].get_key())
+                    for name in stale]
+        except SessionException:
+            self._logger.debug("Failed to read keys to refresh items with")
+            return
+
+        Refresher(self._config.get_int('security.cache')).start(keys)
+
+    def __set_key(self, account=None):
+        session = self._sessions[account]
+        if not session.has_key():
+            raise CommandException(
+                "Vault is locked, unlock it by launching bwpyro first"
+            )
+
+        self._vault.set_key(session.get_key(), account)
+
+    def __print(self, item, action=None):
+        login = item.get('login') or {}
+        if self._args.json:
+            record = {
+                'id': item['id'],
+                'name': item['name'],
+                'username': login.get('username'),
+                'uris': [u['uri'] for u in login.get('uris') or ()],
+                'folderId': item.get('folderId'),
+            }
+            if item.get('account') is not None:
+                record['account'] = item['account']
+            if action is not None:
+                record['action'] = str(action)
+            line = json.dumps(record)
+        else:
+            line = '\t'.join(
+                value or '' for value in
+                (item['id'], item['name'], login.get('username'))
+            )
+
+        print(line, flush=True)
+
+    def __query(self):
+        items = self._vault.search(' '.join(self._args.text),
+                                   self._args.limit)
+        try:
+            for item in items:
+                self.__print(item)
+        except BrokenPipeError:
+            # The reader has seen enough results, like 'head' does, and
+            # flushing stdout at exit must not fail again
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+        return 0 if items else 1
+
+    def __select(self):
+        if self._args.id is not None:
+            item = self._vault.find(self._args.id)
+        else:
+            matches = self._vault.search(self._args.match, 1)
+            item = matches[0] if matches else None
+
+        if item is None:
+            raise CommandException("No item matches the query")
+
+        return item
+
+    def __run_action(self):
+        from bitwarden_pyro.controller.clipboard import Clipboard
+
+        item = self.__select()
+        # Only the account of the item has to be unlocked
+        self.__set_key(item.get('account'))
+
+        if self._args.command == 'copy':
+            action = ItemActions.COPY
+            full = self._vault.get_item_full(item)
+            Clipboard(self._config.get_int('security.clear')).set(
+                full['login']['password']
+            )
+        elif self._args.command == 'totp':
+            action = ItemActions.TOTP
+            totp = self._vault.get_item_topt(item)
+            Clipboard(self._config.get_int('security.clear')).set(totp)
+        else:
+            action = ItemActions.PASSWORD if self._args.password \
+                else ItemActions.ALL
+            self.__type(action, self._vault.get_item_full(item))
+
+        self._vault.record_usage(item, action)
+        self.__print(item, action)
+        return 0
+
+    def __type(self, action, item):
+        from bitwarden_pyro.controller.autotype import AutoType, Sequence
+
+        autotype = AutoType()
+        if action == ItemActions.PASSWORD:
+            template = '{PASSWORD}'
+        else:
+            template = Sequence.template_of(
+                item, self._config.get('autotype.sequence'),
+                self._config.get('autotype.sequence_field')
+            )
+        steps = Sequence(
+            template, self._config.get_float('autotype.tab_delay')
+        ).compile(item)
+
+        # Give the window manager time to focus the window typed into
+        sleep(self._config.get_int('autotype.start_delay'))
+        autotype.sequence(steps)
+
+    def close(self):
+        """Release resources held by the vault"""
+
+        if self._vault is not None:
+            self._vault.close()
+
+
+class CommandException(Exception):
+    """Raised when a subcommand can't be run"""
+
+
+def run(argv):
+    """Run a headless subcommand, returning its exit status"""
+
+    commands = Commands(argv)
+    try:
+        return commands.start()
+    finally:
+        commands.close()
@@ -1,11 +1,96 @@
 from subprocess import CalledProcessError
 
-import subprocess as sp
+import re
+import time
 
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
 from bitwarden_pyro.util.executable import init_executable
 
 
+class Sequence:
+    """Compile autotype templates into steps typed by a single process
+
+    Templates mix literal text with placeholders in braces, such as
+    '{USERNAME}{TAB}{PASSWORD}{ENTER}'. Every step is either ('type', text),
+    ('key', keysym) or ('delay', seconds).
+    """
+
+    _placeholder = re.compile(r'\{([A-Za-z]+)(?:[ =]([0-9.]+))?\}')
+
+    FIELDS = {
+        'USERNAME': ('login', 'username'),
+        'PASSWORD': ('login', 'password'),
+    }
+    KEYS = {
+        'TAB': 'Tab',
+        'ENTER': 'Return',
+    }
+
+    def __init__(self, template, key_delay=0):
+        self._template = template
+        # Delay in seconds around every key, letting the target react
+        self._key_delay = key_delay
+
+    @staticmethod
+    def template_of(item, default, field=None):
+        """Return the template of an item, which can be overridden by the
+        custom field with the given name"""
+
+        for custom in item.get('fields') or ():
+            if field and custom.get('name') == field and custom.get('value'):
+                return custom['value']
+
+        return default
+
+    def compile(self, item):
+        """Return the steps typing the template for a single item"""
+
+        steps = []
+        end = 0
+        for match in self._placeholder.finditer(self._template):
+            self.__add_text(steps, self._template[end:match.start()])
+            self.__add_placeholder(steps, item, *match.groups())
+            end = match.end()
+        self.__add_text(steps, self._template[end:])
+
+        # Delays added around keys are only needed between steps
+        if steps and steps[-1][0] == 'key-delay':
+            steps.pop()
+        return [('delay', s[1]) if s[0] == 'key-delay' else s for s in steps]
+
+    @staticmethod
+    def __add_text(steps, text):
+        if not text:
+            return
+
+        if steps and steps[-1][0] == 'type':
+            steps[-1] = ('type', steps[-1][1] + text)
+        else:
+            steps.append(('type', text))
+
+    def __add_placeholder(self, steps, item, name, argument):
+        name = name.upper()
+        if name in self.FIELDS:
+            value = item
+            for key in self.FIELDS[name]:
+                value = (value or {}).get(key)
+            self.__add_text(steps, value or '')
+        elif name in self.KEYS:
+            if self._key_delay > 0 and steps and steps[-1][0] != 'key-delay':
+                steps.append(('key-delay', self._key_delay))
+            steps.append(('key', self.KEYS[name]))
+            if self._key_delay > 0:
+                steps.append(('key-delay', self._key_delay))
+        elif name == 'DELAY' and argument is not None:
+            # Delays are given in milliseconds, like KeePass
+            steps.append(('delay', float(argument) / 1000))
+        else:
+            raise SequenceException(
+                f"Unknown autotype placeholder '{{{name}}}'"
+            )
+
+
 class AutoType:
     """Emulate keyboard and automatically type strings and keys"""
 
@@ -14,6 +99,12 @@ class AutoType:
         'wayland': ['sudo ydotool']
     }
 
+    # Characters typed by xdotool as keys, as its scripts split on them
+    _xdotool_keys = {' ': 'space', '\t': 'Tab', '\n': 'Return',
+                     '\r': 'Return'}
+    # Keys typed by ydotool as part of the text
+    _ydotool_text = {'Tab': '\t', 'Return': '\n'}
+
     def __init__(self):
         self._exec = init_executable(self._tools)
         self._logger = ProjectLogger().get_logger()
@@ -21,25 +112,112 @@ class AutoType:
     def string(self, string):
         """Type a string emulating a keyboard"""
 
-        self.__emulate_keyboard('type', string)
+        self.sequence([('type', string)])
 
     def key(self, key):
         """Type a single key emulating a keyboard"""
 
-        self.__emulate_keyboard('key', key)
+        self.sequence([('key', key)])
+
+    def sequence(self, steps):
+        """Type all steps of a compiled sequence, with a single process
+        unless delays have to be waited for
+
+        Typed values are passed over stdin, and never appear in the
+        arguments of a process.
+        """
 
-    def __emulate_keyboard(self, action, value):
-        """Emulate keyboard input"""
+        *prefix, tool = self._exec.split()
+        if tool == 'xdotool':
+            calls = [([*prefix, tool, '-'], self.__xdotool_script(steps))]
+        else:
+            calls = self.__ydotool_calls(prefix, tool, steps)
 
         try:
-            self._logger.debug("Emulating keyboard input for %s", action)
-            type_cmd = f"{self._exec} {action} {value}"
-            sp.run(type_cmd.split(), check=True, capture_output=True)
-        except CalledProcessError:
+            self._logger.debug("Emulating keyboard input of %d steps",
+                               len(steps))
+            with Tracer().span('autotype', steps=len(steps)):
+                for call in calls:
+                    if isinstance(call, float):
+                        time.sleep(call)
+                        continue
+
+                    cmd, data = call
+                    Tracer().run(cmd, name=f'{tool} sequence', check=True,
+                                 capture_output=True, input=data)
+        except CalledProcessError as err:
             raise AutoTypeException(
                 "Failed to run process emulating keyboard input"
-            )
+            ) from err
+
+    def __xdotool_script(self, steps):
+        lines = []
+        for kind, value in steps:
+            if kind == 'key':
+                lines.append(f'key {value}')
+            elif kind == 'delay':
+                lines.append(f'sleep {value}')
+            else:
+                # Script arguments are split on whitespace, and expanded
+                # as variables when starting with '$'
+                for part in re.split(r'(\s)', value):
+                    if part.isspace():
+                        lines.append(f'key {self.__xdotool_keysym(part)}')
+                        continue
+                    if part.startswith('$'):
+                        lines.append('key dollar')
+                        part = part[1:]
+                    if part and not part.isspace():
+                        lines.append(f'type -- {part}')
+
+        return ''.join(f'{line}\n' for line in lines).encode('utf-8')
+
+    def __xdotool_keysym(self, char):
+        """Return the keysym typing a whitespace character, like xdotool
+        types characters without a name as their unicode keysym"""
+
+        if char in self._xdotool_keys:
+            return self._xdotool_keys[char]
+
+        # Latin-1 characters are their own keysym
+        code = ord(char)
+        if 0xa0 <= code <= 0xff:
+            return f'0x{code:x}'
+
+        return f'0x{0x1000000 | code:x}'
+
+    def __ydotool_calls(self, prefix, tool, steps):
+        """Return the ydotool commands with their input, and the delays
+        in seconds between them"""
+
+        # Text and the keys ydotool types as text are joined into segments
+        segments = []
+        for kind, value in steps:
+            if kind == 'key' and value in self._ydotool_text:
+                kind, value = 'type', self._ydotool_text[value]
+            if kind == 'type' and segments and segments[-1][0] == 'type':
+                segments[-1] = ('type', segments[-1][1] + value)
+            else:
+                segments.append((kind, value))
+
+        # Delays can't be sent to ydotool, so every segment is typed by its
+        # own ydotool process, which the prefix, like sudo, is applied to
+        calls = []
+        for kind, value in segments:
+            if kind == 'type':
+                calls.append(([*prefix, tool, 'type', '--file', '-'],
+                              value.encode('utf-8')))
+            elif kind == 'key':
+                calls.append(([*prefix, tool, 'key', value], None))
+            else:
+                calls.append(float(value))
+
+        return calls
 
 
 class AutoTypeException(Exception):
     """Raised when emulating keyboard strings failed"""
+
+
+class SequenceException(AutoTypeException):
+    """Raised when an autotype template can't be compiled"""
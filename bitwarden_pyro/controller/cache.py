@@ -1,53 +1,320 @@
 import os
 import json
-import stat
+import mmap
 import time
+import fcntl
+import struct
+import secrets
+
+from collections import namedtuple
+from collections.abc import Sequence
 
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.model.item import ItemRecord
 from bitwarden_pyro.settings import NAME
 
 
 class CacheMetadata:
     """Model class containing cache metadata"""
 
-    def __init__(self, time_created=None, count=None):
+    def __init__(self, time_created=None, count=None, generation=0):
         self.time_created = time_created
         self.count = count
+        self.generation = generation
 
-    def to_dict(self):
-        """Convert the instance to a dict ready to be serialised"""
 
-        return {
-            'time': self.time_created,
-            'count': self.count
-        }
+CacheHeader = namedtuple(
+    "CacheHeader",
+    "magic version reserved time count capacity generation "
+    "records_offset strings_offset strings_size compact_size"
+)
+
+
+class _StringTable:
+    """Append-only table of deduplicated utf-8 strings"""
+
+    def __init__(self, base=0):
+        self._base = base
+        self._positions = {}
+        self.data = bytearray()
+
+    def reference(self, value):
+        """Return the (offset, length) reference of a string"""
+
+        if value is None:
+            return CacheFormat.NONE, 0
+
+        encoded = value.encode('utf-8')
+        position = self._positions.get(value)
+        if position is None:
+            position = self._base + len(self.data)
+            self._positions[value] = position
+            self.data.extend(encoded)
+
+        return position, len(encoded)
+
+
+class CacheFormat:
+    """Binary layout of the item cache file
+
+    The file starts with a fixed size header, followed by a fixed number
+    of record slots, one per item plus free slots for new items, and a
+    string table. Records reference their strings by offset and length
+    into the string table, so any record can be decoded or replaced on its
+    own without touching the rest of the file. New strings are appended to
+    the end of the string table.
+    """
+
+    MAGIC = b'BWPC'
+    VERSION = 3
+
+    HEADER = struct.Struct('<4sHHdIIQIIII')
+    # Time the items were last refreshed, following magic and version
+    TIME = struct.Struct('<d')
+    TIME_OFFSET = struct.calcsize('<4sHH')
+    # flags, followed by (offset, length) for id, name, folderId,
+    # login.username, the login uris joined by URI_SEPARATOR and
+    # revisionDate
+    RECORD = struct.Struct('<I12I')
+
+    FLAG_LOGIN = 0x1
+    NONE = 0xFFFFFFFF  # Offset of missing strings
+    URI_SEPARATOR = ItemRecord.URI_SEPARATOR
+    MIN_FREE_SLOTS = 64
 
     @staticmethod
-    def create(dictionary):
-        """Create an instance of CacheMetadata from a dict"""
+    def project(item):
+        """Return the strings of an item stored in the cache"""
+
+        login = item.get('login')
+        username = None
+        uris = None
+        if login:
+            username = login.get('username')
+            if login.get('uris'):
+                uris = CacheFormat.URI_SEPARATOR.join(
+                    u.get('uri') or '' for u in login['uris']
+                )
+
+        return (
+            CacheFormat.FLAG_LOGIN if login else 0,
+            (item['id'], item['name'], item.get('folderId'), username, uris,
+             item.get('revisionDate'))
+        )
+
+    @staticmethod
+    def pack_record(item, strings):
+        """Serialise a single item, adding its strings to the table"""
+
+        flags, values = CacheFormat.project(item)
+        refs = []
+        for value in values:
+            refs.extend(strings.reference(value))
+
+        return CacheFormat.RECORD.pack(flags, *refs)
+
+    @staticmethod
+    def new_generation(previous=None):
+        """Return a random generation differing from the previous one
+
+        Generations are random rather than counted, so that files derived
+        from the items, such as menus and the search index, can never be
+        mistaken for files derived from a cache that has been replaced.
+        """
+
+        generation = previous
+        while generation in (previous, 0):
+            generation = secrets.randbits(64)
+
+        return generation
 
-        return CacheMetadata(
-            dictionary['time'],
-            dictionary['count']
+    @staticmethod
+    def encode(items, time_created, generation):
+        """Serialise a collection of items into the binary format"""
+
+        strings = _StringTable()
+        records = bytearray()
+        for item in items:
+            records.extend(CacheFormat.pack_record(item, strings))
+
+        count = len(items)
+        capacity = count + max(CacheFormat.MIN_FREE_SLOTS, count // 8)
+        # Leave the free slots zeroed
+        records.extend(bytes((capacity - count) * CacheFormat.RECORD.size))
+
+        records_offset = CacheFormat.HEADER.size
+        strings_offset = records_offset + len(records)
+        header = CacheFormat.HEADER.pack(
+            CacheFormat.MAGIC, CacheFormat.VERSION, 0, time_created, count,
+            capacity, generation, records_offset, strings_offset,
+            len(strings.data), len(strings.data)
         )
 
+        return b''.join((header, records, strings.data))
+
+    @staticmethod
+    def read_header(buffer):
+        """Return the unpacked header, or None if the format is unknown"""
+
+        if len(buffer) < CacheFormat.HEADER.size:
+            return None
+
+        header = CacheHeader(*CacheFormat.HEADER.unpack_from(buffer))
+        if header.magic != CacheFormat.MAGIC \
+                or header.version != CacheFormat.VERSION:
+            return None
+
+        return header
+
+
+class CachedItems(Sequence):
+    """Read-only sequence of item records lazily decoded from the cache
+    file"""
+
+    def __init__(self, buffer):
+        header = CacheFormat.read_header(buffer)
+        if header is None:
+            raise CacheException("Unsupported cache file format")
+
+        self.header = header
+        self.generation = header.generation
+        self._count = header.count
+        self._records = header.records_offset
+        self._strings = header.strings_offset
+        self._buffer = buffer
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("Cached item index out of range")
+
+        return self.__decode(self.__unpack(index))
+
+    def __iter__(self):
+        for fields in self.__iter_unpack():
+            yield self.__decode(fields)
+
+    def __unpack(self, index):
+        return CacheFormat.RECORD.unpack_from(
+            self._buffer, self._records + index * CacheFormat.RECORD.size
+        )
+
+    def __iter_unpack(self):
+        end = self._records + self._count * CacheFormat.RECORD.size
+        return CacheFormat.RECORD.iter_unpack(self._buffer[self._records:end])
+
+    def __string(self, offset, length):
+        if offset == CacheFormat.NONE:
+            return None
+
+        start = self._strings + offset
+        return str(self._buffer[start:start + length], 'utf-8')
+
+    def __decode(self, fields):
+        buffer = self._buffer
+        base = self._strings
+        none = CacheFormat.NONE
+
+        # The revision date is only needed when diffing, so it is skipped
+        strings = [
+            str(buffer[base + offset:base + offset + length], 'utf-8')
+            if offset != none else None
+            for offset, length in zip(fields[1:11:2], fields[2:11:2])
+        ]
+
+        # URIs are stored joined like records hold them
+        return ItemRecord(
+            strings[0], strings[1], strings[2],
+            bool(fields[0] & CacheFormat.FLAG_LOGIN), strings[3], strings[4]
+        )
+
+    def fields(self):
+        """Iterate over the id, name and folderId of all items
+
+        Only the three strings are decoded, which makes building lookup
+        tables much cheaper than decoding whole items.
+        """
+
+        string = self.__string
+        for fields in self.__iter_unpack():
+            yield (string(fields[1], fields[2]), string(fields[3], fields[4]),
+                   string(fields[5], fields[6]))
+
+    def search_fields(self, indexes=None):
+        """Iterate over the name, username and URIs of items, with the URIs
+        joined by URI_SEPARATOR, for all items or the given indexes"""
+
+        string = self.__string
+        if indexes is None:
+            records = self.__iter_unpack()
+        else:
+            records = (self.__unpack(index) for index in indexes)
+
+        for fields in records:
+            yield (string(fields[3], fields[4]), string(fields[7], fields[8]),
+                   string(fields[9], fields[10]))
+
+    def copy(self):
+        """Return a writable copy of the whole cache file"""
+
+        return bytearray(self._buffer)
+
+    def record(self, index):
+        """Return the raw bytes of a single record"""
+
+        start = self._records + index * CacheFormat.RECORD.size
+        return bytes(self._buffer[start:start + CacheFormat.RECORD.size])
+
+    def revisions(self):
+        """Map item ids to their record index and revision date"""
+
+        return {
+            self.__string(fields[1], fields[2]):
+                (index, self.__string(fields[11], fields[12]))
+            for index, fields in enumerate(self.__iter_unpack())
+        }
+
+    def close(self):
+        """Release the underlying buffer"""
+
+        if hasattr(self._buffer, 'close'):
+            self._buffer.close()
+
 
 class Cache:
-    """Read and write item data to cache files"""
+    """Read and write item data to cache files
 
-    _cache_dir = f'~/.cache/{NAME}/'
-    _items_file = 'items.json'
-    _meta_file = 'items.metadata'
+    Named accounts keep their items, folders and domains in their own
+    shard below the cache directory, instead of the cache directory
+    itself.
+    """
 
-    def __init__(self, expiry):
+    _cache_dir = f'~/.cache/{NAME}/'
+    _accounts_dir = 'accounts'
+    _items_file = 'items.bin'
+    _folders_file = 'folders.json'
+    _domains_file = 'domains.json'
+    # Files written by previous versions of the cache
+    _legacy_files = ('items.json', 'items.metadata')
+
+    def __init__(self, expiry, account=None, max_staleness=0):
         self._path = None
         self._meta = None
+        self._account = account
 
         self._logger = ProjectLogger().get_logger()
         self._expiry = expiry  # Negative values disable cache
+        # Age in days until which expired items can still be served
+        self._max_staleness = max_staleness
 
         self.__items_path = lambda: os.path.join(self._path, self._items_file)
-        self.__meta_path = lambda: os.path.join(self._path, self._meta_file)
 
         self.__init_meta()
 
@@ -58,24 +325,42 @@ class Cache:
 
         try:
             self._path = os.path.expanduser(self._cache_dir)
+            if self._account is not None:
+                self._path = os.path.join(
+                    self._path, self._accounts_dir, self._account
+                )
 
             if not os.path.isdir(self._path):
                 os.makedirs(self._path)
             else:
-                mpath = self.__meta_path()
                 ipath = self.__items_path()
-
-                # Both items and metadata file need to be present,
-                # however, their validity is not checked
-                if os.path.isfile(ipath) and os.path.isfile(mpath):
-                    with open(mpath, 'r') as file:
-                        meta_json = json.load(file)
-
-                    self._meta = CacheMetadata.create(meta_json)
-                    self._logger.debug("Initialised meta data from %s", mpath)
-
-        except IOError:
-            raise CacheException("Failed to initialise cache metadata")
+                self._meta = None
+
+                if os.path.isfile(ipath):
+                    with open(ipath, 'rb') as file:
+                        header = CacheFormat.read_header(
+                            file.read(CacheFormat.HEADER.size)
+                        )
+
+                    if header is None:
+                        self._logger.info("Ignoring outdated cache format")
+                    else:
+                        self._meta = CacheMetadata(
+                            header.time, header.count, header.generation
+                        )
+                        self._logger.debug(
+                            "Initialised meta data from %s", ipath
+                        )
+
+        except IOError as err:
+            raise CacheException(
+                "Failed to initialise cache metadata"
+            ) from err
+
+    def get_path(self):
+        """Returns the cache directory, or None if caching is disabled"""
+
+        return self._path
 
     def should_cache(self):
         """ Returns true if expiry is a positive number """
@@ -97,51 +382,326 @@ class Cache:
             ipath = self.__items_path()
             self._logger.debug("Reading cached items from %s", ipath)
 
-            with open(ipath, 'r') as file:
-                items = json.load(file)
+            return self.__open()
+        except (IOError, ValueError) as err:
+            raise CacheException(
+                f"Failed to read cache data from {self._path}"
+            ) from err
 
-            return items
+    def __open(self):
+        with open(self.__items_path(), 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return CachedItems(buffer)
+
+    def __next_generation(self):
+        return CacheFormat.new_generation(
+            self._meta.generation if self._meta is not None else None
+        )
+
+    def __replace(self, data):
+        """Write to a temporary file with permissions set to 600 and
+        atomically replace the previous cache
+
+        Processes holding the previous file mapped keep reading it
+        unchanged, as it is never written to once it has been replaced.
+        """
+
+        item_path = self.__items_path()
+        tmp_path = f'{item_path}.tmp.{os.getpid()}'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, item_path)
         except IOError:
-            raise CacheException(f"Failed to write cache data to {self._path}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
 
     def save(self, items):
-        """Sanitise and save a collection of items to a cache files"""
+        """Save the fields of items shown in the interface to the cache file
+
+        Passwords, TOTP secrets and any other sensitive data are never
+        written, as only the projected fields are stored.
+        """
 
         try:
             self._logger.debug("Writing cache to %s", self._path)
-            self._meta = CacheMetadata(time.time(), len(items))
+            self._meta = CacheMetadata(
+                time.time(), len(items), self.__next_generation()
+            )
+            self.__replace(CacheFormat.encode(
+                items, self._meta.time_created, self._meta.generation
+            ))
+
+            for legacy in self._legacy_files:
+                legacy_path = os.path.join(self._path, legacy)
+                if os.path.isfile(legacy_path):
+                    os.unlink(legacy_path)
+        except IOError as err:
+            raise CacheException(
+                f"Failed to write cache data to {self._path}"
+            ) from err
+
+    def __read_generational(self, filename, name):
+        """Return the data of a file tied to the generation of the items,
+        or None if it is missing or stale"""
+
+        if not self.has_items():
+            return None
 
-            meta_path = os.path.join(self._path, self._meta_file)
-            with open(meta_path, 'w') as file:
-                json.dump(self._meta.to_dict(), file)
+        try:
+            path = os.path.join(self._path, filename)
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (IOError, ValueError):
+            return None
 
-            # Chmod to 600
-            os.chmod(meta_path, stat.S_IWRITE | stat.S_IREAD)
+        if data.get('generation') != self._meta.generation:
+            self._logger.debug("Ignoring %s cached for another items", name)
+            return None
 
-            # Sanitize cache by removing sensitive data
-            for item in items:
-                if item.get('login'):
-                    if item.get('login').get('password') is not None:
-                        item['login']['password'] = None
-                    if item.get('login').get('totp') is not None:
-                        item['login']['totp'] = None
+        return data.get(name)
 
-            item_path = os.path.join(self._path, self._items_file)
-            with open(item_path, 'w') as file:
-                json.dump(items, file)
+    def __write_generational(self, filename, name, value):
+        """Save data, tying it to the current generation of items"""
 
-            # Chmod to 600
-            os.chmod(item_path, stat.S_IWRITE | stat.S_IREAD)
-        except IOError:
-            raise CacheException(f"Failed to write cache data to {self._path}")
+        if self._meta is None:
+            return
+
+        try:
+            self._logger.debug("Writing %s to %s", name, self._path)
+            path = os.path.join(self._path, filename)
+            tmp_path = f'{path}.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'w') as file:
+                json.dump({'generation': self._meta.generation, name: value},
+                          file)
+            os.replace(tmp_path, path)
+        except IOError as err:
+            raise CacheException(
+                f"Failed to write {name} to {self._path}"
+            ) from err
+
+    def get_folders(self):
+        """Return the cached folders, or None if they are missing or stale
+
+        Folders are only valid for as long as the cached items are, and
+        must have been saved for the current generation of the items.
+        """
+
+        return self.__read_generational(self._folders_file, 'folders')
+
+    def save_folders(self, folders):
+        """Save folders, tying them to the current generation of items"""
+
+        self.__write_generational(self._folders_file, 'folders', [
+            {'id': f.get('id'), 'name': f.get('name')} for f in folders
+        ])
+
+    def get_domains(self):
+        """Return the cached domain trie data, or None if missing or stale"""
+
+        return self.__read_generational(self._domains_file, 'domains')
+
+    def save_domains(self, domains):
+        """Save domain trie data, tying it to the current generation of
+        items, as URI match types are not stored with the items"""
+
+        self.__write_generational(self._domains_file, 'domains', domains)
+
+    @staticmethod
+    def __diff(revisions, items):
+        """Split items into inserts, updates and deleted record indexes"""
+
+        inserts = []
+        updates = []
+        seen = set()
+        for item in items:
+            cached = revisions.get(item['id'])
+            if cached is None:
+                inserts.append(item)
+                continue
+
+            seen.add(item['id'])
+            index, revision = cached
+            if revision is None or revision != item.get('revisionDate'):
+                updates.append((index, item))
+
+        deletes = [
+            index for item_id, (index, _) in revisions.items()
+            if item_id not in seen
+        ]
+
+        return inserts, updates, deletes
+
+    def update(self, items):
+        """Apply only the changed items to the cache file
+
+        Items are compared to the cache by id and revision date, and only
+        the records of inserted, updated and deleted items are encoded
+        again. Without changes, only the time of the refresh is written,
+        and inserted items are written to free slots in place, while
+        updated and deleted items are written to a copy of the file which
+        replaces it. All items are encoded again instead when there is no
+        valid cache, the free record slots run out, or stale strings take
+        up more than half of the string table.
+        """
+
+        fd = None
+        try:
+            if self._meta is not None:
+                fd = self.__lock()
+                cached = CachedItems(
+                    mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+                )
+            else:
+                cached = None
+        except (IOError, ValueError, CacheException):
+            cached = None
+
+        try:
+            if cached is None:
+                self._logger.debug("No valid cache to update incrementally")
+                self.save(items)
+                return
+
+            self.__update(fd, cached, items)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def __lock(self):
+        """Open the cache file, locked against other processes updating it,
+        and return its file descriptor"""
+
+        path = self.__items_path()
+        while True:
+            fd = os.open(path, os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                # The file may have been replaced while waiting for the lock
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return fd
+            except OSError:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+    def __update(self, fd, cached, items):
+        try:
+            header = cached.header
+            inserts, updates, deletes = self.__diff(cached.revisions(), items)
+            count = header.count - len(deletes) + len(inserts)
+
+            self._logger.info(
+                "Cache delta: %d inserted, %d updated, %d deleted",
+                len(inserts), len(updates), len(deletes)
+            )
+
+            if not (inserts or updates or deletes):
+                # Only the time of the refresh changes, while the items
+                # keep their generation
+                cached.close()
+                self._meta.time_created = time.time()
+                os.pwrite(fd, CacheFormat.TIME.pack(self._meta.time_created),
+                          CacheFormat.TIME_OFFSET)
+                return
+
+            strings = _StringTable(header.strings_size)
+            slots = {}
+            for index, item in updates:
+                slots[index] = CacheFormat.pack_record(item, strings)
+
+            # Fill the gaps left by deleted records with the last records,
+            # keeping the used slots contiguous
+            last = header.count
+            for index in sorted(deletes, reverse=True):
+                last -= 1
+                if index != last:
+                    slots[index] = slots.pop(last, None) or cached.record(last)
+                else:
+                    slots.pop(last, None)
+
+            for offset, item in enumerate(inserts):
+                slots[last + offset] = CacheFormat.pack_record(item, strings)
+
+            strings_size = header.strings_size + len(strings.data)
+            if count > header.capacity \
+                    or strings_size > 2 * header.compact_size + 65_536:
+                self._logger.debug("Compacting cache file")
+                cached.close()
+                self.save(items)
+                return
+
+            self._meta = CacheMetadata(
+                time.time(), count,
+                CacheFormat.new_generation(header.generation)
+            )
+            header = header._replace(
+                time=self._meta.time_created, count=count,
+                generation=self._meta.generation, strings_size=strings_size
+            )
+            patches = [(header.strings_offset + strings_size
+                        - len(strings.data), bytes(strings.data))]
+            patches.extend(
+                (header.records_offset + index * CacheFormat.RECORD.size,
+                 record) for index, record in slots.items()
+            )
+            # The header comes last, so that readers only ever find the
+            # new records once they are complete
+            patches.append((0, CacheFormat.HEADER.pack(*header)))
+
+            if updates or deletes:
+                # Other processes may have the file mapped, and resolve
+                # positions they already looked up to the records changed
+                # here. Changing records is a structural change written to
+                # a copy of the file which replaces it.
+                data = cached.copy()
+                cached.close()
+                for offset, patch in patches:
+                    data[offset:offset + len(patch)] = patch
+                self.__replace(data)
+            else:
+                # Inserted records fill free slots and their strings are
+                # appended, both beyond what readers of the file look at
+                cached.close()
+                for offset, patch in patches:
+                    os.pwrite(fd, patch, offset)
+        except IOError as err:
+            raise CacheException(
+                f"Failed to write cache data to {self._path}"
+            ) from err
+
+    def is_current(self, items):
+        """Returns true if items were read from the latest cache file
+
+        The header is read again, as the file could have been updated by
+        another process since the metadata was initialised.
+        """
+
+        if not isinstance(items, CachedItems):
+            return False
+
+        self.__init_meta()
+        return self._meta is not None \
+            and items.generation == self._meta.generation
+
+    def has_items(self, stale=False):
+        """Returns true if cache is enabled, not expired and contains items
 
-    def has_items(self):
-        """Returns true if cache is enabled, not expired and contains items"""
+        With stale, expired items are accepted as well, until they are
+        older than the maximum staleness.
+        """
 
+        limit = max(self._expiry, self._max_staleness) if stale \
+            else self._expiry
         return self._expiry > 0 \
             and self._meta is not None \
             and self._meta.count > 0 \
-            and self.__cache_age() < self._expiry
+            and self.__cache_age() < limit
 
 
 class CacheException(Exception):
@@ -0,0 +1,141 @@
+import os
+import fcntl
+import signal
+import hashlib
+import threading
+
+from bitwarden_pyro.settings import NAME
+from bitwarden_pyro.util.helper import spawn_helper
+from bitwarden_pyro.util.ipc import socket_path
+from bitwarden_pyro.util.logger import ProjectLogger, SingletonType
+
+
+def digest(value, salt):
+    """Return a keyed hash of a clipboard value, ignoring trailing newlines"""
+
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+
+    return hashlib.blake2b(
+        value.rstrip(b'\r\n'), key=salt, digest_size=32
+    ).hexdigest()
+
+
+class ClearScheduler(metaclass=SingletonType):
+    """Clear the clipboard after a delay, unless its contents have changed
+
+    Pending clears are owned by a small helper process detached from the
+    launch, so that a launch can exit as soon as a value is copied. A
+    resident process, like the daemon, owns them in a timer thread instead.
+    Scheduling a clear cancels the pending one, as only the latest value
+    copied can still be in the clipboard.
+    """
+
+    # The helper lives in its own module, as it needs the clipboard
+    _module = 'bitwarden_pyro.controller.clear_helper'
+
+    def __init__(self):
+        self._resident = False
+        self._timer = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self._pid_file = os.path.join(
+            os.path.dirname(socket_path()), f'{NAME}-clear.pid'
+        )
+        self._logger = ProjectLogger().get_logger()
+
+    def set_resident(self, resident=True):
+        """Run pending clears in this process instead of a helper"""
+
+        self._resident = resident
+
+    def schedule(self, clipboard, value, delay):
+        """Clear the clipboard after delay seconds if it still holds value"""
+
+        # Only a hash of the value is kept until the clear is due
+        salt = os.urandom(16)
+        expected = digest(value, salt)
+
+        with self._lock:
+            self.__cancel_timer()
+            if self._resident:
+                self.__swap_helper(None)
+                self._pending = (clipboard, expected, salt)
+                self._timer = threading.Timer(delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            else:
+                self.__spawn_helper(delay, expected, salt)
+
+    def flush(self):
+        """Run the pending clear of this process right away"""
+
+        with self._lock:
+            self.__cancel_timer()
+            pending, self._pending = self._pending, None
+
+        if pending is not None:
+            clipboard, expected, salt = pending
+            clipboard.clear_if(lambda current: digest(current, salt) == expected)
+
+    def __cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def __spawn_helper(self, delay, expected, salt):
+        request = {'delay': delay, 'digest': expected, 'salt': salt.hex()}
+        proc = spawn_helper(self._module, request, 'clear helper')
+        if proc is None:
+            return
+
+        self.__swap_helper(proc.pid)
+        self._logger.debug("Scheduled clipboard clear in helper %d", proc.pid)
+
+    def __swap_helper(self, pid):
+        """Terminate the previous helper and record the pid of the new one"""
+
+        try:
+            dirname = os.path.dirname(self._pid_file)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname, mode=0o700)
+
+            fd = os.open(self._pid_file, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                previous = os.pread(fd, 32, 0).strip()
+                if previous.isdigit() and int(previous) != pid:
+                    self.__terminate(int(previous))
+
+                os.ftruncate(fd, 0)
+                if pid is not None:
+                    os.pwrite(fd, str(pid).encode('ascii'), 0)
+            finally:
+                os.close(fd)
+        except OSError:
+            self._logger.warning("Failed to replace pending clipboard clear")
+
+    def __terminate(self, pid):
+        # The pid may have been reused since the helper exited
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as file:
+                if self._module.encode('ascii') not in file.read():
+                    return
+            os.kill(pid, signal.SIGTERM)
+            self._logger.debug("Cancelled clipboard clear in helper %d", pid)
+        except (IOError, ProcessLookupError):
+            pass
+
+    def release(self, pid):
+        """Forget the pid of a helper once it has run"""
+
+        try:
+            fd = os.open(self._pid_file, os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                if os.pread(fd, 32, 0).strip() == str(pid).encode('ascii'):
+                    os.ftruncate(fd, 0)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
@@ -0,0 +1,29 @@
+import os
+import sys
+import json
+import time
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.controller.clear import ClearScheduler, digest
+from bitwarden_pyro.controller.clipboard import Clipboard
+
+
+def main():
+    """Wait for a single scheduled clear read from stdin and run it"""
+
+    ProjectLogger(file_logging=True)
+    request = json.loads(sys.stdin.readline())
+    sys.stdin.close()
+
+    time.sleep(request['delay'])
+
+    salt = bytes.fromhex(request['salt'])
+    clipboard = Clipboard(-1)
+    clipboard.clear_if(
+        lambda current: digest(current, salt) == request['digest']
+    )
+    ClearScheduler().release(os.getpid())
+
+
+if __name__ == '__main__':
+    main()
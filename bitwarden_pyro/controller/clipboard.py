@@ -1,11 +1,12 @@
 import subprocess as sp
 
 from enum import Enum, auto
-from time import sleep
 from subprocess import CalledProcessError
 
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
 from bitwarden_pyro.util.executable import init_executable
+from bitwarden_pyro.controller.clear import ClearScheduler
 
 
 class ClipboardEvents(Enum):
@@ -53,14 +54,33 @@ class Clipboard:
     def set(self, value):
         """Set the contents of the clipboard"""
 
-        self.__emulate_clipboard(ClipboardEvents.SET, value)
+        with Tracer().span('clipboard'):
+            self.__emulate_clipboard(ClipboardEvents.SET, value)
 
-        if self.clear >= 0:
-            sleep(self.clear)
-            self._logger.info("Clearing clipboard")
+        if self.clear == 0:
             self.__clear()
+        elif self.clear > 0:
+            ClearScheduler().schedule(self, value, self.clear)
+
+    def clear_if(self, matches):
+        """Clear the clipboard, unless its contents fail the given check
+
+        The clipboard is cleared anyway when its contents can't be read.
+        """
+
+        try:
+            current = self.get()
+        except ClipboardException:
+            current = None
+
+        if current is not None and not matches(current):
+            self._logger.info("Clipboard has changed, not clearing it")
+            return
+
+        self.__clear()
 
     def __clear(self):
+        self._logger.info("Clearing clipboard")
         self.__emulate_clipboard(ClipboardEvents.CLEAR)
 
     def __emulate_clipboard(self, action, value=None):
@@ -87,15 +107,18 @@ class Clipboard:
 
             if input_cmd is not None:
                 input_cmd = input_cmd.split(" ", 2)
-                echo_proc = sp.Popen(input_cmd, stdout=sp.PIPE)
-                output = sp.Popen(command.split(), stdin=echo_proc.stdout)
+                echo_proc = Tracer().popen(input_cmd, stdout=sp.PIPE)
+                output = Tracer().popen(command.split(),
+                                        stdin=echo_proc.stdout)
                 return None
 
-            output = sp.check_output(command.split())
+            output = Tracer().check_output(command.split())
             return output
 
-        except CalledProcessError:
-            raise ClipboardException("Failed to execute clipboard executable")
+        except CalledProcessError as err:
+            raise ClipboardException(
+                "Failed to execute clipboard executable"
+            ) from err
 
 
 class ClipboardException(Exception):
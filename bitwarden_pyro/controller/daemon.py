@@ -0,0 +1,250 @@
+import os
+import time
+import json
+import signal
+import threading
+import socketserver
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.arguments import parse_arguments
+from bitwarden_pyro.util.ipc import DaemonClient, FORWARDED_ENV, \
+    IpcException, UnsafeDirectoryException, check_private_dir, peer_uid, \
+    socket_path
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Read a single JSON request from the socket and reply to it"""
+
+    def handle(self):
+        daemon = self.server.daemon
+
+        if not self.__is_same_user():
+            daemon.logger.warning("Rejected connection from another user")
+            return
+
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            daemon.logger.warning("Received a malformed request")
+            return
+
+        reply = {}
+        command = request.get('command')
+        if command == 'launch':
+            try:
+                status = daemon.launch(
+                    request.get('argv', []), request.get('env', {})
+                )
+            except DaemonBusyException:
+                # The client tells the user, from their desktop session
+                reply['busy'] = True
+                status = 1
+        elif command == 'drop':
+            daemon.drop()
+            status = 0
+        elif command == 'ping':
+            status = 0
+        else:
+            daemon.logger.warning("Unknown daemon command: %s", command)
+            status = 1
+
+        reply['status'] = status
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+    def __is_same_user(self):
+        return peer_uid(self.request) == os.getuid()
+
+
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server checking for expired state between requests"""
+
+    daemon_threads = True
+
+    def __init__(self, path, daemon):
+        self.daemon = daemon
+        super().__init__(path, _RequestHandler)
+
+    def service_actions(self):
+        self.daemon.expire()
+
+
+class Daemon:
+    """Keep launches resident in memory and serve them over a Unix socket"""
+
+    POLL_INTERVAL = 1
+
+    def __init__(self, factory, path=None):
+        # Callable creating a new application instance from arguments
+        self._factory = factory
+        self._path = path if path is not None else socket_path()
+        # Maps argument tuples to [application, time of last use]
+        self._apps = {}
+        self._apps_lock = threading.Lock()
+        self._launch_lock = threading.Lock()
+        # Application of the launch in progress, which never expires
+        self._running = None
+        self._server = None
+
+        self.logger = ProjectLogger().get_logger()
+
+    def start(self, argv):
+        """Bind the socket, preload the default launch and serve forever"""
+
+        self.__bind()
+
+        def terminate(*_):
+            raise SystemExit(0)
+        signal.signal(signal.SIGTERM, terminate)
+
+        try:
+            self.__preload(argv)
+            self.logger.info("Daemon is listening on %s", self._path)
+            self._server.serve_forever(poll_interval=self.POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.logger.info("Stopping daemon")
+            self.drop()
+            self._server.server_close()
+            if os.path.exists(self._path):
+                os.unlink(self._path)
+
+    def __bind(self):
+        dirname = os.path.dirname(self._path)
+        if not os.path.lexists(dirname):
+            os.makedirs(dirname, mode=0o700)
+        # The directory may have been created by another user beforehand
+        try:
+            check_private_dir(dirname)
+        except UnsafeDirectoryException as err:
+            raise DaemonException(str(err)) from err
+
+        if os.path.exists(self._path):
+            try:
+                DaemonClient(self._path).request('ping')
+                raise DaemonException(
+                    f"A daemon is already listening on {self._path}"
+                )
+            except IpcException:
+                self.logger.debug("Removing stale socket %s", self._path)
+                os.unlink(self._path)
+
+        # Make sure the socket is never accessible to other users
+        umask = os.umask(0o177)
+        try:
+            self._server = _DaemonServer(self._path, self)
+        finally:
+            os.umask(umask)
+
+    def __preload(self, argv):
+        self.logger.info("Preloading daemon state")
+        try:
+            app = self._factory(argv)
+            app.preload()
+            with self._apps_lock:
+                self._apps[tuple(argv)] = [app, time.time()]
+        except SystemExit:
+            self.logger.warning("Failed to preload daemon state")
+
+    def launch(self, argv, env):
+        """Run a single launch on behalf of a client, returning its status
+
+        Raises:
+            DaemonBusyException: Another launch is still in progress
+        """
+
+        if not self._launch_lock.acquire(blocking=False):
+            self.logger.info("Rejecting launch, another one is in progress")
+            raise DaemonBusyException("Another launch is in progress")
+
+        saved_env = {k: os.environ.get(k) for k in FORWARDED_ENV}
+        try:
+            self.__apply_env(env)
+
+            args = parse_arguments(argv)
+            if args.lock:
+                self.drop()
+
+            key = tuple(argv)
+            with self._apps_lock:
+                entry = self._apps.get(key)
+                if entry is not None:
+                    # The timeout starts again from the start of the launch
+                    entry[1] = time.time()
+                    self._running = entry[0]
+            app = entry[0] if entry is not None else self._factory(argv)
+
+            status = 0
+            try:
+                app.start()
+            except SystemExit as exc:
+                status = exc.code if isinstance(exc.code, int) else 0
+            except Exception:  # pylint: disable=broad-except
+                # The client is always replied to, so that it never runs
+                # the launch a second time by itself
+                self.logger.exception("Launch failed in the daemon")
+                status = 1
+
+            with self._apps_lock:
+                # Keep nothing in memory if the session must not be stored
+                # or if the launch left the application in a failed state
+                if args.lock or status != 0 or app.get_timeout() == 0:
+                    self._apps.pop(key, None)
+                    app.close()
+                else:
+                    self._apps[key] = [app, time.time()]
+
+            return status
+        except SystemExit as exc:
+            return exc.code if isinstance(exc.code, int) else 1
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception("Failed to prepare the launch")
+            return 1
+        finally:
+            with self._apps_lock:
+                self._running = None
+            self.__apply_env(saved_env)
+            self._launch_lock.release()
+
+    @staticmethod
+    def __apply_env(env):
+        for name in FORWARDED_ENV:
+            value = env.get(name)
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def drop(self):
+        """Forget all session keys and items kept in memory"""
+
+        with self._apps_lock:
+            if self._apps:
+                self.logger.info("Dropping in-memory daemon state")
+            for app, _ in self._apps.values():
+                app.close()
+            self._apps.clear()
+
+    def expire(self):
+        """Drop the state of launches idle for longer than their timeout,
+        leaving the launch in progress alone"""
+
+        now = time.time()
+        with self._apps_lock:
+            for key, (app, last_used) in list(self._apps.items()):
+                if app is self._running:
+                    continue
+
+                timeout = app.get_timeout()
+                if timeout is not None and 0 <= timeout < now - last_used:
+                    self.logger.info("Daemon state has timed out")
+                    del self._apps[key]
+                    app.close()
+
+
+class DaemonException(Exception):
+    """Base exception raised by Daemon"""
+
+
+class DaemonBusyException(DaemonException):
+    """Raised when a launch is requested while another one is running"""
@@ -1,9 +1,10 @@
-import subprocess as sp
-
 from subprocess import CalledProcessError
 from shutil import which
 
+import os
+
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
 
 
 class Focus:
@@ -35,7 +36,7 @@ class Focus:
         if self._arguments is not None:
             cmd += f" {self._arguments}"
 
-        proc = sp.run(cmd.split(), check=False, capture_output=True)
+        proc = Tracer().run(cmd.split(), check=False, capture_output=True)
 
         if proc.returncode != 0:
             return None
@@ -46,9 +47,9 @@ class Focus:
         try:
             self._logger.debug("Focusing window: %s", window_id)
             cmd = f"wmctrl -i -a {window_id}"
-            sp.run(cmd.split(), check=True, capture_output=True)
-        except CalledProcessError:
-            raise FocusException("Failed to focus window")
+            Tracer().run(cmd.split(), check=True, capture_output=True)
+        except CalledProcessError as err:
+            raise FocusException("Failed to focus window") from err
 
     def select_window(self):
         """Select and focus a window with slop and wmctrl"""
@@ -66,6 +67,35 @@ class Focus:
         self.__focus_window(window_id)
         return True
 
+    def get_active_window(self):
+        """Return the title and class of the focused window
+
+        Returns None when they can't be read, which is always the case
+        on Wayland.
+        """
+
+        if os.getenv('XDG_SESSION_TYPE') == 'wayland' \
+                or which('xdotool') is None:
+            self._logger.debug("Active window can't be read")
+            return None
+
+        # getwindowclassname is missing from older versions of xdotool
+        for commands in (('getwindowname', 'getwindowclassname'),
+                         ('getwindowname',)):
+            cmd = ['xdotool', 'getactivewindow', *commands]
+            proc = Tracer().run(cmd, name='xdotool getactivewindow',
+                                check=False, capture_output=True)
+            lines = proc.stdout.decode('utf-8', 'replace').splitlines()
+            if proc.returncode == 0 and len(lines) >= len(commands):
+                title = lines[0]
+                window_class = lines[1] if len(lines) > 1 else None
+                self._logger.debug("Active window: %s (%s)",
+                                   title, window_class)
+                return title, window_class
+
+        self._logger.warning("Failed to read the active window")
+        return None
+
     def is_enabled(self):
         """Return True if feature is enabled"""
 
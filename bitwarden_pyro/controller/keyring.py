@@ -0,0 +1,253 @@
+from subprocess import CalledProcessError
+
+import os
+import errno
+import ctypes
+import ctypes.util
+import platform
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
+
+
+# Special keyring id of the user keyring, '@u' for keyctl
+KEY_SPEC_USER_KEYRING = -4
+
+
+class KernelKeyring:
+    """Store user keys in the kernel keyring through the keyutils syscalls
+
+    The functions of libkeyutils are used when it is installed, and the
+    syscalls are called through libc otherwise.
+    """
+
+    KEYCTL_GET_KEYRING_ID = 0
+    KEYCTL_UNLINK = 9
+    KEYCTL_READ = 11
+    KEYCTL_SET_TIMEOUT = 15
+    KEYCTL_INVALIDATE = 21
+
+    # Numbers of the add_key, request_key and keyctl syscalls
+    _syscalls = {
+        'x86_64': (248, 249, 250),
+        'i386': (286, 287, 288),
+        'i686': (286, 287, 288),
+        'aarch64': (217, 218, 219),
+        'riscv64': (217, 218, 219),
+        'armv7l': (309, 310, 311),
+        'ppc64le': (269, 270, 271),
+    }
+
+    # Errors meaning that a key does not exist anymore
+    _missing = (errno.ENOKEY, errno.EKEYEXPIRED, errno.EKEYREVOKED)
+
+    # Upper bound on the number of purged keys sharing a description
+    MAX_PURGE = 64
+
+    def __init__(self):
+        self._logger = ProjectLogger().get_logger()
+        self._add_key, self._request_key, self._keyctl = self.__load()
+
+    @classmethod
+    def __load(cls):
+        path = ctypes.util.find_library('keyutils')
+        if path is not None:
+            lib = ctypes.CDLL(path, use_errno=True)
+            lib.add_key.restype = ctypes.c_int32
+            lib.add_key.argtypes = [
+                ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
+                ctypes.c_size_t, ctypes.c_int32
+            ]
+            lib.request_key.restype = ctypes.c_int32
+            lib.request_key.argtypes = [
+                ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p,
+                ctypes.c_int32
+            ]
+            lib.keyctl.restype = ctypes.c_long
+
+            def lib_keyctl(*args):
+                return lib.keyctl(*(ctypes.c_long(a) for a in args))
+
+            return lib.add_key, lib.request_key, lib_keyctl
+
+        numbers = cls._syscalls.get(platform.machine())
+        if numbers is None:
+            raise KeyringException(
+                f"Unsupported architecture '{platform.machine()}'"
+            )
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.syscall.restype = ctypes.c_long
+        add_nr, request_nr, keyctl_nr = numbers
+
+        def add_key(key_type, description, payload, length, keyring):
+            return libc.syscall(
+                ctypes.c_long(add_nr), key_type, description, payload,
+                ctypes.c_size_t(length), ctypes.c_long(keyring)
+            )
+
+        def request_key(key_type, description, callout, keyring):
+            return libc.syscall(
+                ctypes.c_long(request_nr), key_type, description, callout,
+                ctypes.c_long(keyring)
+            )
+
+        def keyctl(*args):
+            return libc.syscall(
+                ctypes.c_long(keyctl_nr), *(ctypes.c_long(a) for a in args)
+            )
+
+        return add_key, request_key, keyctl
+
+    @classmethod
+    def probe(cls):
+        """Return a keyring if the keyring syscalls can be used, or None"""
+
+        try:
+            keyring = cls()
+            keyring.__call(keyring._keyctl, cls.KEYCTL_GET_KEYRING_ID,
+                           KEY_SPEC_USER_KEYRING, 0)
+        except (OSError, KeyringException):
+            return None
+
+        return keyring
+
+    @staticmethod
+    def __call(function, *args):
+        ctypes.set_errno(0)
+        result = function(*args)
+        if result == -1:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+
+        return result
+
+    def request(self, name):
+        """Return the id of a user key, or None if there is no such key"""
+
+        try:
+            return self.__call(
+                self._request_key, b'user', name.encode('utf-8'), None, 0
+            )
+        except OSError as exc:
+            if exc.errno in self._missing:
+                return None
+            raise KeyringException(f"Failed to request key: {exc}") from exc
+
+    def set_timeout(self, key_id, timeout):
+        """Expire a key after timeout seconds"""
+
+        try:
+            self.__call(self._keyctl, self.KEYCTL_SET_TIMEOUT,
+                        key_id, timeout)
+        except OSError as exc:
+            raise KeyringException(
+                f"Failed to set key timeout: {exc}"
+            ) from exc
+
+    def read(self, key_id):
+        """Return the contents of a key"""
+
+        try:
+            size = 128
+            while True:
+                buffer = ctypes.create_string_buffer(size)
+                length = self.__call(
+                    self._keyctl, self.KEYCTL_READ, key_id,
+                    ctypes.addressof(buffer), size
+                )
+                # The length of the whole key is returned when the
+                # buffer is too small
+                if length <= size:
+                    return buffer.raw[:length].decode('utf-8')
+                size = length
+        except OSError as exc:
+            raise KeyringException(f"Failed to read key: {exc}") from exc
+
+    def add(self, name, value):
+        """Add a key to the user keyring, replacing a previous one"""
+
+        payload = value.encode('utf-8')
+        try:
+            return self.__call(
+                self._add_key, b'user', name.encode('utf-8'), payload,
+                len(payload), KEY_SPEC_USER_KEYRING
+            )
+        except OSError as exc:
+            raise KeyringException(f"Failed to add key: {exc}") from exc
+
+    def purge(self, name):
+        """Remove all user keys with the given name"""
+
+        for _ in range(self.MAX_PURGE):
+            key_id = self.request(name)
+            if key_id is None:
+                return
+
+            try:
+                self.__call(self._keyctl, self.KEYCTL_UNLINK, key_id,
+                            KEY_SPEC_USER_KEYRING)
+            except OSError:
+                # The key is linked elsewhere, so it is invalidated
+                # instead of only being unlinked from the user keyring
+                try:
+                    self.__call(self._keyctl, self.KEYCTL_INVALIDATE, key_id)
+                except OSError as exc:
+                    raise KeyringException(
+                        f"Failed to purge key: {exc}"
+                    ) from exc
+
+        raise KeyringException("Failed to purge all keys")
+
+
+class KeyctlKeyring:
+    """Store user keys in the kernel keyring by running keyctl"""
+
+    def __init__(self, executable='keyctl'):
+        self._executable = executable
+        self._logger = ProjectLogger().get_logger()
+
+    def __run(self, *args, **kwargs):
+        try:
+            cmd = [self._executable, *args]
+            return Tracer().run(cmd, name=f'keyctl {args[0]}', check=True,
+                                capture_output=True, **kwargs)
+        except CalledProcessError as err:
+            raise KeyringException(
+                f"Failed to run 'keyctl {args[0]}'"
+            ) from err
+
+    def request(self, name):
+        """Return the id of a user key, or None if there is no such key"""
+
+        try:
+            proc = self.__run('request', 'user', name)
+            return proc.stdout.decode("utf-8").strip()
+        except KeyringException:
+            return None
+
+    def set_timeout(self, key_id, timeout):
+        """Expire a key after timeout seconds"""
+
+        self.__run('timeout', str(key_id), str(timeout))
+
+    def read(self, key_id):
+        """Return the contents of a key"""
+
+        return self.__run('pipe', str(key_id)).stdout.decode("utf-8")
+
+    def add(self, name, value):
+        """Add a key to the user keyring, replacing a previous one"""
+
+        proc = self.__run('padd', 'user', name, '@u',
+                          input=value.encode('utf-8'))
+        return proc.stdout.decode("utf-8").strip()
+
+    def purge(self, name):
+        """Remove all user keys with the given name"""
+
+        self.__run('purge', 'user', name)
+
+
+class KeyringException(Exception):
+    """Raised when a keyring operation fails"""
@@ -0,0 +1,146 @@
+import os
+import struct
+
+from array import array
+
+from bitwarden_pyro.util.logger import ProjectLogger
+
+
+class MenuCache:
+    """Keep rendered Rofi menus in memory and next to the item cache
+
+    A menu is made of the text passed to Rofi, the positions of the listed
+    items and the offsets of every row in the text, which allow rows to be
+    reordered without rendering the menu again. Menus are tied to a token
+    identifying the items they were rendered from, and are only written to
+    disk when the token is the generation of the item cache.
+    """
+
+    _menu_dir = 'menus'
+
+    MAGIC = b'BWPM'
+    VERSION = 3
+    # magic, version, reserved, generation, number of positions,
+    # number of rows
+    HEADER = struct.Struct('<4sHHQII')
+
+    def __init__(self, cache_path=None):
+        self._path = os.path.join(cache_path, self._menu_dir) \
+            if cache_path is not None else None
+        self._memory = {}
+        self._logger = ProjectLogger().get_logger()
+
+    @staticmethod
+    def __matches(token, other):
+        return token is other or (isinstance(token, int) and token == other)
+
+    def get(self, name, token, render):
+        """Return the positions, payload and row offsets of a menu
+
+        Args:
+            name: Unique name of the menu
+            token: Generation of the item cache, or the items themselves
+            render: Callable returning the positions and text of the menu
+
+        Returns:
+            The positions of the listed items, the text of the menu ending
+            with a newline, and the offsets of its rows followed by the
+            length of the text
+        """
+
+        entry = self._memory.get(name)
+        if entry is not None and self.__matches(entry[0], token):
+            self._logger.debug("Using menu %s from memory", name)
+            return entry[1]
+
+        menu = None
+        if isinstance(token, int) and self._path is not None:
+            menu = self.__read(name, token)
+
+        if menu is None:
+            self._logger.debug("Rendering menu %s", name)
+            positions, text = render()
+            menu = (array('I', positions),) + self.__split(text)
+
+            if isinstance(token, int) and self._path is not None:
+                self.__write(name, token, menu)
+
+        self._memory[name] = (token, menu)
+        return menu
+
+    def clear(self):
+        """Forget all menus held in memory"""
+
+        self._memory.clear()
+
+    @staticmethod
+    def __split(text):
+        payload = text.encode('utf-8')
+        if payload and not payload.endswith(b'\n'):
+            payload += b'\n'
+
+        offsets = array('I', [0])
+        find = payload.find
+        start = find(b'\n')
+        while start != -1:
+            offsets.append(start + 1)
+            start = find(b'\n', start + 1)
+
+        return payload, offsets
+
+    def __file(self, name):
+        return os.path.join(self._path, f'{name}.bin')
+
+    def __read(self, name, generation):
+        try:
+            with open(self.__file(name), 'rb') as file:
+                data = file.read()
+        except IOError:
+            return None
+
+        if len(data) < self.HEADER.size:
+            return None
+
+        magic, version, _, file_generation, count, rows = \
+            self.HEADER.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION \
+                or file_generation != generation:
+            return None
+
+        start = self.HEADER.size
+        middle = start + count * 4
+        end = middle + (rows + 1) * 4
+        if end > len(data):
+            return None
+
+        positions, offsets = array('I'), array('I')
+        positions.frombytes(data[start:middle])
+        offsets.frombytes(data[middle:end])
+        if offsets[-1] != len(data) - end:
+            return None
+
+        self._logger.debug("Read menu %s from disk", name)
+        return positions, data[end:], offsets
+
+    def __write(self, name, generation, menu):
+        positions, payload, offsets = menu
+        try:
+            if not os.path.isdir(self._path):
+                os.makedirs(self._path, mode=0o700)
+
+            path = self.__file(name)
+            tmp_path = f'{path}.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(self.HEADER.pack(
+                    self.MAGIC, self.VERSION, 0, generation,
+                    len(positions), len(offsets) - 1
+                ))
+                file.write(positions.tobytes())
+                file.write(offsets.tobytes())
+                file.write(payload)
+            os.replace(tmp_path, path)
+        except IOError:
+            # Menus can always be rendered again, so this is not critical
+            self._logger.warning("Failed to write menu %s to disk", name)
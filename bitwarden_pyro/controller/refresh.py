@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import fcntl
+
+from bitwarden_pyro.settings import NAME
+from bitwarden_pyro.util.helper import spawn_helper
+from bitwarden_pyro.util.logger import ProjectLogger
+
+
+class Refresher:
+    """Sync and reload the item cache in a helper process detached from
+    the launch
+
+    Launches serving expired cached items leave refreshing them to the
+    helper, so that the menu is shown without waiting for bw. The helper
+    writes a new cache file replacing the previous one, which the next
+    launch, or the next window of a resident process, reads. Only one
+    helper refreshes the cache at a time, and helpers started meanwhile
+    exit straight away.
+    """
+
+    _module = 'bitwarden_pyro.controller.refresh'
+    _lock_path = f'~/.cache/{NAME}/refresh.lock'
+
+    def __init__(self, expiry):
+        self._expiry = expiry
+        self._process = None
+        self._logger = ProjectLogger().get_logger()
+
+    def start(self, keys, sync=True):
+        """Start refreshing the items of some accounts in the background
+
+        Args:
+            keys: Pairs of the accounts to refresh and their session keys
+            sync: Whether to run bw sync before listing the items
+        """
+
+        if self._process is not None and self._process.poll() is None:
+            self._logger.debug("Items are already being refreshed")
+            return
+
+        # Session keys are passed through the pipe, never through the
+        # arguments or the environment of the helper
+        request = {
+            'expiry': self._expiry,
+            'sync': sync,
+            'accounts': [
+                [account.name, account.appdata, key]
+                for account, key in keys
+            ],
+        }
+
+        self._process = spawn_helper(self._module, request, 'refresh helper')
+        if self._process is None:
+            return
+
+        self._logger.info("Refreshing items in helper %d", self._process.pid)
+
+    def has_finished(self):
+        """Returns true once a helper started by this process has exited,
+        forgetting about it"""
+
+        if self._process is None or self._process.poll() is None:
+            return False
+
+        self._process = None
+        return True
+
+    @classmethod
+    def lock(cls):
+        """Take the lock held while refreshing, returning its file
+        descriptor, or None when another helper holds it"""
+
+        path = os.path.expanduser(cls._lock_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+
+        return fd
+
+
+def main():
+    """Refresh the items of the accounts read from stdin"""
+
+    from bitwarden_pyro.controller.vault import Vault, VaultException
+    from bitwarden_pyro.controller.cache import CacheException
+    from bitwarden_pyro.model.account import Account
+
+    logger = ProjectLogger(file_logging=True).get_logger()
+    request = json.loads(sys.stdin.readline())
+    sys.stdin.close()
+
+    try:
+        fd = Refresher.lock()
+    except OSError:
+        logger.warning("Failed to take the refresh lock")
+        return
+
+    if fd is None:
+        logger.info("Items are already being refreshed")
+        return
+
+    try:
+        # The unnamed account of a single account setup has no name
+        accounts = [Account(name, appdata)
+                    for name, appdata, _ in request['accounts']
+                    if name is not None]
+        vault = Vault(request['expiry'], accounts=accounts)
+        for name, _, key in request['accounts']:
+            vault.set_key(key, name)
+
+        vault.refresh(request['sync'])
+        vault.close()
+        logger.info("Refreshed cached items in the background")
+    except (VaultException, CacheException):
+        logger.exception("Failed to refresh items in the background")
+    finally:
+        os.close(fd)
+
+
+if __name__ == '__main__':
+    main()
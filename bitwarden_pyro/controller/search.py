@@ -0,0 +1,268 @@
+import os
+import mmap
+import zlib
+import struct
+
+from array import array
+from bisect import bisect_left
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.memory import paused_gc
+from bitwarden_pyro.model.item import ItemRecord
+from bitwarden_pyro.controller.cache import CacheFormat
+
+
+class SearchIndex:
+    """Trigram index over the names, usernames and URIs of items
+
+    Every trigram of the casefolded fields maps to the ascending positions
+    of the items containing it, so a query only has to verify the items
+    sharing all trigrams of its words. Item ids are hashed into a sorted
+    table as well, finding items by id without decoding any other item.
+    Like menus, the index is tied to a token identifying the items it was
+    built from, and is only written next to the item cache when the token
+    is the generation of the cache.
+
+    Trigrams and ids are stored as crc32 hashes, so collisions only add
+    candidates, which are removed when verifying them.
+    """
+
+    _search_file = 'search.bin'
+
+    MAGIC = b'BWPS'
+    VERSION = 2
+    # magic, version, reserved, generation, number of items, number of
+    # trigrams, number of postings
+    HEADER = struct.Struct('<4sHHQIII')
+
+    # Fields are joined by the separator of URIs, which queries can't contain
+    SEPARATOR = CacheFormat.URI_SEPARATOR
+    # Schemes of URIs are left out, as nearly all items share them
+    _schemes = ('https://', 'http://')
+    # Trigram lists much longer than the current candidates are not worth
+    # intersecting, as verifying the candidates removes the same items
+    INTERSECT_RATIO = 8
+
+    def __init__(self, cache_path=None):
+        self._path = os.path.join(cache_path, self._search_file) \
+            if cache_path is not None else None
+        self._token = None
+        self._tables = None
+        self._logger = ProjectLogger().get_logger()
+
+    @classmethod
+    def texts(cls, items, positions=None):
+        """Yield the positions of items with their casefolded searched text,
+        made of the name, the username and the URIs of every item"""
+
+        every = positions is None
+        if every:
+            positions = range(len(items))
+
+        if hasattr(items, 'search_fields'):
+            # Records are unpacked in bulk when all of them are needed
+            fields = items.search_fields(None if every else positions)
+        else:
+            fields = (cls.__fields(items[p]) for p in positions)
+
+        separator = cls.SEPARATOR
+        for position, values in zip(positions, fields):
+            text = separator.join(filter(None, values)).casefold()
+            for scheme in cls._schemes:
+                text = text.replace(scheme, '')
+            yield position, text
+
+    @classmethod
+    def __fields(cls, item):
+        if isinstance(item, ItemRecord):
+            # Records hold URIs joined by the same separator
+            return item.name, item.username, item.uris
+
+        login = item.get('login') or {}
+        uris = login.get('uris')
+        if uris:
+            uris = cls.SEPARATOR.join(u.get('uri') or '' for u in uris)
+
+        return item.get('name'), login.get('username'), uris
+
+    @staticmethod
+    def __hash(value):
+        return zlib.crc32(value.encode('utf-8'))
+
+    def open(self, items, token):
+        """Make the index match items, reading or building it as needed
+
+        Args:
+            items: Sequence of items the positions refer to
+            token: Generation of the item cache, or the items themselves
+        """
+
+        if self._tables is not None and (
+                self._token is token
+                or (isinstance(token, int) and self._token == token)):
+            return
+
+        data = None
+        if isinstance(token, int) and self._path is not None:
+            data = self.__read(token)
+
+        if data is None:
+            self._logger.debug("Building search index")
+            with paused_gc():
+                data = self.build(items,
+                                  token if isinstance(token, int) else 0)
+            if isinstance(token, int) and self._path is not None:
+                self.__write(data)
+
+        self._token = token
+        self._tables = self.__tables(data)
+
+    @classmethod
+    def build(cls, items, generation):
+        """Serialise the index of a sequence of items"""
+
+        postings = {}
+        for position, text in cls.texts(items):
+            for trigram in set(map(''.join, zip(text, text[1:], text[2:]))):
+                positions = postings.get(trigram)
+                if positions is None:
+                    postings[trigram] = [position]
+                else:
+                    positions.append(position)
+
+        if hasattr(items, 'fields'):
+            item_ids = (fields[0] for fields in items.fields())
+        else:
+            item_ids = (item['id'] for item in items)
+        ids = [(cls.__hash(item_id), position)
+               for position, item_id in enumerate(item_ids)]
+
+        # Trigrams sharing a hash share their postings
+        hashed = {}
+        for trigram, positions in postings.items():
+            key = cls.__hash(trigram)
+            if key in hashed:
+                positions = sorted(set(hashed[key]) | set(positions))
+            hashed[key] = positions
+
+        keys = array('I', sorted(hashed))
+        offsets = array('I', [0])
+        flat = array('I')
+        for key in keys:
+            flat.extend(hashed[key])
+            offsets.append(len(flat))
+
+        ids.sort()
+        id_keys = array('I', (key for key, _ in ids))
+        id_positions = array('I', (position for _, position in ids))
+
+        header = cls.HEADER.pack(
+            cls.MAGIC, cls.VERSION, 0, generation, len(ids), len(keys),
+            len(flat)
+        )
+        return b''.join((header, keys.tobytes(), offsets.tobytes(),
+                         flat.tobytes(), id_keys.tobytes(),
+                         id_positions.tobytes()))
+
+    def __tables(self, data):
+        _, _, _, _, count, size, total = self.HEADER.unpack_from(data)
+        view = memoryview(data)[self.HEADER.size:].cast('I')
+
+        tables = []
+        for length in (size, size + 1, total, count, count):
+            tables.append(view[:length])
+            view = view[length:]
+
+        return tables
+
+    def __postings(self, trigram):
+        keys, offsets, postings, _, _ = self._tables
+        key = self.__hash(trigram)
+        index = bisect_left(keys, key)
+        if index == len(keys) or keys[index] != key:
+            return ()
+
+        return postings[offsets[index]:offsets[index + 1]]
+
+    def __candidates(self, words):
+        """Return the positions of items that may contain all words, or
+        None when no word is long enough to use the index"""
+
+        lists = []
+        for word in words:
+            for i in range(len(word) - 2):
+                positions = self.__postings(word[i:i + 3])
+                if not positions:
+                    return []
+                lists.append(positions)
+
+        if not lists:
+            return None
+
+        # Intersect starting with the rarest trigram
+        lists.sort(key=len)
+        result = set(lists[0])
+        for positions in lists[1:]:
+            if not result \
+                    or len(positions) > self.INTERSECT_RATIO * len(result):
+                break
+            result.intersection_update(positions)
+
+        return sorted(result)
+
+    def search(self, items, query):
+        """Return the ascending positions of the items containing every
+        word of the query in their searched text"""
+
+        words = query.casefold().split()
+        candidates = self.__candidates(words)
+        if candidates is None:
+            self._logger.debug("Query too short for the index, scanning")
+
+        return [
+            position for position, text in self.texts(items, candidates)
+            if all(word in text for word in words)
+        ]
+
+    def find_id(self, item_id, items):
+        """Return the position of an item by id, or None if it is missing"""
+
+        _, _, _, id_keys, id_positions = self._tables
+        key = self.__hash(item_id)
+        index = bisect_left(id_keys, key)
+        while index < len(id_keys) and id_keys[index] == key:
+            position = id_positions[index]
+            if items[position]['id'] == item_id:
+                return position
+            index += 1
+
+        return None
+
+    def __read(self, token):
+        try:
+            with open(self._path, 'rb') as file:
+                header = file.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    return None
+
+                magic, version, _, generation, *_ = \
+                    self.HEADER.unpack(header)
+                if magic != self.MAGIC or version != self.VERSION \
+                        or generation != token:
+                    return None
+
+                self._logger.debug("Using search index from %s", self._path)
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, ValueError):
+            return None
+
+    def __write(self, data):
+        try:
+            tmp_path = f'{self._path}.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, self._path)
+        except IOError:
+            self._logger.warning("Failed to write search index")
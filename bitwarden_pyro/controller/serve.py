@@ -0,0 +1,291 @@
+from http.client import HTTPConnection, HTTPException
+
+import subprocess as sp
+import os
+import json
+import time
+import queue
+import socket
+import atexit
+import threading
+
+from bitwarden_pyro.settings import NAME
+from bitwarden_pyro.util.ipc import UnsafeDirectoryException, \
+    check_private_dir, peer_uid, runtime_dir
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
+from bitwarden_pyro.util.memory import paused_gc
+from bitwarden_pyro.controller.transport import (
+    SubprocessTransport, TransportException
+)
+
+
+class _UnixConnection(HTTPConnection):
+    """HTTP connection over a Unix domain socket"""
+
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self._socket_path = path
+
+    def connect(self):
+        # The server gets the session key of the vault, so it must have
+        # been started by the user and be reachable by nobody else
+        try:
+            check_private_dir(os.path.dirname(self._socket_path))
+        except UnsafeDirectoryException as err:
+            raise UntrustedServerException(str(err)) from err
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_path)
+
+        if peer_uid(self.sock) != os.getuid():
+            self.close()
+            raise UntrustedServerException(
+                f"bw serve on {self._socket_path} belongs to another user"
+            )
+
+
+class ServeTransport:
+    """Send bw requests to a long running `bw serve` process
+
+    Connections are kept alive and pooled between requests, and every
+    request falls back to the subprocess transport when the server can
+    not be reached. With autostart, a server is started when none is
+    listening, and is owned until the transport is closed, so only
+    long running processes should start one.
+    """
+
+    STARTUP_TIMEOUT = 15  # Seconds to wait for a spawned server
+    REQUEST_TIMEOUT = 60
+    POOL_SIZE = 4
+
+    def __init__(self, address, autostart=True, fallback=None):
+        self._host, self._port, self._unix_path = self.parse_address(address)
+        self._autostart = autostart
+        self._fallback = fallback if fallback is not None \
+            else SubprocessTransport()
+
+        self._key = None
+        self._process = None
+        self._available = None  # Unknown until the first request
+        self._pool = queue.LifoQueue(self.POOL_SIZE)
+        self._lock = threading.Lock()
+        self._logger = ProjectLogger().get_logger()
+
+    @staticmethod
+    def parse_address(address):
+        """Split an address into host, port and Unix socket path, with an
+        empty address standing for a socket in the runtime directory"""
+
+        if not address:
+            return None, None, os.path.join(runtime_dir(), f'{NAME}-bw.sock')
+
+        if address.startswith('unix:'):
+            return None, None, os.path.expanduser(address[len('unix:'):])
+
+        host, _, port = address.rpartition(':')
+        if not host or not port.isdigit():
+            raise TransportException(f"Invalid bw serve address: {address}")
+
+        return host, int(port), None
+
+    def set_key(self, key):
+        """Set the session key, restarting an owned server if it changed"""
+
+        self._fallback.set_key(key)
+        with self._lock:
+            if key != self._key:
+                self.__stop()
+                self._available = None
+            self._key = key
+
+    def __connect(self):
+        if self._unix_path is not None:
+            return _UnixConnection(self._unix_path, self.REQUEST_TIMEOUT)
+
+        return HTTPConnection(self._host, self._port,
+                              timeout=self.REQUEST_TIMEOUT)
+
+    def __acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self.__connect()
+
+    def __release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def __request(self, method, path):
+        # A pooled connection may have been closed by the server since its
+        # last use, in which case the request is retried on a new one
+        for attempt in range(2):
+            conn = self.__acquire() if attempt == 0 else self.__connect()
+            try:
+                conn.request(method, path)
+                response = conn.getresponse()
+                body = response.read()
+                break
+            except (OSError, HTTPException):
+                conn.close()
+                if attempt == 1:
+                    raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self.__release(conn)
+
+        payload = json.loads(body)
+        if not payload.get('success'):
+            raise TransportException(
+                f"bw serve request failed: {payload.get('message')}"
+            )
+
+        return payload.get('data')
+
+    def __is_listening(self):
+        try:
+            self.__request('GET', '/status')
+            return True
+        except (OSError, HTTPException, ValueError, TransportException):
+            return False
+
+    def __prepare_socket(self):
+        """Make sure the directory of the socket is private and remove a
+        socket left behind by a previous server"""
+
+        dirname = os.path.dirname(self._unix_path)
+        try:
+            if not os.path.lexists(dirname):
+                os.makedirs(dirname, mode=0o700)
+            check_private_dir(dirname)
+            if os.path.lexists(self._unix_path):
+                os.unlink(self._unix_path)
+        except (OSError, UnsafeDirectoryException) as exc:
+            self._logger.warning("Can't start bw serve: %s", exc)
+            return False
+
+        return True
+
+    def __start(self):
+        if self._unix_path is not None:
+            if not self.__prepare_socket():
+                return False
+            cmd = ['bw', 'serve', '--hostname', f'unix:{self._unix_path}']
+        else:
+            cmd = ['bw', 'serve', '--hostname', self._host,
+                   '--port', str(self._port)]
+
+        self._logger.info("Starting bw serve")
+        env = dict(os.environ, BW_SESSION=self._key)
+        # The socket created by the server is only accessible to the user
+        umask = os.umask(0o177)
+        try:
+            self._process = sp.Popen(
+                cmd, env=env, stdout=sp.DEVNULL, stderr=sp.DEVNULL
+            )
+        finally:
+            os.umask(umask)
+        atexit.unregister(self.close)
+        atexit.register(self.close)
+
+        deadline = time.monotonic() + self.STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                self._logger.warning("bw serve exited while starting")
+                return False
+            if self.__is_listening():
+                return True
+            time.sleep(0.1)
+
+        self._logger.warning("Timed out waiting for bw serve")
+        self.__stop()
+        return False
+
+    def __stop(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+        if self._process is not None:
+            self._logger.info("Stopping bw serve")
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except sp.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+
+    def __is_available(self):
+        with self._lock:
+            if self._available is None:
+                self._available = self.__is_listening() or (
+                    self._autostart and self._key is not None
+                    and self.__start()
+                )
+                if not self._available:
+                    self._logger.info("bw serve is not available")
+
+            return self._available
+
+    def __call(self, name, method, path, *args):
+        if self.__is_available():
+            try:
+                self._logger.debug("Requesting %s from bw serve", path)
+                with Tracer().span(f'bw serve {name}', 'request'):
+                    return self.__request(method, path)
+            except (OSError, HTTPException, ValueError,
+                    TransportException) as exc:
+                self._logger.warning(
+                    "bw serve request failed, falling back to bw: %s", exc
+                )
+                if isinstance(exc, OSError):
+                    with self._lock:
+                        self._available = None
+
+        return getattr(self._fallback, name)(*args)
+
+    def list_items(self):
+        """Return all items in the vault"""
+
+        with paused_gc():
+            data = self.__call('list_items', 'GET', '/list/object/items')
+        return data['data'] if isinstance(data, dict) else data
+
+    def list_folders(self):
+        """Return all folders in the vault"""
+
+        data = self.__call('list_folders', 'GET', '/list/object/folders')
+        return data['data'] if isinstance(data, dict) else data
+
+    def get_item(self, item_id):
+        """Return a single item including its secrets"""
+
+        return self.__call('get_item', 'GET', f'/object/item/{item_id}',
+                           item_id)
+
+    def get_totp(self, item_id):
+        """Return the current TOTP code of a single item"""
+
+        data = self.__call('get_totp', 'GET', f'/object/totp/{item_id}',
+                           item_id)
+        return data['data'] if isinstance(data, dict) else data
+
+    def sync(self):
+        """Pull the latest vault data from the server"""
+
+        self.__call('sync', 'POST', '/sync')
+
+    def close(self):
+        """Close pooled connections and stop the server if it is owned"""
+
+        with self._lock:
+            self.__stop()
+            self._available = None
+
+
+class UntrustedServerException(TransportException):
+    """Raised when bw serve may have been started by another user"""
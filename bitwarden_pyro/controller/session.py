@@ -1,26 +1,59 @@
 from subprocess import CalledProcessError
 from shutil import which
-import subprocess as sp
 import re
 
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
+from bitwarden_pyro.controller.keyring import (
+    KernelKeyring, KeyctlKeyring, KeyringException
+)
+from bitwarden_pyro.controller.totp import TotpStore
 
 
 class Session:
-    """Retrieve and store bitwarden session key using keyctl"""
+    """Retrieve and store bitwarden session key in the kernel keyring
+
+    Named accounts keep their key under their own name in the keyring,
+    and run bw with their own data directory.
+    """
 
     KEY_NAME = "bw_session"
     DEFAULT_TIMEOUT = 900
     EXECUTABLE = 'keyctl'
 
-    def __init__(self, auto_lock=None):
+    BACKENDS = ('auto', 'kernel', 'keyctl')
+
+    def __init__(self, auto_lock=None, backend='auto', account=None):
         # Interval in seconds for locking the vault
         self.auto_lock = int(auto_lock) \
             if auto_lock is not None else self.DEFAULT_TIMEOUT
         self.key = None
+        self.account = account.name if account is not None else None
+
+        self._key_name = self.KEY_NAME if self.account is None \
+            else f"{self.KEY_NAME}_{self.account}"
+        self._env = account.env() if account is not None else None
 
         self._logger = ProjectLogger().get_logger()
+        self._keyring = self.__init_keyring(backend)
+
+    def __init_keyring(self, backend):
+        """Use the keyring syscalls, or keyctl when they are unavailable"""
+
+        if backend not in self.BACKENDS:
+            raise SessionException(f"Unknown keyring backend '{backend}'")
+
+        keyring = KernelKeyring.probe() if backend != 'keyctl' else None
+        if keyring is not None:
+            self._logger.debug("Using the kernel keyring directly")
+            return keyring
+
+        if backend == 'kernel':
+            raise SessionException("The kernel keyring is not available")
+
+        self._logger.debug("Using %s to access the keyring", self.EXECUTABLE)
         self.__has_executable()
+        return KeyctlKeyring(self.EXECUTABLE)
 
     def __has_executable(self):
         """Check whether the 'keyctl' can be found on the system"""
@@ -30,71 +63,84 @@ class Session:
                 f"'{self.EXECUTABLE}' could not be found on the system'"
             )
 
+    def get_keyring(self):
+        """Return the keyring backend holding the session key"""
+
+        return self._keyring
+
     def has_key(self):
         """Return true if the key can be retrieved from system
 
-            The key can be retrieved if auto locking is not zero
-            or keyctl has the session data registered
+            The key can be retrieved if auto locking is not zero and the
+            keyring has the session data registered, or if auto locking is
+            zero and it is already held in memory. A key held in memory is
+            forgotten once it has expired from the keyring, so that long
+            running processes lock with the keyring.
         """
-        return self.auto_lock != 0 and self.__get_keyid() is not None
+        if self.auto_lock == 0:
+            return self.key is not None
+
+        if self.__get_keyid() is None:
+            self.key = None
+            return False
+
+        return True
 
     def __get_keyid(self):
-        """Retrieves key id of session data from keyctl"""
+        """Retrieves key id of session data from the keyring"""
         try:
-            self._logger.debug("Requesting key id from keyctl")
-            request_cmd = f"{self.EXECUTABLE} request user {self.KEY_NAME}"
-            proc = sp.run(request_cmd.split(), check=True, capture_output=True)
-            keyid = proc.stdout.decode("utf-8").strip()
-            return keyid
-        except CalledProcessError:
+            self._logger.debug("Requesting key id from keyring")
+            return self._keyring.request(self._key_name)
+        except KeyringException:
             return None
 
     def lock(self):
-        """Delete session data from keyctl
+        """Delete session data from the keyring
 
         Raises:
             LockException: Raised when the spawned process returns errors
         """
         try:
-            self._logger.info("Deleting key from keyctl and locking bw")
-            keyctl_cmd = f"{self.EXECUTABLE} purge user {self.KEY_NAME}"
-            sp.run(keyctl_cmd.split(), check=True, capture_output=True)
+            self._logger.info("Deleting key from keyring and locking bw")
+            # Secrets must not outlive the session of their account
+            for name in (self._key_name, TotpStore.key_name(self.account)):
+                self._keyring.purge(name)
 
             bw_cmd = "bw lock"
-            sp.run(bw_cmd.split(), check=True, capture_output=True)
-        except CalledProcessError:
-            raise LockException("Failed to delete key from keyctl")
+            Tracer().run(bw_cmd.split(), name='bw lock', env=self._env,
+                         check=True, capture_output=True)
+        except (CalledProcessError, KeyringException) as err:
+            raise LockException("Failed to delete key from keyring") from err
 
     def unlock(self, password):
-        """Unlock bw and store session data in keyctl"""
+        """Unlock bw and store session data in the keyring"""
 
         try:
             self._logger.info("Unlocking bw using password")
 
             # Unlock bw vault and retrieve session key
             unlock_cmd = f"bw unlock {password}"
-            proc = sp.run(unlock_cmd.split(), check=True, capture_output=True)
+            proc = Tracer().run(unlock_cmd.split(), name='bw unlock',
+                                env=self._env, check=True,
+                                capture_output=True)
 
             # Extract session key from the process output
             output = proc.stdout.decode("utf-8").split("\n")[3]
             regex = r"BW_SESSION=\"(.*==)\""
             self.key = re.search(regex, output).group(1)
 
-            # Save to keyctl if there is a non-zero lock timeout set
+            # Save to the keyring if there is a non-zero lock timeout set
             if self.auto_lock != 0:
-                self._logger.info("Saving key to keyctl")
+                self._logger.info("Saving key to keyring")
                 keyid = self.__get_keyid()
                 if keyid is not None:
                     self._logger.info("Overwriting old key")
-                send_cmd = f"echo {self.key}"
-                padd_cmd = f"{self.EXECUTABLE} padd user {self.KEY_NAME} @u"
-                proc = sp.Popen(send_cmd.split(), stdout=sp.PIPE)
-                sp.check_output(padd_cmd.split(), stdin=proc.stdout)
-        except CalledProcessError:
-            raise UnlockException("Failed to unlock bw")
+                self._keyring.add(self._key_name, self.key)
+        except (CalledProcessError, KeyringException) as err:
+            raise UnlockException("Failed to unlock bw") from err
 
     def get_key(self):
-        """Return the session key from memory or from keyctl"""
+        """Return the session key from memory or from the keyring"""
 
         try:
             self._logger.info("Started key retrieval sequence")
@@ -102,34 +148,34 @@ class Session:
                 self._logger.debug("Force locking vault")
                 self.lock()
 
-            # A key is already in memory
-            if self.key is not None:
+            # The key is never stored in the keyring
+            if self.auto_lock == 0 and self.key is not None:
                 self._logger.debug("Returning key already in memory")
                 return self.key
 
-            # No key is in memory and storing the session key is allowed
+            # Storing the session key is allowed, and every use of the key
+            # restarts its timeout, even when it is already in memory
             if self.auto_lock != 0:
                 keyid = self.__get_keyid()
 
                 if keyid is None:
-                    raise KeyReadException("Key was not found in keyctl")
-
-                self._logger.debug("Retrieving key from keyctl")
-                refresh_cmd = f"{self.EXECUTABLE} timeout {keyid} {self.auto_lock}"
-                sp.run(refresh_cmd.split(), check=True)
+                    self.key = None
+                    raise KeyReadException("Key was not found in keyring")
 
-                pipe_cmd = f"{self.EXECUTABLE} pipe {keyid}"
-                proc = sp.run(pipe_cmd.split(),
-                              check=True, capture_output=True)
+                self._keyring.set_timeout(keyid, self.auto_lock)
+                if self.key is not None:
+                    self._logger.debug("Returning key already in memory")
+                    return self.key
 
-                self.key = proc.stdout.decode("utf-8").strip()
+                self._logger.debug("Retrieving key from keyring")
+                self.key = self._keyring.read(keyid).strip()
                 return self.key
 
             raise KeyReadException(
                 "Program is in an unknown state."
             )
-        except CalledProcessError:
-            raise KeyReadException("Failed to retrieve session key")
+        except KeyringException as err:
+            raise KeyReadException("Failed to retrieve session key") from err
 
 
 class SessionException(Exception):
@@ -145,4 +191,4 @@ class UnlockException(SessionException):
 
 
 class KeyReadException(SessionException):
-    """Raised when reading the key from keyctl fails"""
+    """Raised when reading the key from the keyring fails"""
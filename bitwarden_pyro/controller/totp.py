@@ -0,0 +1,192 @@
+from urllib.parse import urlsplit, parse_qsl
+
+import hmac
+import json
+import time
+import base64
+import struct
+import hashlib
+import binascii
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.controller.keyring import KeyringException
+
+
+class Totp:
+    """Generate RFC 6238 time-based one-time passwords
+
+    Secrets are given like Bitwarden stores them: a base32 key, an
+    otpauth://totp/ URI setting the algorithm, digits and period, or a
+    steam:// URI for the five character codes of Steam Guard.
+    """
+
+    ALGORITHMS = {
+        'SHA1': hashlib.sha1,
+        'SHA256': hashlib.sha256,
+        'SHA512': hashlib.sha512,
+    }
+    STEAM_ALPHABET = '23456789BCDFGHJKMNPQRTVWXY'
+    STEAM_DIGITS = 5
+
+    def __init__(self, key, digits=6, period=30, algorithm='SHA1',
+                 steam=False):
+        if algorithm not in self.ALGORITHMS:
+            raise TotpException(f"Unsupported TOTP algorithm '{algorithm}'")
+        if not 1 <= digits <= 10 or period <= 0:
+            raise TotpException("Invalid TOTP digits or period")
+
+        self._key = key
+        self.digits = digits
+        self.period = period
+        self.algorithm = algorithm
+        self.steam = steam
+
+    @classmethod
+    def parse(cls, value):
+        """Create a generator from the TOTP field of a Bitwarden item"""
+
+        value = value.strip()
+        lower = value.lower()
+        if lower.startswith('steam://'):
+            return cls(cls.decode(value[len('steam://'):]),
+                       cls.STEAM_DIGITS, steam=True)
+
+        if not lower.startswith('otpauth://'):
+            return cls(cls.decode(value))
+
+        parts = urlsplit(value)
+        if parts.netloc.lower() != 'totp':
+            raise TotpException("Only otpauth://totp/ URIs are supported")
+
+        params = {k.lower(): v for k, v in parse_qsl(parts.query)}
+        if 'secret' not in params:
+            raise TotpException("otpauth URI has no secret")
+
+        steam = params.get('encoder', '').lower() == 'steam'
+        try:
+            digits = int(params.get('digits', 6)) if not steam \
+                else cls.STEAM_DIGITS
+            period = int(params.get('period', 30))
+        except ValueError as err:
+            raise TotpException("Invalid TOTP digits or period") from err
+
+        return cls(cls.decode(params['secret']), digits, period,
+                   params.get('algorithm', 'SHA1').upper(), steam)
+
+    @staticmethod
+    def decode(secret):
+        """Decode a base32 secret, ignoring case, spaces and padding"""
+
+        secret = secret.replace(' ', '').replace('-', '').rstrip('=').upper()
+        try:
+            return base64.b32decode(secret + '=' * (-len(secret) % 8))
+        except (binascii.Error, ValueError) as err:
+            raise TotpException("TOTP secret is not valid base32") from err
+
+    def code(self, now=None):
+        """Return the code of the period including a Unix time"""
+
+        now = time.time() if now is None else now
+        counter = struct.pack('>Q', int(now // self.period))
+        digest = hmac.new(self._key, counter,
+                          self.ALGORITHMS[self.algorithm]).digest()
+
+        # Dynamic truncation of RFC 4226
+        offset = digest[-1] & 0x0F
+        value = struct.unpack_from('>I', digest, offset)[0] & 0x7FFFFFFF
+
+        if self.steam:
+            chars = []
+            for _ in range(self.digits):
+                value, index = divmod(value, len(self.STEAM_ALPHABET))
+                chars.append(self.STEAM_ALPHABET[index])
+            return ''.join(chars)
+
+        return str(value % 10 ** self.digits).zfill(self.digits)
+
+    def remaining(self, now=None):
+        """Return the seconds left until the current code expires"""
+
+        now = time.time() if now is None else now
+        return self.period - now % self.period
+
+
+class TotpStore:
+    """Hold the TOTP secrets of recently used items in the kernel keyring
+
+    Secrets are kept in a single user key per account that expires
+    shortly after the last secret was stored, and is removed when the
+    account is locked, so codes can be generated again without requesting
+    the item from bw. Secrets never reach the item cache.
+    """
+
+    KEY_NAME = 'bw_totp'
+    MAX_SECRETS = 32
+
+    def __init__(self, keyring, timeout, account=None):
+        self._keyring = keyring
+        # Lifetime of stored secrets in seconds, 0 disables the store
+        self._timeout = timeout
+        self._key_name = self.key_name(account)
+        self._logger = ProjectLogger().get_logger()
+
+    @classmethod
+    def key_name(cls, account=None):
+        """Return the name of the key holding the secrets of an account"""
+
+        return cls.KEY_NAME if account is None else f"{cls.KEY_NAME}_{account}"
+
+    @classmethod
+    def for_session(cls, session, timeout):
+        """Create the store of the keyring of a session, never keeping
+        secrets longer than the session key"""
+
+        if session.auto_lock >= 0:
+            timeout = min(timeout, session.auto_lock)
+
+        return cls(session.get_keyring(), max(timeout, 0), session.account)
+
+    def __read(self):
+        key_id = self._keyring.request(self._key_name)
+        if key_id is None:
+            return {}
+
+        try:
+            return json.loads(self._keyring.read(key_id))
+        except ValueError:
+            return {}
+
+    def get(self, item_id):
+        """Return the stored secret of an item, or None"""
+
+        if self._timeout <= 0:
+            return None
+
+        try:
+            return self.__read().get(item_id)
+        except KeyringException:
+            self._logger.warning("Failed to read stored TOTP secrets")
+            return None
+
+    def put(self, item_id, secret):
+        """Store the secret of an item, renewing the lifetime of the key"""
+
+        if self._timeout <= 0:
+            return
+
+        try:
+            secrets = self.__read()
+            secrets.pop(item_id, None)
+            secrets[item_id] = secret
+            # Only the most recently stored secrets are kept
+            while len(secrets) > self.MAX_SECRETS:
+                secrets.pop(next(iter(secrets)))
+
+            key_id = self._keyring.add(self._key_name, json.dumps(secrets))
+            self._keyring.set_timeout(key_id, self._timeout)
+        except KeyringException:
+            self._logger.warning("Failed to store TOTP secret")
+
+
+class TotpException(Exception):
+    """Raised when a TOTP secret can't be used"""
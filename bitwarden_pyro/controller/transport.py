@@ -0,0 +1,66 @@
+from subprocess import CalledProcessError
+
+import json
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
+from bitwarden_pyro.util.memory import paused_gc
+
+
+class SubprocessTransport:
+    """Run every bw request in a newly spawned bw process"""
+
+    def __init__(self, env=None):
+        self._key = None
+        # Environment of bw processes, selecting the data directory of
+        # an account, or None to inherit it
+        self._env = env
+        self._logger = ProjectLogger().get_logger()
+
+    def set_key(self, key):
+        """Set the session key passed to bw"""
+
+        self._key = key
+
+    def __run(self, *args):
+        try:
+            cmd = ['bw', *args, '--session', self._key]
+            proc = Tracer().run(cmd, name=f'bw {args[0]}', env=self._env,
+                                capture_output=True, check=True)
+            return proc.stdout.decode("utf-8")
+        except CalledProcessError as err:
+            raise TransportException(f"Failed to run 'bw {args[0]}'") from err
+
+    def list_items(self):
+        """Return all items in the vault"""
+
+        data = self.__run('list', 'items')
+        with paused_gc():
+            return json.loads(data)
+
+    def list_folders(self):
+        """Return all folders in the vault"""
+
+        return json.loads(self.__run('list', 'folders'))
+
+    def get_item(self, item_id):
+        """Return a single item including its secrets"""
+
+        return json.loads(self.__run('get', 'item', item_id))
+
+    def get_totp(self, item_id):
+        """Return the current TOTP code of a single item"""
+
+        return self.__run('get', 'totp', item_id)
+
+    def sync(self):
+        """Pull the latest vault data from the server"""
+
+        self.__run('sync')
+
+    def close(self):
+        """Release all resources held by the transport"""
+
+
+class TransportException(Exception):
+    """Raised when a request to bw could not be completed"""
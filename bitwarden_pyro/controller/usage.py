@@ -0,0 +1,172 @@
+import os
+import math
+import time
+import fcntl
+import struct
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.model.actions import ItemActions
+
+
+class UsageStore:
+    """Record how often and how recently items have been used
+
+    Usage is kept in a small file of fixed size records, holding the id of
+    an item, its frecency score, the time it was last used and how many
+    times each action was run on it. Recording a use rewrites a single
+    record, and the least valuable record is replaced once the store is
+    full, which keeps the file size bounded.
+    """
+
+    _usage_file = 'usage.bin'
+
+    MAGIC = b'BWPU'
+    VERSION = 1
+    # magic, version, reserved, number of records
+    HEADER = struct.Struct('<4sHHI')
+    ID_SIZE = 40
+    # item id, score, time of last use, use count of every action
+    RECORD = struct.Struct(f'<{ID_SIZE}sdd4H')
+
+    CAPACITY = 1024
+    # Time in seconds after which the score of an unused item is halved
+    HALF_LIFE = 14 * 24 * 3600
+    ACTIONS = (ItemActions.COPY, ItemActions.PASSWORD,
+               ItemActions.ALL, ItemActions.TOTP)
+
+    def __init__(self, path=None):
+        self._path = os.path.join(path, self._usage_file) \
+            if path is not None else None
+        self._records = None
+        self._logger = ProjectLogger().get_logger()
+
+    @classmethod
+    def rank(cls, score, last_used):
+        """Return a value ordering records by their current score
+
+        Scores decay at the same rate for all records, so comparing the
+        logarithm of each score at the time it was last updated, shifted by
+        that time, orders them without decaying every score to now.
+        """
+
+        return math.log2(score) + last_used / cls.HALF_LIFE
+
+    def get_ranks(self):
+        """Map the ids of all used items to their ranks"""
+
+        return {
+            item_id: self.rank(score, last_used)
+            for item_id, (_, score, last_used, _) in self.__load().items()
+        }
+
+    def get_preferred_action(self, item_id):
+        """Return the action used most often on an item, if any"""
+
+        record = self.__load().get(item_id)
+        if record is None or not any(record[3]):
+            return None
+
+        counts = record[3]
+        return self.ACTIONS[counts.index(max(counts))]
+
+    def record(self, item_id, action, now=None):
+        """Record a single use of an item"""
+
+        if len(item_id.encode('utf-8')) > self.ID_SIZE:
+            self._logger.debug("Not recording usage of item %s", item_id)
+            return
+
+        now = time.time() if now is None else now
+        if self._path is None:
+            self.__update(self.__load(), item_id, action, now)
+            return
+
+        try:
+            fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                # Other launches may have written since the store was read
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._records = self.__read(fd)
+                slot, record = self.__update(
+                    self._records, item_id, action, now
+                )
+                self.__write(fd, slot, item_id, record)
+            finally:
+                os.close(fd)
+        except OSError:
+            self._logger.warning("Failed to record item usage")
+
+    def __update(self, records, item_id, action, now):
+        slot, score, last_used, counts = records.get(
+            item_id, (None, 0, now, [0] * len(self.ACTIONS))
+        )
+
+        if slot is None:
+            if len(records) < self.CAPACITY:
+                slot = len(records)
+            else:
+                evicted = min(records, key=lambda k: self.rank(
+                    records[k][1], records[k][2]
+                ))
+                slot = records.pop(evicted)[0]
+
+        score = score * 2 ** ((last_used - now) / self.HALF_LIFE) + 1
+        if action in self.ACTIONS:
+            index = self.ACTIONS.index(action)
+            counts[index] = min(counts[index] + 1, 0xFFFF)
+
+        records[item_id] = (slot, score, now, counts)
+        return slot, records[item_id]
+
+    def __load(self):
+        if self._records is None:
+            self._records = {}
+            if self._path is not None and os.path.isfile(self._path):
+                try:
+                    fd = os.open(self._path, os.O_RDONLY)
+                    try:
+                        self._records = self.__read(fd)
+                    finally:
+                        os.close(fd)
+                except OSError:
+                    self._logger.warning("Failed to read item usage")
+
+        return self._records
+
+    def __read(self, fd):
+        data = os.pread(
+            fd, self.HEADER.size + self.CAPACITY * self.RECORD.size, 0
+        )
+        if len(data) < self.HEADER.size:
+            return {}
+
+        magic, version, _, count = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION:
+            self._logger.debug("Ignoring incompatible usage file")
+            return {}
+
+        count = min(count, (len(data) - self.HEADER.size)
+                    // self.RECORD.size)
+        records = {}
+        end = self.HEADER.size + count * self.RECORD.size
+        for slot, (item_id, score, last_used, *counts) in enumerate(
+                self.RECORD.iter_unpack(data[self.HEADER.size:end])):
+            item_id = item_id.rstrip(b'\0').decode('utf-8')
+            records[item_id] = (slot, score, last_used, counts)
+
+        return records
+
+    def __write(self, fd, slot, item_id, record):
+        _, score, last_used, counts = record
+        os.pwrite(
+            fd,
+            self.RECORD.pack(item_id.encode('utf-8'), score, last_used,
+                             *counts),
+            self.HEADER.size + slot * self.RECORD.size
+        )
+        os.pwrite(
+            fd,
+            self.HEADER.pack(self.MAGIC, self.VERSION, 0,
+                             len(self._records)),
+            0
+        )
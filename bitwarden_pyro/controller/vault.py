@@ -1,32 +1,345 @@
-from subprocess import CalledProcessError
-import subprocess as sp
-import json
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Sequence
+from bisect import bisect_left, bisect_right
+
+import math
+import time
+import hashlib
+import threading
 
 from bitwarden_pyro.util.logger import ProjectLogger
-from bitwarden_pyro.controller.cache import Cache
+from bitwarden_pyro.util.trace import Tracer
+from bitwarden_pyro.util.formatter import ItemFormatter
+from bitwarden_pyro.util.memory import paused_gc
+from bitwarden_pyro.controller.cache import Cache, CacheException
+from bitwarden_pyro.controller.menus import MenuCache
+from bitwarden_pyro.controller.usage import UsageStore
+from bitwarden_pyro.controller.search import SearchIndex
+from bitwarden_pyro.controller.totp import Totp, TotpException
+from bitwarden_pyro.model.actions import WindowActions
+from bitwarden_pyro.model.index import VaultIndex
+from bitwarden_pyro.model.domains import DomainTrie
+from bitwarden_pyro.model.item import ItemRecord
+from bitwarden_pyro.model.account import Account
+from bitwarden_pyro.controller.transport import (
+    SubprocessTransport, TransportException
+)
+
+
+class MergedItems(Sequence):
+    """Read-only sequence of the items of several accounts, one after the
+    other, with every item tagged with the name of its account
+
+    Items keep the generation of their caches when every account is
+    cached, combined into a single generation identifying the merged items.
+    """
+
+    def __init__(self, shards):
+        # (account name, items) of every account
+        self._shards = shards
+        self._offsets = [0]
+        for _, items in shards:
+            self._offsets.append(self._offsets[-1] + len(items))
+
+        generations = [getattr(items, 'generation', None)
+                       for _, items in shards]
+        if None not in generations:
+            names = [name for name, _ in shards]
+            digest = hashlib.blake2b(
+                repr(list(zip(names, generations))).encode('utf-8'),
+                digest_size=8
+            )
+            self.generation = int.from_bytes(digest.digest(), 'little')
+
+    def parts(self):
+        """Return the items of every account the sequence is made of"""
+
+        return [items for _, items in self._shards]
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def __locate(self, index):
+        shard = bisect_right(self._offsets, index) - 1
+        return self._shards[shard], index - self._offsets[shard]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Merged item index out of range")
+
+        (name, items), local = self.__locate(index)
+        item = items[local]
+        item.account = name
+        return item
+
+    def __iter__(self):
+        for name, items in self._shards:
+            for item in items:
+                item.account = name
+                yield item
+
+    def fields(self):
+        """Iterate over the id, name and folderId of all items"""
+
+        for _, items in self._shards:
+            if hasattr(items, 'fields'):
+                yield from items.fields()
+            else:
+                yield from ((i['id'], i['name'], i.get('folderId'))
+                            for i in items)
+
+    def search_fields(self, indexes=None):
+        """Iterate over the name, username and URIs of items, like the
+        search fields of cached items"""
+
+        if indexes is None:
+            for _, items in self._shards:
+                if hasattr(items, 'search_fields'):
+                    yield from items.search_fields()
+                else:
+                    yield from ((i.name, i.username, i.uris) for i in items)
+            return
+
+        for index in indexes:
+            (_, items), local = self.__locate(index)
+            if hasattr(items, 'search_fields'):
+                yield from items.search_fields((local,))
+            else:
+                item = items[local]
+                yield item.name, item.username, item.uris
+
+
+class _Shard:
+    """Items, folders and domains of a single account, with the cache and
+    transport they are loaded through"""
+
+    def __init__(self, account, cache, transport):
+        self.account = account
+        self.cache = cache
+        self.transport = transport
+        self.items = None
+        self.folders = None
+        # Whether the items were read from an expired cache
+        self.stale = False
+        self._domains = None
+        self._domains_token = None
+        self._logger = ProjectLogger().get_logger()
+
+    def load(self, use_cache):
+        """Load the items of the account from memory, cache or bw
+
+        Expired cached items are used until they exceed the maximum
+        staleness, marking the account as stale.
+        """
+
+        fresh = self.cache.has_items()
+        if use_cache and (fresh or self.cache.has_items(stale=True)):
+            if not fresh:
+                self._logger.info("Using expired cached items")
+            self.stale = not fresh
+
+            if self.cache.is_current(self.items):
+                self._logger.info("Using items already held in memory")
+            else:
+                self._logger.info("Loading items from cache")
+                with Tracer().span('cache read'):
+                    self.items = self.cache.get()
+                self.folders = None
+        else:
+            self.__fetch(replace=False)
+
+    def refresh(self, sync):
+        """Load the items of the account from bw, optionally syncing first,
+        and write them to a new cache file replacing the previous one"""
+
+        if sync:
+            self.transport.sync()
+        self.__fetch(replace=True)
+
+    def __fetch(self, replace):
+        # Items and folders are always refreshed together
+        self._logger.info("Loading items and folders from bw")
+        items = self.transport.list_items()
+        folders = self.transport.list_folders()
+        # Match types of URIs are only known to full items
+        domains = DomainTrie.build(items)
+
+        # Only keep the sanitised projection in memory, with full
+        # items fetched from bw when an action needs them
+        if self.cache.should_cache():
+            with Tracer().span('cache write'):
+                # A new file leaves the previous one untouched for the
+                # processes still reading it
+                if replace:
+                    self.cache.save(items)
+                else:
+                    self.cache.update(items)
+                self.cache.save_folders(folders)
+                self.cache.save_domains(domains.to_dict())
+                self.items = self.cache.get()
+        else:
+            with paused_gc():
+                self.items = [
+                    ItemRecord.from_item(item, self.account.name)
+                    for item in items
+                ]
+
+        self.stale = False
+        self.folders = folders
+        self.__set_domains(domains)
+
+    def get_folders(self):
+        """Return the folders of the account from memory, cache or bw"""
+
+        if self.folders is not None:
+            return self.folders
+
+        folders = self.cache.get_folders()
+        if folders is not None:
+            self._logger.info("Loading folders from cache")
+        else:
+            self._logger.info("Getting folders from bw")
+            folders = self.transport.list_folders()
+            if self.cache.has_items():
+                self.cache.save_folders(folders)
+
+        self.folders = folders
+        return folders
+
+    def __set_domains(self, domains):
+        self._domains = domains
+        self._domains_token = getattr(self.items, 'generation', self.items)
+
+    def get_domains(self):
+        """Return the domain trie of the loaded items"""
+
+        # Like menus, the trie is identified by the generation of the cache
+        token = getattr(self.items, 'generation', self.items)
+        if self._domains is not None and (
+                self._domains_token is token
+                or (isinstance(token, int) and self._domains_token == token)):
+            return self._domains
+
+        data = self.cache.get_domains()
+        if data is not None:
+            self.__set_domains(DomainTrie.from_dict(data))
+        else:
+            # Cached items lost the match types of their URIs, which are
+            # all matched by domain
+            self._logger.debug("Building domain trie from loaded items")
+            self.__set_domains(DomainTrie.build(self.items))
+
+        return self._domains
 
 
 class Vault:
-    """Load, get and filter items from bitwarden"""
+    """Load, get and filter items from bitwarden
+
+    Items of several accounts are loaded at the same time and merged into
+    a single sequence, tagging every item with its account, and requests
+    for an item are sent to the bw of its account. Menus, usage and the
+    search index are kept for the merged items.
+    """
 
-    def __init__(self, expiry):
+    PREFETCH_WORKERS = 2
+
+    def __init__(self, expiry, transport=None, ranked=True, accounts=None,
+                 max_staleness=0):
         self._items = None
-        self._key = None
+        self._index = None
+        self._index_source = None
+        self._folders = None
         self._filter = None
-
-        self._cache = Cache(expiry)
+        # TOTP stores by account name
+        self._totp_stores = {}
+        self._totp_validity = 0
+
+        # Full items fetched ahead of time, mapped by their account and
+        # id, as items shared by organisations are listed by every account
+        self._prefetched = {}
+        self._folders_future = None
+        self._executor = None
+        self._prefetch_lock = threading.Lock()
+
+        self._cache = Cache(expiry, max_staleness=max_staleness)
+        self._menus = MenuCache(self._cache.get_path())
+        self._usage = UsageStore(self._cache.get_path())
+        self._search = SearchIndex(self._cache.get_path())
+        self._ranked = ranked
         self._logger = ProjectLogger().get_logger()
 
+        if accounts:
+            # Every account runs its own bw, with its own data directory
+            self._shards = [
+                _Shard(account, Cache(expiry, account.name, max_staleness),
+                       SubprocessTransport(account.env()))
+                for account in accounts
+            ]
+        else:
+            self._shards = [_Shard(
+                Account(), self._cache,
+                transport if transport is not None else SubprocessTransport()
+            )]
+        self._accounts = {shard.account.name: shard for shard in self._shards}
+
+    def get_accounts(self):
+        """Return the names of the accounts items are loaded from, naming
+        the only account of a single account setup None"""
+
+        return list(self._accounts)
+
     def has_cache(self):
-        """Returns true if the cache has any available items"""
+        """Returns true if the caches of all accounts have available items,
+        which may have expired without exceeding the maximum staleness"""
 
-        return self._cache.has_items()
+        return all(shard.cache.has_items(stale=True) for shard in self._shards)
 
-    def set_key(self, key):
-        """Set the session key needed to access bw"""
+    def get_stale_accounts(self):
+        """Return the names of the accounts whose loaded items were read
+        from an expired cache"""
+
+        return [shard.account.name for shard in self._shards if shard.stale]
+
+    def set_key(self, key, account=None):
+        """Set the session key needed to access the bw of an account"""
 
         self._logger.debug("Vault key set")
-        self._key = key
+        self.__shard(account).transport.set_key(key)
+
+    def __shard(self, account):
+        shard = self._accounts.get(account)
+        if shard is None:
+            raise VaultException(f"Unknown account '{account}'")
+
+        return shard
+
+    def __shard_of(self, item):
+        # Items of a single account are not tagged
+        return self._accounts.get(item.get('account'), self._shards[0])
+
+    def __key_of(self, item):
+        """Return the account name and id identifying an item"""
+
+        return self.__shard_of(item).account.name, item['id']
+
+    def __each_shard(self, function):
+        """Run a function for every account, at the same time when there
+        are several of them, so that the slowest account sets the time"""
+
+        if len(self._shards) == 1:
+            return [function(self._shards[0])]
+
+        def run(shard):
+            with Tracer().span(f'account {shard.account.name}'):
+                return function(shard)
+
+        with ThreadPoolExecutor(max_workers=len(self._shards)) as executor:
+            return list(executor.map(run, self._shards))
 
     def set_filter(self, folder_filter):
         """Set the folder filter used when getting items"""
@@ -48,87 +361,465 @@ class Vault:
 
         try:
             self._logger.info("Syncing items with bitwarden")
+            self.discard_prefetched()
+            self.__each_shard(lambda shard: shard.transport.sync())
+        except TransportException as err:
+            raise SyncException("Failed to force a bitwarden sync") from err
 
-            sync_cmd = f"bw sync --session {self._key}"
-            sp.run(sync_cmd.split(), capture_output=True, check=True)
-        except CalledProcessError:
-            raise SyncException("Failed to force a bitwarden sync")
-
-    def __get_item_property(self, item, field):
-        try:
-            self._logger.info("Requesting %s from bitwarden", field)
+    def get_item_full(self, item):
+        """Get a single item's full data directly from bw"""
 
-            cmd = ['bw', '--session', self._key, 'get', field, item['id']]
-            proc = sp.run(cmd, capture_output=True, check=True)
+        with self._prefetch_lock:
+            future = self._prefetched.pop(self.__key_of(item), None)
 
-            output = proc.stdout.decode("utf-8")
-            return output
-        except CalledProcessError:
-            raise LoadException(f"Failed to retrieve {field} from bw")
+        if future is not None:
+            try:
+                self._logger.info("Using prefetched item")
+                with Tracer().span('prefetched item'):
+                    return future.result()
+            except TransportException:
+                self._logger.warning("Prefetching item has failed")
 
-    def get_item_full(self, item):
-        """Get a single item's full data directly from bw"""
+        try:
+            self._logger.info("Requesting item from bitwarden")
+            with Tracer().span('fetch item'):
+                return self.__shard_of(item).transport.get_item(item['id'])
+        except TransportException as err:
+            raise LoadException("Failed to retrieve item from bw") from err
 
-        if self._cache.has_items():
-            return json.loads(self.__get_item_property(item, 'item'))
+    def set_totp(self, stores, min_validity=0):
+        """Set where the TOTP secrets of every account are kept between
+        launches, by account name, and the minimum time in seconds
+        generated codes stay valid"""
 
-        return item
+        self._totp_stores = stores
+        self._totp_validity = min_validity
 
     def get_item_topt(self, item):
-        """Get a single item's TOTP data from bitwarden"""
-        return self.__get_item_property(item, 'totp')
+        """Get a single item's current TOTP code
+
+        Codes are generated from the secret of the full item, which is
+        kept in the TOTP store for later codes. bw generates the code
+        when the secret can't be used.
+        """
+
+        # Secrets are kept apart by account, like the items they belong to
+        store = self._totp_stores.get(self.__shard_of(item).account.name)
+        secret = store.get(item['id']) if store is not None else None
+        if secret is None:
+            full = self.get_item_full(item)
+            secret = (full.get('login') or {}).get('totp')
+            if not secret:
+                raise LoadException("Item has no TOTP secret")
+            if store is not None:
+                store.put(item['id'], secret)
 
-    def load_items(self, use_cache=True):
-        """Load item data from bitwarden or cache"""
         try:
-            if use_cache and self.has_cache():
-                self._logger.info("Loading items from cache")
-                self._items = self._cache.get()
-            else:
-                self._logger.info("Loading items from bw")
-                load_cmd = f"bw list items --session {self._key}"
+            totp = Totp.parse(secret)
+        except TotpException as exc:
+            self._logger.warning("Falling back to bw for TOTP: %s", exc)
+            return self.__fetch_totp(item)
+
+        remaining = totp.remaining()
+        if remaining < self._totp_validity:
+            # The code would expire before it can be used
+            self._logger.info("Waiting %.1f s for the next TOTP code",
+                              remaining)
+            with Tracer().span('totp wait'):
+                time.sleep(remaining)
+
+        return totp.code()
+
+    def __fetch_totp(self, item):
+        try:
+            self._logger.info("Requesting totp from bitwarden")
+            with Tracer().span('fetch totp'):
+                return self.__shard_of(item).transport.get_totp(item['id'])
+        except TransportException as err:
+            raise LoadException("Failed to retrieve totp from bw") from err
+
+    def refresh(self, sync=True):
+        """Sync every account and reload its items from bw, replacing its
+        cache file as a whole"""
 
-                proc = sp.run(load_cmd.split(),
-                              capture_output=True, check=True)
-                items_json = proc.stdout.decode("utf-8")
-                self._items = json.loads(items_json)
+        try:
+            self.discard_prefetched()
+            self.__each_shard(lambda shard: shard.refresh(sync))
+            self.__merge()
+        except (TransportException, CacheException) as err:
+            raise SyncException("Failed to refresh vault items") from err
 
-                if self._cache.should_cache():
-                    self._cache.save(self._items)
-        except CalledProcessError:
-            raise LoadException("Failed to load vault items from bitwarden")
+    def load_items(self, use_cache=True, index=True):
+        """Load item data from bitwarden or cache
 
-    def get_folders(self):
-        """Get all available folders from bw"""
+        Building the lookup index can be skipped when items are only
+        searched or found by id, which use the search index instead.
+
+        Items of every account are loaded at the same time.
+        """
         try:
-            self._logger.info("Getting folders from bw")
-            cmd = f"bw list folders --session {self._key}"
+            self.__each_shard(lambda shard: shard.load(use_cache))
+            self.__merge()
+
+            if index and (self._index is None
+                          or self._index_source is not self._items):
+                self._logger.debug("Indexing vault items")
+                with Tracer().span('index'), paused_gc():
+                    self._index = VaultIndex(self._items)
+                self._index_source = self._items
+        except (TransportException, CacheException) as err:
+            raise LoadException(
+                "Failed to load vault items from bitwarden"
+            ) from err
+
+    def __merge(self):
+        """Make the items of all accounts the loaded items, keeping the
+        loaded items when none of the accounts has new ones"""
+
+        parts = [shard.items for shard in self._shards]
+        # Items of the unnamed account are used as they are, while items
+        # of named accounts are tagged with their account
+        if self._shards[0].account.name is None:
+            current = [self._items]
+        else:
+            current = self._items.parts() \
+                if isinstance(self._items, MergedItems) else []
+
+        if len(current) == len(parts) \
+                and all(a is b for a, b in zip(current, parts)):
+            return
+
+        # Folders are merged again from the folders of every account
+        self._folders = None
+        if self._shards[0].account.name is None:
+            self._items = parts[0]
+        else:
+            self._items = MergedItems([
+                (shard.account.name, shard.items) for shard in self._shards
+            ])
+
+    def match_window(self, title, window_class=None):
+        """Return the items whose URIs match the title or class of a window,
+        and whether they matched the URL or host name ending the title
+        rather than only the class"""
+
+        with Tracer().span('match window'):
+            tries = [shard.get_domains() for shard in self._shards]
+            item_ids = [item_id for trie in tries
+                        for item_id in trie.match_title(title)]
+            exact = bool(item_ids)
+            if not exact and window_class:
+                item_ids = [item_id for trie in tries
+                            for item_id in trie.match_label(window_class)]
+            # The lookup index is used when loaded, sparing the search index
+            find = self._index.get_by_id \
+                if self._index_source is self._items else self.find
+            items = [find(item_id) for item_id in dict.fromkeys(item_ids)]
+
+        return [item for item in items if item is not None], exact
+
+    def prefetch(self, items):
+        """Start fetching full items and folders in the background
+
+        Fetching happens while the user is still choosing an item, hiding
+        the latency of bw. Full items are only kept in memory, until they
+        are used or discard_prefetched is called.
+        """
+
+        with self._prefetch_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.PREFETCH_WORKERS
+                )
+
+            if self._folders is None and self._folders_future is None:
+                self._folders_future = self._executor.submit(
+                    self.__load_folders
+                )
+
+            for item in items:
+                key = self.__key_of(item)
+                if key not in self._prefetched:
+                    self._logger.debug("Prefetching item %s", item['id'])
+                    self._prefetched[key] = self._executor.submit(
+                        self.__shard_of(item).transport.get_item, item['id']
+                    )
+
+    def discard_prefetched(self):
+        """Forget all prefetched items and cancel pending fetches"""
+
+        with self._prefetch_lock:
+            for future in self._prefetched.values():
+                future.cancel()
+            self._prefetched.clear()
+
+    def get_folders(self):
+        """Get all available folders from memory, cache or bw"""
 
-            proc = sp.run(cmd.split(), capture_output=True, check=True)
-            folders = proc.stdout.decode("utf-8")
-            return json.loads(folders)
-        except CalledProcessError:
-            raise LoadException("Failed to load vault items from bitwarden")
+        with self._prefetch_lock:
+            future, self._folders_future = self._folders_future, None
+
+        if future is not None:
+            try:
+                future.result()
+            except LoadException:
+                self._logger.warning("Prefetching folders has failed")
+
+        return self.__load_folders()
+
+    def __load_folders(self):
+        try:
+            if self._folders is not None:
+                self._logger.info("Using folders already held in memory")
+                return list(self._folders.values())
+
+            # Folders of several accounts are told apart by the account
+            # name, except for the items without a folder
+            tagged = len(self._shards) > 1
+            folders = {}
+            for shard in self._shards:
+                for folder in shard.get_folders():
+                    if tagged and folder.get('id') is not None:
+                        folder = dict(
+                            folder,
+                            name=f"{folder['name']} ({shard.account.name})"
+                        )
+                    folders.setdefault(folder['name'], folder)
+
+            self._folders = folders
+            return list(folders.values())
+        except (TransportException, CacheException) as err:
+            raise LoadException(
+                "Failed to load vault folders from bitwarden"
+            ) from err
 
     def get_items(self):
         """Get currently loaded items, after applying available filters"""
         if not self._filter:
             return self._items
 
-        return [
-            i for i in self._items
-            if i.get('folderId') is not None
-            and i.get('folderId') == self._filter['id']
-        ]
+        return self._index.get_by_folder(self._filter['id'])
+
+    def get_groups(self):
+        """Map the names of the filtered items to their item counts"""
+
+        folder_id = self._filter['id'] if self._filter else None
+        return self._index.get_groups(folder_id)
+
+    def get_group_heads(self):
+        """Return the position of the first item of every group, in the
+        order of get_groups and relative to the items of get_items"""
+
+        folder_id = self._filter['id'] if self._filter else None
+        return self._index.get_group_heads(folder_id)
+
+    def get_folder(self, name):
+        """Get a folder returned by get_folders by its name"""
+
+        return self._folders.get(name)
+
+    def get_by_id(self, item_id):
+        """Get a single item by id, or None if it does not exist"""
+
+        return self._index.get_by_id(item_id)
+
+    def is_group(self, name):
+        """Returns true if the name is a group of items sharing a name"""
+
+        return name.startswith(ItemFormatter.DEDUP_MARKER) \
+            and not self._index.has_name(name) \
+            and self._index.is_duplicate(
+                name[len(ItemFormatter.DEDUP_MARKER):]
+            )
+
+    def get_menu(self, mode, render, top=0):
+        """Return the positions and payload of a menu for the current items
+
+        Args:
+            mode: Window mode the menu is rendered for
+            render: Callable converting a list of items to the positions
+                and text of the menu, with positions in ascending order.
+                Menus of names list the position of the first item of
+                every group.
+            top: Number of rows at the top of the menu to return the
+                positions of
+
+        Returns:
+            The positions of the listed items, which can be passed to
+            get_at, the text of the menu, which lists recently and
+            frequently used items first when ranking is enabled, and the
+            positions of the top rows in the order they are listed
+        """
+
+        name = str(mode)
+        if self._filter:
+            name = f"{name}-{self._filter['id']}"
+
+        def render_all():
+            with Tracer().span('format', mode=name):
+                positions, text = render(self.get_items())
+            if self._filter:
+                # Convert positions in the filtered items to positions
+                # in all items
+                folder = self._index.get_positions(self._filter['id'])
+                positions = [folder[p] for p in positions]
+
+            return positions, text
+
+        # Cached items are identified by their generation, while items
+        # loaded directly from bw are only valid for as long as they
+        # are kept in memory
+        token = getattr(self._items, 'generation', self._items)
+        positions, payload, offsets = self._menus.get(
+            name, token, render_all
+        )
+
+        rows = []
+        if self._ranked:
+            with Tracer().span('rank', mode=name):
+                rows = self.__rank_rows(positions,
+                                        mode == WindowActions.NAMES)
+
+        top_positions = self.__top_positions(positions, rows, top)
+        if rows:
+            payload = ItemFormatter.ranked_format(payload, offsets, rows)
+
+        return positions, payload, top_positions
+
+    @staticmethod
+    def __top_positions(positions, rows, count):
+        """Return the positions of the first rows of a menu listing the
+        ranked rows first, followed by all other rows in order"""
+
+        if count <= 0:
+            return []
+
+        top = [positions[row] for row in rows[:count]]
+        ranked = set(rows)
+        for row, position in enumerate(positions):
+            if len(top) >= count:
+                break
+            if row not in ranked:
+                top.append(position)
+
+        return top
+
+    def __rank_rows(self, positions, grouped):
+        """Return the rows of used items, ordered by their frecency"""
+
+        ranks = {}
+        for item_id, rank in self._usage.get_ranks().items():
+            row = self.__find_row(positions, item_id, grouped)
+            if row is not None and rank > ranks.get(row, -math.inf):
+                ranks[row] = rank
+
+        return sorted(ranks, key=ranks.get, reverse=True)
+
+    def __find_row(self, positions, item_id, grouped):
+        position = self._index.get_position(item_id)
+        if position is None:
+            return None
+
+        # Groups are listed by their first item in the menu, which is the
+        # first item sharing the name that can be found in it
+        candidates = self._index.get_name_positions(position) \
+            if grouped else (position,)
+        for candidate in candidates:
+            row = bisect_left(positions, candidate)
+            if row < len(positions) and positions[row] == candidate:
+                return row
+
+        return None
+
+    def sort_by_usage(self, items):
+        """Return items ordered by frecency, when ranking is enabled"""
+
+        if not self._ranked:
+            return items
+
+        ranks = self._usage.get_ranks()
+        return sorted(
+            items, key=lambda i: ranks.get(i['id'], -math.inf), reverse=True
+        )
+
+    def record_usage(self, item, action):
+        """Record that an action has been run on an item"""
+
+        self._usage.record(item['id'], action)
+
+    def get_preferred_action(self, item):
+        """Return the action used most often on an item, if any"""
+
+        return self._usage.get_preferred_action(item['id'])
+
+    def __open_search(self):
+        # Like menus, the index is identified by the generation of the cache
+        token = getattr(self._items, 'generation', self._items)
+        with Tracer().span('search index'):
+            self._search.open(self._items, token)
+
+    def search(self, query, limit=None):
+        """Return the items matching every word of a query, best first
+
+        Words are matched case insensitively against names, usernames and
+        URIs. Items named like the query are listed first, followed by
+        items whose name starts with it, and recently and frequently used
+        items when ranking is enabled.
+        """
+
+        self.__open_search()
+        with Tracer().span('search'):
+            positions = self._search.search(self._items, query)
+        items = [self._items[p] for p in positions]
+
+        ranks = self._usage.get_ranks() if self._ranked else {}
+        prefix = query.casefold()
+
+        def order(item):
+            name = (item['name'] or '').casefold()
+            return (name != prefix, not name.startswith(prefix),
+                    -ranks.get(item['id'], -math.inf))
+
+        items.sort(key=order)
+
+        return items[:limit] if limit is not None else items
+
+    def find(self, item_id):
+        """Get a single item by id through the search index"""
+
+        self.__open_search()
+        position = self._search.find_id(item_id, self._items)
+        return self._items[position] if position is not None else None
+
+    def get_at(self, position):
+        """Get a single item by its position in all loaded items"""
+
+        return self._items[position]
 
     def get_by_name(self, name):
         """Get items filtered by name"""
-        items = [i for i in self._items if i['name'] == name]
+        items = self._index.get_by_name(name)
         if len(items) == 1:
             return items[0]
 
         return items
 
+    def close(self):
+        """Release the resources held by the bw transports"""
+
+        self.discard_prefetched()
+        with self._prefetch_lock:
+            if self._folders_future is not None:
+                self._folders_future.cancel()
+                self._folders_future = None
+        if self._executor is not None:
+            # Pending fetches were cancelled above, running ones finish in
+            # the background
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        for shard in self._shards:
+            shard.transport.close()
+
 
 class VaultException(Exception):
     """Base class for items generated by Vault"""
@@ -0,0 +1,58 @@
+import os
+import re
+
+
+class Account:
+    """Bitwarden account with its own bw data directory
+
+    Every named account keeps its session key and item cache apart from
+    those of other accounts. The unnamed account is the only account of
+    setups listing no accounts, and uses the paths of a single account.
+    """
+
+    # Environment variable moving the data directory of bw
+    APPDATA_VARIABLE = 'BITWARDENCLI_APPDATA_DIR'
+
+    _name_pattern = re.compile(r'^[A-Za-z0-9_-]+$')
+
+    def __init__(self, name=None, appdata=None):
+        self.name = name
+        self.appdata = os.path.expanduser(appdata) if appdata else None
+
+    @classmethod
+    def parse_list(cls, value):
+        """Parse a comma separated list of accounts, given as `name` to use
+        the default data directory of bw or as `name=path`
+
+        Raises:
+            ValueError: An account has an invalid or duplicate name
+        """
+
+        accounts = []
+        for entry in str(value or '').split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+
+            name, _, appdata = entry.partition('=')
+            name = name.strip()
+            if not cls._name_pattern.match(name):
+                raise ValueError(f"Invalid account name '{name}'")
+            if any(account.name == name for account in accounts):
+                raise ValueError(f"Duplicate account name '{name}'")
+
+            accounts.append(cls(name, appdata.strip() or None))
+
+        return accounts
+
+    def env(self):
+        """Return the environment bw is run with for this account, or None
+        to inherit the environment unchanged"""
+
+        if self.appdata is None:
+            return None
+
+        return dict(os.environ, **{self.APPDATA_VARIABLE: self.appdata})
+
+    def __repr__(self):
+        return f"Account({self.name!r}, {self.appdata!r})"
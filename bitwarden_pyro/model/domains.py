@@ -0,0 +1,252 @@
+import re
+
+from urllib.parse import urlsplit
+
+
+class UriMatch:
+    """URI match types of Bitwarden login items"""
+
+    DOMAIN = 0
+    HOST = 1
+    STARTS_WITH = 2
+    EXACT = 3
+    REGEX = 4
+    NEVER = 5
+
+
+class DomainTrie:
+    """Match the URIs of items against hosts, walking their labels in reverse
+
+    Nodes are keyed by domain labels from the top level domain down, so
+    looking up a host only visits one node per label, whatever the number
+    of items. Domain matches are stored at the node of their base domain
+    and host matches at the node of their full host. URIs matched by
+    prefix, exactly or by regular expression need a whole URL to be
+    compared with, and are kept in a list instead.
+
+    Base domains are approximated as the last two labels, or three when
+    the last two are a common public suffix like co.uk, as the public
+    suffix list is not available.
+    """
+
+    # Second level suffixes under which domains are registered
+    _public_suffixes = {
+        'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'com.au', 'net.au',
+        'org.au', 'co.nz', 'co.jp', 'ne.jp', 'co.kr', 'co.in', 'co.za',
+        'com.br', 'com.cn', 'com.mx', 'com.tr', 'com.tw', 'com.sg',
+    }
+    _authority = re.compile(
+        r'[a-z][a-z0-9+.-]*://([a-z0-9.-]*)(?::([0-9]{1,5}))?(?:[/?#]|$)',
+        re.IGNORECASE
+    )
+    _ip = re.compile(r'^[0-9.]+$|:')
+    _url_pattern = re.compile(
+        r'[a-z][a-z0-9+.-]*://[^\s"\'<>]+', re.IGNORECASE
+    )
+    _host_pattern = re.compile(
+        r'((?:[a-z0-9-]+\.)+[a-z]{2,})(?::([0-9]{1,5}))?', re.IGNORECASE
+    )
+    # Name of the browser ending titles, like ' - Mozilla Firefox', which
+    # never contains characters of URLs or hosts
+    _browser_suffix = re.compile(r'\s+[-\u2013\u2014|]\s+[^./:]*$')
+
+    # Keys of entries in nodes, which are never valid labels
+    DOMAIN = '@d'
+    HOST = '@h'
+
+    def __init__(self, root=None, urls=None):
+        self._root = root if root is not None else {}
+        # [item id, match type, uri] of URIs compared to whole URLs
+        self._urls = urls if urls is not None else []
+
+    @staticmethod
+    def split(uri):
+        """Return the host, port and normalised URL of a URI, like
+        Bitwarden, treating URIs without a scheme as http"""
+
+        if '://' not in uri:
+            uri = f'http://{uri}'
+
+        # Nearly all URIs are plain enough to skip parsing them fully
+        match = DomainTrie._authority.match(uri)
+        if match is not None:
+            host, port = match.groups()
+            return host.lower() or None, int(port) if port else None, uri
+
+        try:
+            parts = urlsplit(uri)
+            return parts.hostname, parts.port, uri
+        except ValueError:
+            return None, None, uri
+
+    @classmethod
+    def base_domain(cls, host):
+        """Return the registered domain of a host"""
+
+        if cls._ip.search(host):
+            return host
+
+        labels = host.split('.')
+        count = 3 if '.'.join(labels[-2:]) in cls._public_suffixes else 2
+        return '.'.join(labels[-count:])
+
+    def __node(self, host, create=False):
+        node = self._root
+        for label in reversed(host.split('.')):
+            child = node.get(label)
+            if child is None:
+                if not create:
+                    return None
+                child = node[label] = {}
+            node = child
+
+        return node
+
+    def add(self, item_id, uri, match=None):
+        """Add a single URI of an item with its match type"""
+
+        match = UriMatch.DOMAIN if match is None else match
+        if match == UriMatch.NEVER or not uri:
+            return
+
+        if match in (UriMatch.STARTS_WITH, UriMatch.EXACT, UriMatch.REGEX):
+            self._urls.append([item_id, match, uri])
+            return
+
+        host, port, _ = self.split(uri)
+        if not host:
+            return
+
+        if match == UriMatch.HOST:
+            node = self.__node(host, create=True)
+            node.setdefault(self.HOST, []).append([item_id, port])
+        else:
+            node = self.__node(self.base_domain(host), create=True)
+            entries = node.setdefault(self.DOMAIN, [])
+            if item_id not in entries[-1:]:
+                entries.append(item_id)
+
+    @classmethod
+    def build(cls, items):
+        """Build the trie of the login URIs of all items"""
+
+        trie = cls()
+        for item in items:
+            login = item.get('login') or {}
+            for uri in login.get('uris') or ():
+                trie.add(item['id'], uri.get('uri'), uri.get('match'))
+
+        return trie
+
+    def match_host(self, host, port=None):
+        """Return the ids of items matching a host by domain or host"""
+
+        host = host.lower().rstrip('.')
+        matches = []
+        node = self._root
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                return matches
+            matches.extend(node.get(self.DOMAIN, ()))
+
+        matches.extend(
+            item_id for item_id, item_port in node.get(self.HOST, ())
+            if item_port == port
+        )
+        return matches
+
+    def match_url(self, url):
+        """Return the ids of items matching a whole URL by any match type"""
+
+        host, port, url = self.split(url)
+        matches = self.match_host(host, port) if host else []
+
+        for item_id, match, uri in self._urls:
+            if match == UriMatch.EXACT:
+                found = url == uri
+            elif match == UriMatch.STARTS_WITH:
+                found = url.startswith(uri)
+            else:
+                try:
+                    found = re.search(uri, url, re.IGNORECASE) is not None
+                except re.error:
+                    found = False
+            if found:
+                matches.append(item_id)
+
+        return matches
+
+    def match_label(self, label):
+        """Return the ids of items whose base domain is named label, under
+        any top level domain"""
+
+        matches = []
+        label = label.lower()
+        for tld in self._root.values():
+            node = tld.get(label) if isinstance(tld, dict) else None
+            if node is not None:
+                matches.extend(node.get(self.DOMAIN, ()))
+
+        return matches
+
+    @classmethod
+    def trailing(cls, title):
+        """Return the last word of a title, ignoring the name of the browser
+        that ends it"""
+
+        title = title.strip()
+        suffix = cls._browser_suffix.search(title)
+        if suffix is not None:
+            title = title[:suffix.start()]
+
+        words = title.rsplit(None, 1)
+        return words[-1] if words else ''
+
+    def match_title(self, title):
+        """Return the ids of items matching the URL or host name ending the
+        title of a window
+
+        Only the end of the title is matched, which is where browser
+        extensions add the URL, right before the name of the browser. The
+        rest of the title is set by the page, which could otherwise name
+        the URL of another site to be matched.
+        """
+
+        word = self.trailing(title or '')
+        if self._url_pattern.fullmatch(word):
+            return list(dict.fromkeys(self.match_url(word)))
+
+        host = self._host_pattern.fullmatch(word)
+        if host is None:
+            return []
+
+        name, port = host.groups()
+        return list(dict.fromkeys(
+            self.match_host(name, int(port) if port else None)
+        ))
+
+    def match_window(self, title, window_class=None):
+        """Return the ids of items matching the title or class of a window
+
+        The class is matched against the name of base domains when the
+        title ends with neither a matching URL nor host name.
+        """
+
+        matches = self.match_title(title)
+        if not matches and window_class:
+            matches.extend(self.match_label(window_class))
+
+        # Items matched by multiple URIs are only listed once
+        return list(dict.fromkeys(matches))
+
+    def to_dict(self):
+        """Return the trie as a dict that can be serialised to JSON"""
+
+        return {'root': self._root, 'urls': self._urls}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a trie from the output of to_dict"""
+
+        return cls(data.get('root'), data.get('urls'))
@@ -0,0 +1,115 @@
+class VaultIndex:
+    """Hashed lookups by id, name and folder over a sequence of items
+
+    The index only stores positions into the sequence, so items are
+    decoded when they are requested rather than when the index is built.
+    """
+
+    def __init__(self, items):
+        self._items = items
+        self._by_id = {}
+        self._by_name = {}
+        self._by_folder = {}
+        self._names = []
+
+        if hasattr(items, 'fields'):
+            rows = items.fields()
+        else:
+            rows = ((i['id'], i['name'], i.get('folderId')) for i in items)
+
+        for position, (item_id, name, folder_id) in enumerate(rows):
+            self._by_id[item_id] = position
+            self._names.append(name)
+            self._by_name.setdefault(name, []).append(position)
+            if folder_id is not None:
+                self._by_folder.setdefault(folder_id, []).append(position)
+
+        # Names shared by multiple items, shown as a single group
+        self._duplicates = {
+            name for name, positions in self._by_name.items()
+            if len(positions) > 1
+        }
+
+    def __len__(self):
+        return len(self._items)
+
+    def __resolve(self, positions):
+        return [self._items[p] for p in positions]
+
+    def get_by_id(self, item_id):
+        """Return a single item by id, or None if it does not exist"""
+
+        position = self._by_id.get(item_id)
+        return self._items[position] if position is not None else None
+
+    def get_position(self, item_id):
+        """Return the position of an item, or None if it does not exist"""
+
+        return self._by_id.get(item_id)
+
+    def get_name_positions(self, position):
+        """Return the positions of all items sharing a name with an item"""
+
+        return self._by_name[self._names[position]]
+
+    def get_by_name(self, name):
+        """Return all items with the given name"""
+
+        return self.__resolve(self._by_name.get(name, ()))
+
+    def get_by_folder(self, folder_id):
+        """Return all items stored in the given folder"""
+
+        return self.__resolve(self._by_folder.get(folder_id, ()))
+
+    def get_positions(self, folder_id):
+        """Return the positions of all items stored in the given folder"""
+
+        return self._by_folder.get(folder_id, [])
+
+    def has_name(self, name):
+        """Returns true if at least one item has the given name"""
+
+        return name in self._by_name
+
+    def is_duplicate(self, name):
+        """Returns true if the name is shared by multiple items"""
+
+        return name in self._duplicates
+
+    def get_groups(self, folder_id=None):
+        """Map names to item counts, for all items or a single folder"""
+
+        if folder_id is None:
+            return {
+                name: len(positions)
+                for name, positions in self._by_name.items()
+            }
+
+        groups = {}
+        for position in self._by_folder.get(folder_id, ()):
+            name = self._names[position]
+            groups[name] = groups.get(name, 0) + 1
+
+        return groups
+
+    def get_group_heads(self, folder_id=None):
+        """Return the position of the first item of every group, in the
+        order of get_groups
+
+        Positions are relative to the items of the folder when one is
+        given, like the items returned by get_by_folder.
+        """
+
+        if folder_id is None:
+            return [positions[0] for positions in self._by_name.values()]
+
+        heads = []
+        seen = set()
+        for index, position in enumerate(self._by_folder.get(folder_id, ())):
+            name = self._names[position]
+            if name not in seen:
+                seen.add(name)
+                heads.append(index)
+
+        return heads
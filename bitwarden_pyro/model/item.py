@@ -0,0 +1,121 @@
+import sys
+
+from collections.abc import Mapping
+
+
+class ItemRecord(Mapping):
+    """Compact record of the fields of an item listed in menus
+
+    Records only hold the id, the name, the folder and, for logins, the
+    username and the URIs of an item, in slots rather than nested dicts
+    and lists, along with the name of its account when several accounts
+    are merged. They can be read like the read-only dicts returned by bw,
+    building 'login' only when it is asked for. Full items, with their
+    secrets, have to be fetched from bw when an action needs them.
+    """
+
+    __slots__ = ('id', 'name', 'folder_id', 'is_login', 'username', 'uris',
+                 'account')
+
+    # URIs of a record are held as a single string, split when needed
+    URI_SEPARATOR = '\x1f'
+    # Dotted field paths that value can read
+    PATHS = ('id', 'name', 'folderId', 'login.username', 'login.uris.uri',
+             'account')
+
+    def __init__(self, item_id, name, folder_id=None, is_login=False,
+                 username=None, uris=None, account=None):
+        self.id = item_id
+        self.name = name
+        self.folder_id = folder_id
+        self.is_login = is_login
+        self.username = username
+        self.uris = uris
+        self.account = account
+
+    @classmethod
+    def from_item(cls, item, account=None):
+        """Create the record of an item returned by bw"""
+
+        login = item.get('login')
+        username = None
+        uris = None
+        if login:
+            username = login.get('username')
+            if login.get('uris'):
+                uris = cls.URI_SEPARATOR.join(
+                    u.get('uri') or '' for u in login['uris']
+                )
+
+        # Folders and usernames are shared by many items
+        folder_id = item.get('folderId')
+        return cls(
+            item['id'], item['name'],
+            sys.intern(folder_id) if folder_id is not None else None,
+            bool(login),
+            sys.intern(username) if username is not None else None,
+            uris, account
+        )
+
+    def uri_list(self):
+        """Return the URIs of the record, or None if it has none"""
+
+        if self.uris is None:
+            return None
+
+        return self.uris.split(self.URI_SEPARATOR)
+
+    def value(self, path):
+        """Return the value of a dotted field path, as read from a bw item,
+        without building the nested dicts
+
+        Raises:
+            KeyError: The path is not a field of records
+        """
+
+        if path == 'name':
+            return self.name
+        if path == 'id':
+            return self.id
+        if path == 'folderId':
+            return self.folder_id
+        if path == 'login.username':
+            return self.username
+        if path == 'login.uris.uri':
+            return self.uri_list()
+        if path == 'account':
+            return self.account
+
+        raise KeyError(path)
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self.id
+        if key == 'name':
+            return self.name
+        if key == 'folderId':
+            return self.folder_id
+        if key == 'login' and self.is_login:
+            uris = self.uri_list()
+            return {
+                'username': self.username,
+                'uris': [{'uri': uri} for uri in uris]
+                if uris is not None else None
+            }
+        if key == 'account' and self.account is not None:
+            return self.account
+
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from ('id', 'name', 'folderId')
+        if self.is_login:
+            yield 'login'
+        if self.account is not None:
+            yield 'account'
+
+    def __len__(self):
+        return 3 + self.is_login + (self.account is not None)
+
+    def __repr__(self):
+        return f"ItemRecord({self.id!r}, {self.name!r})"
@@ -0,0 +1,7 @@
+import os
+
+
+def resource_filename(name):
+    """Return the path of a file shipped in the resources package"""
+
+    return os.path.join(os.path.dirname(__file__), name)
@@ -2,7 +2,7 @@ import argparse
 
 from bitwarden_pyro.settings import NAME
 from bitwarden_pyro.model.actions import ItemActions
-from bitwarden_pyro.util.config import ConfigLoader
+from bitwarden_pyro.util.defaults import get_default
 
 
 class SmartFormatter(argparse.HelpFormatter):
@@ -15,7 +15,7 @@ class SmartFormatter(argparse.HelpFormatter):
         return argparse.HelpFormatter._split_lines(self, text, width)
 
 
-def parse_arguments():
+def parse_arguments(argv=None):
     """Parse command line arguments using argparse"""
 
     parser = argparse.ArgumentParser(
@@ -43,6 +43,12 @@ def parse_arguments():
         action="store_true"
     )
 
+    parser.add_argument(
+        "-a", "--auto",
+        help="use the items matching the focused window, if any",
+        action="store_true"
+    )
+
     parser.add_argument(
         "--hide-mesg",
         help="hide message explaining keybinds",
@@ -55,6 +61,24 @@ def parse_arguments():
         action="store_true"
     )
 
+    parser.add_argument(
+        "--startup-report",
+        help="print the import cost of every module after the launch",
+        action="store_true"
+    )
+
+    parser.add_argument(
+        "--trace",
+        help="write a Chrome trace of the launch to TRACE",
+        metavar="TRACE"
+    )
+
+    parser.add_argument(
+        "--profile",
+        help="write cProfile statistics of the launch to PROFILE",
+        metavar="PROFILE"
+    )
+
     parser.add_argument(
         "--no-config",
         help="ignore config files and use default values",
@@ -73,6 +97,25 @@ def parse_arguments():
         action="store_true"
     )
 
+    parser.add_argument(
+        "--log-format",
+        help="write the log file as text or as JSON lines (default: text)",
+        choices=['text', 'json'],
+        default='text'
+    )
+
+    parser.add_argument(
+        "--daemon",
+        help="keep running in the background and serve launches over a socket",
+        action="store_true"
+    )
+
+    parser.add_argument(
+        "--no-daemon",
+        help="do not hand over the launch to a running daemon",
+        action="store_true"
+    )
+
     parser.add_argument(
         "--config",
         help="use a custom config file path"
@@ -81,20 +124,20 @@ def parse_arguments():
     parser.add_argument(
         '--cache',
         help="set the time in days it takes for cache to become invalid" +
-        f" (default: {ConfigLoader.get_default('security', 'cache')})"
+        f" (default: {get_default('security', 'cache')})"
     )
 
     parser.add_argument(
         "-c", "--clear",
         help="R|clear the clipboard after CLEAR seconds" +
-        f" (default: {ConfigLoader.get_default('security', 'clear')})\n" +
+        f" (default: {get_default('security', 'clear')})\n" +
         "use -1 to disable"
     )
 
     parser.add_argument(
         "-t", "--timeout",
         help="R|automatically lock the vault after TIMEOUT seconds" +
-        f" (default: {ConfigLoader.get_default('security', 'timeout')})\n" +
+        f" (default: {get_default('security', 'timeout')})\n" +
         "use  0 to lock immediately\n" +
         "use -1 to disable"
     )
@@ -102,7 +145,7 @@ def parse_arguments():
     parser.add_argument(
         "-e", "--enter",
         help="R|action triggered by pressing Enter" +
-        f" (default: {ConfigLoader.get_default('keyboard', 'enter')})\n" +
+        f" (default: {get_default('keyboard', 'enter')})\n" +
         "copy   - copy password to clipboard\n" +
         "all    - auto type username and password\n" +
         "passwd - auto type password\n" +
@@ -114,7 +157,7 @@ def parse_arguments():
     parser.add_argument(
         "-w", "--window-mode",
         help="set the initial window mode" +
-        f" (default: {ConfigLoader.get_default('interface', 'window_mode')})",
+        f" (default: {get_default('interface', 'window_mode')})",
         choices=['uris', 'logins', 'names', 'folders']
     )
 
@@ -124,10 +167,97 @@ def parse_arguments():
         nargs=argparse.REMAINDER
     )
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def parse_command(argv):
+    """Parse the arguments of the headless subcommands using argparse"""
+
+    parser = argparse.ArgumentParser(
+        prog=NAME,
+        description="Query and use vault items without Rofi"
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        '-v', '--verbose',
+        help="increase verbosity level",
+        action='store_true',
+    )
+    common.add_argument(
+        '--no-logging',
+        help="disable logging to file",
+        action="store_true"
+    )
+    common.add_argument(
+        "--log-format",
+        help="write the log file as text or as JSON lines (default: text)",
+        choices=['text', 'json'],
+        default='text'
+    )
+    common.add_argument(
+        "--config",
+        help="use a custom config file path"
+    )
+    common.add_argument(
+        "--no-config",
+        help="ignore config files and use default values",
+        action="store_true"
+    )
+    common.add_argument(
+        "--json",
+        help="print JSON lines instead of tab separated values",
+        action="store_true"
+    )
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser(
+        'query', parents=[common],
+        help="list the items matching every word of the query"
+    )
+    query.add_argument(
+        'text', nargs='+',
+        help="words searched in names, usernames and URIs"
+    )
+    query.add_argument(
+        '-n', '--limit', type=int,
+        help="list at most LIMIT items"
+    )
+
+    helps = {
+        'copy': "copy the password of an item to the clipboard",
+        'type': "auto type the username and password of an item",
+        'totp': "copy the TOTP of an item to the clipboard"
+    }
+    for name, description in helps.items():
+        action = commands.add_parser(name, parents=[common], help=description)
+        target = action.add_mutually_exclusive_group(required=True)
+        target.add_argument(
+            '-m', '--match',
+            help="use the best item matching the query"
+        )
+        target.add_argument(
+            '-i', '--id',
+            help="use the item with the given id"
+        )
+        if name == 'type':
+            action.add_argument(
+                '-p', '--password',
+                help="only type the password",
+                action='store_true'
+            )
+
+    # Options of the interface that are read by ConfigLoader
+    parser.set_defaults(
+        timeout=None, clear=None, enter=None, window_mode=None, cache=None,
+        select_window=False, hide_mesg=False
+    )
+
+    return parser.parse_args(argv)
 
 
 def usage():
     """Custom usage text for help text"""
 
-    return f'''{NAME} [OPTIONS] -- [ROFI OPTIONS]'''
+    return f'''{NAME} [OPTIONS] -- [ROFI OPTIONS]
+       {NAME} {{query,copy,type,totp}} [OPTIONS]'''
@@ -1,113 +1,104 @@
 import os
-import collections
-import pkg_resources
+import json
+import zlib
 
-import yaml
-try:
-    from yaml import CLoader as Loader, CDumper as Dumper
-except ImportError:
-    from yaml import Loader, Dumper
-
-from shutil import copy
+from collections.abc import MutableMapping
+from shutil import copyfile
 
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.defaults import DEFAULT_VALUES, get_default
 from bitwarden_pyro.model.actions import ItemActions, WindowActions
-from bitwarden_pyro.settings import NAME
+from bitwarden_pyro.model.account import Account
+from bitwarden_pyro.resources import resource_filename
+from bitwarden_pyro.settings import NAME, VERSION
+
+
+# Source code adapted from Imran on StackOverflow
+# https://stackoverflow.com/a/6027615
+def flatten_config(config, parent_key='', sep='.'):
+    """Flatten nested config sections into a dict of dotted keys"""
+
+    items = []
+    for key, value in config.items():
+        new_key = parent_key + sep + key if parent_key else key
+        if isinstance(value, MutableMapping):
+            items.extend(flatten_config(value, new_key, sep=sep).items())
+        else:
+            items.append((new_key, value))
+    return dict(items)
 
 
 class ConfigLoader:
-    """Single source of truth for config data, merging default, file and args"""
-
-    _default_values = {
-        'security': {
-            'timeout': 900,  # Session expiry in seconds
-            'clear': 5,  # Clipboard persistency in seconds
-            'cache': 7
-        },
-        'keyboard': {
-            'enter': str(ItemActions.COPY),
-            'type_password': {
-                'key': 'Alt+1',
-                'hint': 'Type password',
-                'show': True
-            },
-            'type_all': {
-                'key': 'Alt+2',
-                'hint': 'Type all',
-                'show': True
-            },
-            'mode_uris': {
-                'key': 'Alt+u',
-                'hint': 'Show URIs',
-                'show': True
-            },
-            'mode_names': {
-                'key': 'Alt+n',
-                'hint': 'Show names',
-                'show': True
-            },
-            'mode_logins': {
-                'key': 'Alt+l',
-                'hint': 'Show logins',
-                'show': True
-            },
-            'mode_folders': {
-                'key': 'Alt+c',
-                'hint': 'Show folders',
-                'show': True
-            },
-            'copy_totp': {
-                'key': 'Alt+t',
-                'hint': 'totp',
-                'show': True
-            },
-            'sync': {
-                'key': 'Alt+r',
-                'hint': 'sync',
-                'show': True
-            }
-        },
-        'autotype': {
-            'select_window': False,
-            'slop_args': '-l -c 0.3,0.4,0.6,0.4 --nodecorations',
-            'start_delay': 1,
-            'tab_delay': 0.2,
-            'delay_notification': True
-        },
-        'interface': {
-            'hide_mesg': False,
-            'window_mode': str(WindowActions.NAMES),
-        }
-    }
+    """Single source of truth for config data, merging default, file and args
+
+    Config data is held as a flat dict of dotted keys, every one of which is
+    converted once to the type of its default value, failing early on
+    invalid values. The values merged from the config file are compiled into
+    a snapshot stored in the cache directory, which is used instead of
+    parsing the file again for as long as its size and modification time,
+    the program version and the default values stay the same.
+    """
+
+    _default_values = flatten_config(DEFAULT_VALUES)
 
     _default_path = f'~/.config/{NAME}/config'
+    _snapshot_path = f'~/.cache/{NAME}/config.json'
+    SNAPSHOT_VERSION = 1
+
+    # Converters of typed getters, such as get_int
+    _converters = {
+        'int': int,
+        'float': float,
+        'boolean': lambda t: str(t).lower() == "true",
+        'windowaction': lambda a: WindowActions[str(a).upper()],
+        'itemaction': lambda a: ItemActions[str(a).upper()],
+        'accounts': Account.parse_list,
+    }
+    # Converters which can't be stored in JSON, and are run on loading
+    _enum_converters = ('windowaction', 'itemaction')
+    # Converters of keys whose default is a string naming an action
+    _action_keys = {
+        'keyboard.enter': 'itemaction',
+        'interface.window_mode': 'windowaction',
+    }
+    _type_converters = {bool: 'boolean', int: 'int', float: 'float'}
 
     def __init__(self, args):
         self._logger = ProjectLogger().get_logger()
-        self._config = None
+        # Raw values as set, and (converter, value) pairs of typed keys
+        self._values = None
+        self._typed = None
 
         self.__init_config(args)
-        self.__init_converters()
 
-    def __init_converters(self):
-        self.add_converter('int', int)
-        self.add_converter('float', float)
-        self.add_converter('boolean', lambda t: str(t).lower() == "true")
-        self.add_converter('windowaction', lambda a: WindowActions[a.upper()])
-        self.add_converter('itemaction', lambda a: ItemActions[a.upper()])
+    @classmethod
+    def __converter_of(cls, key):
+        if key in cls._action_keys:
+            return cls._action_keys[key]
+
+        return cls._type_converters.get(type(cls._default_values[key]))
 
     def __init_config(self, args):
 
-        # Load default values from dict
-        self._config = self._default_values
+        # Start from default values, leaving the defaults untouched
+        self._values = dict(self._default_values)
+        self._typed = {}
 
         # Command line arguments ovewrite default values and those
         # set by config file
+        source = None
         if not args.no_config:
-            self.__from_file(args.config)
+            source = self.__from_file(args.config)
         else:
             self._logger.info("Preventing config file from loading")
 
+        # Keys set by the file have already been converted
+        for key in self._values.keys() - self._typed.keys():
+            self.__convert(key)
+
+        if source is not None:
+            self.__write_snapshot(source)
+
         self.__from_args(args)
 
     def __from_args(self, args):
@@ -128,6 +119,9 @@ class ConfigLoader:
             self.set('interface.hide_mesg', args.hide_mesg)
 
     def __from_file(self, path):
+        """Merge the config file, returning the source to key a new
+        snapshot with, or None if no snapshot has to be written"""
+
         if path is None:
             path = self._default_path
 
@@ -142,68 +136,116 @@ class ConfigLoader:
 
         # If theere is no config file at the location specified
         # create one with default values
-        if not os.path.isfile(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
             self.__copy_config(path)
-        else:
-            with open(path, 'r') as yaml_file:
-                config = yaml.load(yaml_file, Loader=Loader)
-                flat = self.__flatten_config(config)
-                self.__insert_file(flat)
+            return None
+
+        source = [path, stat.st_ino, stat.st_size, stat.st_mtime_ns,
+                  VERSION, self.__defaults_hash()]
+        if self.__read_snapshot(source):
+            return None
+
+        # yaml is only imported when there is a config file to parse
+        import yaml
+        try:
+            from yaml import CLoader as Loader
+        except ImportError:
+            from yaml import Loader
+
+        with open(path, 'r', encoding='utf-8') as yaml_file:
+            config = yaml.load(yaml_file, Loader=Loader)
+            self.__insert_file(flatten_config(config or {}))
+
+        return source
 
     def __insert_file(self, flat):
         for key, value in flat.items():
             self.set(key, value)
 
-    # Source code adapted from Imran on StackOverflow
-    # https://stackoverflow.com/a/6027615
-    def __flatten_config(self, config, parent_key='', sep='.'):
-        items = []
-        for key, value in config.items():
-            new_key = parent_key + sep + key if parent_key else key
-            if isinstance(value, collections.MutableMapping):
-                items.extend(
-                    self.__flatten_config(
-                        value, new_key, sep=sep
-                    ).items()
-                )
-            else:
-                items.append((new_key, value))
-        return dict(items)
+    @classmethod
+    def __defaults_hash(cls):
+        return zlib.crc32(repr(cls._default_values).encode('utf-8'))
+
+    def __read_snapshot(self, source):
+        path = os.path.expanduser(self._snapshot_path)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (IOError, ValueError):
+            return False
+
+        if data.get('version') != self.SNAPSHOT_VERSION \
+                or data.get('source') != source:
+            self._logger.debug("Ignoring config snapshot of another file")
+            return False
+
+        self._logger.debug("Using config snapshot from %s", path)
+        self._values.update(data['values'])
+        for key, (name, value) in data['typed'].items():
+            if name in self._enum_converters:
+                value = self._converters[name](value)
+            self._typed[key] = (name, value)
+
+        return True
+
+    def __write_snapshot(self, source):
+        typed = {
+            key: (name, str(value) if name in self._enum_converters
+                  else value)
+            for key, (name, value) in self._typed.items()
+        }
+
+        try:
+            path = os.path.expanduser(self._snapshot_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'w') as file:
+                json.dump({
+                    'version': self.SNAPSHOT_VERSION,
+                    'source': source,
+                    'values': self._values,
+                    'typed': typed,
+                }, file)
+            os.replace(tmp_path, path)
+        except IOError:
+            self._logger.warning("Failed to write config snapshot")
 
     def __copy_config(self, path):
         try:
             self._logger.debug("Copying default config")
 
-            source = pkg_resources.resource_filename(
-                'bitwarden_pyro.resources', 'config'
-            )
+            source = resource_filename('config')
 
             dirname = os.path.dirname(path)
             if not os.path.isdir(dirname):
                 os.makedirs(dirname)
 
-            copy(source, path)
-        except IOError:
-            raise ConfigException("Failed to copy default config")
-
-    def __create_config(self, path):
-        """DEPRECATED! Use __copy_config instead"""
-
-        self._logger.debug("Creating new config from defaults")
+            copyfile(source, path)
+        except IOError as err:
+            raise ConfigException("Failed to copy default config") from err
 
-        dirname = os.path.dirname(path)
-        if not os.path.isdir(dirname):
-            os.makedirs(dirname)
+    def __convert(self, key):
+        name = self.__converter_of(key)
+        if name is None:
+            return
 
-        with open(path, 'w') as file:
-            yaml.dump(self._config, file, Dumper=Dumper)
+        raw = self._values[key]
+        try:
+            self._typed[key] = (name, self._converters[name](raw))
+        except (ValueError, KeyError) as err:
+            raise ConfigException(
+                f"Config key '{key}' has an invalid value '{raw}'"
+            ) from err
 
     def dump(self):
         """Flatten and convert to string all config data"""
 
-        flat = self.__flatten_config(self._config)
         lines = []
-        for key, value in flat.items():
+        for key, value in self._values.items():
             lines.append(f"{key}={value}")
 
         return "\n".join(lines)
@@ -211,54 +253,63 @@ class ConfigLoader:
     def get(self, key):
         """Retrieve value of a single config key"""
 
-        path = key.split('.')
-        option = self._config.get(path[0])
-        for idx, section in enumerate(path[1:]):
-            if option is None:
-                missing_path = ".".join(path[:idx])
-                raise ConfigException(
-                    f"Config key {missing_path} could not be found"
-                )
-
-            option = option.get(section)
-
-        return option
+        try:
+            return self._values[key]
+        except KeyError as err:
+            raise ConfigException(
+                f"Config key {key} could not be found"
+            ) from err
 
     def set(self, key, value):
         """Set the value of a single config key"""
 
-        path = key.split('.')
-
         # Test to see if the key is valid
-        current = self.get(key)
-        if current is None:
+        if key not in self._values:
             raise ConfigException(f"Config key could not be set '{key}'")
 
-        option = self._config.get(path[0])
-        for section in path[1:-1]:
-            option = option.get(section)
-
         if not isinstance(value, str):
             value = str(value)
 
-        option[path[-1]] = value
+        self._values[key] = value
+        self.__convert(key)
 
-    def add_converter(self, name, converter):
-        """Dynamically generate a getter method using a custom converter"""
+    @classmethod
+    def add_converter(cls, name, converter):
+        """Dynamically generate a getter method using a custom converter
+
+        Getters return the value converted when it was set if the key has
+        the type of the converter, and convert the raw value otherwise.
+        """
 
         def getter(self, key):
+            typed = self._typed.get(key)  # pylint: disable=protected-access
+            if typed is not None and typed[0] == name:
+                return typed[1]
+
             raw = self.get(key)
-            return converter(raw)
+            try:
+                return converter(raw)
+            except (ValueError, KeyError) as err:
+                raise ConfigException(
+                    f"Config key '{key}' has an invalid value '{raw}'"
+                ) from err
 
         getter.__name__ = f"get_{name}"
-        setattr(self.__class__, getter.__name__, getter)
+        setattr(cls, getter.__name__, getter)
+        cls._converters[name] = converter
 
     @staticmethod
     def get_default(section, option):
         """Get the default value of a config key"""
 
-        return ConfigLoader._default_values.get(section).get(option)
+        return get_default(section, option)
 
 
 class ConfigException(Exception):
     """Base class for exceptions thrown by ConfigLoader"""
+
+
+# Getters are installed once, instead of on every instance
+# pylint: disable-next=protected-access
+for _name, _converter in list(ConfigLoader._converters.items()):
+    ConfigLoader.add_converter(_name, _converter)
@@ -0,0 +1,86 @@
+from bitwarden_pyro.model.actions import ItemActions, WindowActions
+
+
+# Default values of all config keys, kept apart from ConfigLoader so that
+# they can be read without importing yaml
+DEFAULT_VALUES = {
+    'security': {
+        'timeout': 900,  # Session expiry in seconds
+        'clear': 5,  # Clipboard persistency in seconds
+        'cache': 7,
+        'max_staleness': 0,  # Age in days of the oldest items shown
+        'keyring': 'auto',
+        'totp_timeout': 300,  # TOTP secret persistency in seconds
+        'totp_min_validity': 5
+    },
+    'keyboard': {
+        'enter': str(ItemActions.COPY),
+        'adaptive_enter': False,
+        'type_password': {
+            'key': 'Alt+1',
+            'hint': 'Type password',
+            'show': True
+        },
+        'type_all': {
+            'key': 'Alt+2',
+            'hint': 'Type all',
+            'show': True
+        },
+        'mode_uris': {
+            'key': 'Alt+u',
+            'hint': 'Show URIs',
+            'show': True
+        },
+        'mode_names': {
+            'key': 'Alt+n',
+            'hint': 'Show names',
+            'show': True
+        },
+        'mode_logins': {
+            'key': 'Alt+l',
+            'hint': 'Show logins',
+            'show': True
+        },
+        'mode_folders': {
+            'key': 'Alt+c',
+            'hint': 'Show folders',
+            'show': True
+        },
+        'copy_totp': {
+            'key': 'Alt+t',
+            'hint': 'totp',
+            'show': True
+        },
+        'sync': {
+            'key': 'Alt+r',
+            'hint': 'sync',
+            'show': True
+        }
+    },
+    'autotype': {
+        'select_window': False,
+        'slop_args': '-l -c 0.3,0.4,0.6,0.4 --nodecorations',
+        'start_delay': 1,
+        'tab_delay': 0.2,
+        'delay_notification': True,
+        'sequence': '{USERNAME}{TAB}{PASSWORD}',
+        'sequence_field': 'autotype'
+    },
+    'interface': {
+        'hide_mesg': False,
+        'window_mode': str(WindowActions.NAMES),
+        'frecency': True
+    },
+    'vault': {
+        'serve': False,
+        'serve_address': '',
+        'prefetch': 0,
+        'accounts': ''
+    }
+}
+
+
+def get_default(section, option):
+    """Get the default value of a config key"""
+
+    return DEFAULT_VALUES.get(section).get(option)
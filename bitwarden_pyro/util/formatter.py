@@ -1,3 +1,6 @@
+from bitwarden_pyro.model.item import ItemRecord
+
+
 class ItemFormatter:
     """Formatter converting bw item lists to lists of strings for Rofi"""
 
@@ -9,13 +12,18 @@ class ItemFormatter:
 
         unique = {}
         for item in items:
-            arr = unique.get(item['name'], [])
-            arr.append(item)
-            unique[item['name']] = arr
+            unique[item['name']] = unique.get(item['name'], 0) + 1
+
+        return ItemFormatter.grouped_format(unique)
+
+    @staticmethod
+    def grouped_format(groups):
+        """Return a list of names from a mapping of names to item counts,
+        marking names shared by multiple items"""
 
         strings = []
-        for name, arr in unique.items():
-            if len(arr) == 1:
+        for name, count in groups.items():
+            if count == 1:
                 strings.append(name)
             else:
                 strings.append(
@@ -26,20 +34,44 @@ class ItemFormatter:
     @staticmethod
     def group_format(items, converter):
         """
-        Return a list of numbered items transformed by a converter
+        Return the positions of the listed items and a list of
+        numbered items transformed by a converter
         """
 
         strings = []
-        indexed = []
+        positions = []
         index = 1
-        for item in items:
+        for position, item in enumerate(items):
             name = converter(item)
             if name is not None:
-                indexed.append(item)
-                strings.append(f"#{index}: {converter(item)}")
+                positions.append(position)
+                strings.append(f"#{index}: {name}")
                 index += 1
 
-        return (indexed, '\n'.join(strings))
+        return (positions, '\n'.join(strings))
+
+    @staticmethod
+    def ranked_format(payload, offsets, rows):
+        """
+        Yield the rows of a rendered menu, starting with the given rows
+        in order and followed by all other rows in their original order
+
+        Rows are sliced out of the payload, which has to end with a
+        newline, rather than being formatted again.
+        """
+
+        view = memoryview(payload)
+        for row in rows:
+            yield view[offsets[row]:offsets[row + 1]]
+
+        start = 0
+        for row in sorted(rows):
+            if offsets[row] > start:
+                yield view[start:offsets[row]]
+            start = offsets[row + 1]
+
+        if start < len(view):
+            yield view[start:]
 
 
 def create_converter(fields, ignore=None, delim=": ", delim2=","):
@@ -47,18 +79,11 @@ def create_converter(fields, ignore=None, delim=": ", delim2=","):
     def converter(item):
         values = []
         for field in fields:
-            hierarchy = field.split(".")
-            value = item.get(hierarchy[0])
-            for level in hierarchy[1:]:
-                if value is None:
-                    break
-                if isinstance(value, list):
-                    for idx, elem in enumerate(value):
-                        value[idx] = elem.get(level)
-                else:
-                    value = value.get(level)
-                    if isinstance(value, list):
-                        value = list(value)
+            if isinstance(item, ItemRecord) and field in ItemRecord.PATHS:
+                # Records read their fields without building nested dicts
+                value = item.value(field)
+            else:
+                value = walk(item, field)
 
             if value is None:
                 value = 'None'
@@ -81,3 +106,23 @@ def create_converter(fields, ignore=None, delim=": ", delim2=","):
         return delim.join(values)
 
     return converter
+
+
+def walk(item, field):
+    """Return the value of a dotted field path of a bw item, with the
+    values of all elements of lists along the path"""
+
+    hierarchy = field.split(".")
+    value = item.get(hierarchy[0])
+    for level in hierarchy[1:]:
+        if value is None:
+            break
+        if isinstance(value, list):
+            # Build a new list, leaving the item untouched
+            value = [elem.get(level) for elem in value]
+        else:
+            value = value.get(level)
+            if isinstance(value, list):
+                value = list(value)
+
+    return value
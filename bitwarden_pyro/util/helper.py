@@ -0,0 +1,39 @@
+import os
+import sys
+import json
+import subprocess as sp
+
+import bitwarden_pyro
+
+from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
+
+
+def spawn_helper(module, request, name):
+    """Start a module in a helper process detached from the launch
+
+    The request is written as a JSON line to the stdin of the helper, so
+    that secrets it holds never show up in its arguments or environment.
+    Returns the process, or None when the helper exited before reading it.
+    """
+
+    # Make the package importable when it is not installed
+    path = os.path.dirname(os.path.dirname(bitwarden_pyro.__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, (path, os.environ.get('PYTHONPATH')))
+    ))
+
+    proc = Tracer().popen(
+        [sys.executable, '-m', module], name=name,
+        stdin=sp.PIPE, stdout=sp.DEVNULL, stderr=sp.DEVNULL,
+        env=env, start_new_session=True
+    )
+    try:
+        proc.stdin.write(json.dumps(request).encode('utf-8') + b'\n')
+        proc.stdin.close()
+    except BrokenPipeError:
+        ProjectLogger().get_logger().warning("%s exited early",
+                                             name.capitalize())
+        return None
+
+    return proc
@@ -0,0 +1,123 @@
+import os
+import json
+import stat
+import socket
+import struct
+
+from bitwarden_pyro.settings import NAME
+
+
+# Environment variables forwarded to the daemon, so that the processes it
+# spawns on behalf of the client reach the same desktop session
+FORWARDED_ENV = ('DISPLAY', 'WAYLAND_DISPLAY', 'XAUTHORITY',
+                 'XDG_SESSION_TYPE', 'DBUS_SESSION_BUS_ADDRESS')
+
+
+def runtime_dir():
+    """Return the per-user directory holding the sockets of bwpyro"""
+
+    path = os.getenv('XDG_RUNTIME_DIR')
+    if path is None or not os.path.isdir(path):
+        path = os.path.join('/tmp', f'{NAME}-{os.getuid()}')
+
+    return path
+
+
+def socket_path():
+    """Return the path of the per-user socket used by the daemon"""
+
+    return os.path.join(runtime_dir(), f'{NAME}.sock')
+
+
+def peer_uid(sock):
+    """Return the user id of the process at the other end of a connected
+    Unix socket"""
+
+    fmt = '3i'  # struct ucred: pid, uid, gid
+    creds = sock.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize(fmt)
+    )
+    _, uid, _ = struct.unpack(fmt, creds)
+    return uid
+
+
+def check_private_dir(path):
+    """Make sure that only the user can reach the sockets of a directory
+
+    Raises:
+        UnsafeDirectoryException: The directory is missing, a symlink,
+            owned by another user or accessible to other users
+    """
+
+    try:
+        info = os.lstat(path)
+    except OSError as err:
+        raise UnsafeDirectoryException(f"Can't access {path}") from err
+
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() \
+            or stat.S_IMODE(info.st_mode) & 0o077:
+        raise UnsafeDirectoryException(
+            f"{path} must be a directory owned by the user with mode 0700"
+        )
+
+
+class DaemonClient:
+    """Thin client forwarding requests to a running daemon"""
+
+    def __init__(self, path=None):
+        self._path = path if path is not None else socket_path()
+
+    def request(self, command, **payload):
+        """Send a single request and wait for the daemon's reply
+
+        Raises:
+            DaemonUnavailableException: No daemon of the user is listening
+                on the socket, the request was never sent
+            DaemonReplyException: The daemon received the request but
+                failed to reply to it
+        """
+
+        payload['command'] = command
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                check_private_dir(os.path.dirname(self._path))
+                sock.connect(self._path)
+            except (OSError, UnsafeDirectoryException) as err:
+                raise DaemonUnavailableException(
+                    f"No daemon is listening on {self._path}"
+                ) from err
+
+            try:
+                sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+                with sock.makefile('rb') as stream:
+                    line = stream.readline()
+                if not line:
+                    raise DaemonReplyException("Daemon closed the connection")
+
+                return json.loads(line)
+            except (OSError, ValueError) as err:
+                raise DaemonReplyException(
+                    "Daemon failed to reply to the request"
+                ) from err
+
+    def launch(self, argv):
+        """Ask the daemon to run a launch with the given arguments"""
+
+        env = {k: os.environ[k] for k in FORWARDED_ENV if k in os.environ}
+        return self.request('launch', argv=argv, env=env)
+
+
+class IpcException(Exception):
+    """Base exception raised when talking to the daemon"""
+
+
+class UnsafeDirectoryException(IpcException):
+    """Raised when the directory of a socket may be reached by other users"""
+
+
+class DaemonUnavailableException(IpcException):
+    """Raised when no daemon is listening for requests"""
+
+
+class DaemonReplyException(IpcException):
+    """Raised when a daemon received a request but didn't reply to it"""
@@ -1,7 +1,13 @@
-import logging
 import os
+import copy
+import json
+import queue
+import atexit
+import logging
 
-from logging.handlers import RotatingFileHandler
+from logging.handlers import (
+    RotatingFileHandler, QueueHandler, QueueListener
+)
 
 from bitwarden_pyro.settings import NAME
 
@@ -36,36 +42,106 @@ class NoTraceFormatter(logging.Formatter):
         return string
 
 
+class JsonFormatter(logging.Formatter):
+    """Logging formatter writing every record as a single JSON object
+
+    Records logged with an 'event' dict in their extra arguments carry it
+    as is, such as {'type': 'process', 'name': 'rofi', 'duration_ms': 4.2,
+    'exit_code': 0} for spawned processes, or {'type': 'startup', ...} for
+    the timings of the startup stages.
+    """
+
+    def format(self, record):
+        data = {
+            'time': round(record.created, 6),
+            'level': record.levelname,
+            'pid': record.process,
+            'thread': record.threadName,
+            'source': f'{record.filename}:{record.lineno}',
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['error'] = {
+                'type': record.exc_info[0].__name__,
+                'message': str(record.exc_info[1]),
+            }
+        event = getattr(record, 'event', None)
+        if event is not None:
+            data['event'] = event
+
+        return json.dumps(data, default=str)
+
+
+class LogFileHandler(RotatingFileHandler):
+    """Rotating file handler creating its directory when first writing"""
+
+    def __init__(self, path):
+        super().__init__(
+            path,
+            maxBytes=1024000,  # 1 MB
+            backupCount=3,
+            delay=True
+        )
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class BackgroundHandler(QueueHandler):
+    """Queue records for a listener thread writing them
+
+    Records never leave the process, so only their message is merged with
+    its arguments, which could be changed before the record is written,
+    and exception info is kept for the formatter of the file.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
 class ProjectLogger(metaclass=SingletonType):
-    """Single logger object handling printing for project"""
+    """Single logger object handling printing for project
+
+    Records are written to the log file by a background thread, so that
+    launches never wait on the disk, and the thread writes every queued
+    record before the process exits.
+    """
 
     _logger = None
 
-    def __init__(self, verbose=None, file_logging=True):
+    FORMATS = ('text', 'json')
+
+    def __init__(self, verbose=None, file_logging=True, log_format='text'):
         self._logger = logging.getLogger(NAME)
         self._logger.setLevel(logging.DEBUG)
-
-        path = os.path.expanduser(f'~/.cache/{NAME}/{NAME}.log')
-        dirname = os.path.dirname(path)
-        if not os.path.isdir(dirname):
-            os.makedirs(dirname)
+        self._listener = None
+        self._queue_handler = None
 
         if file_logging:
             # create file handler which logs even debug messages
-            file_handler = RotatingFileHandler(
-                path,
-                maxBytes=1024000,  # 1 MB
-                backupCount=3
-            )
+            if log_format == 'json':
+                path = os.path.expanduser(f'~/.cache/{NAME}/{NAME}.jsonl')
+                file_formatter = JsonFormatter()
+            else:
+                path = os.path.expanduser(f'~/.cache/{NAME}/{NAME}.log')
+                file_formatter = NoTraceFormatter(
+                    '%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] - %(message)s'
+                )
+
+            file_handler = LogFileHandler(path)
             file_handler.setLevel(logging.DEBUG)
-
-            # create formatter and add it to the handlers
-            file_formatter = NoTraceFormatter(
-                '%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] - %(message)s'
-            )
-
             file_handler.setFormatter(file_formatter)
-            self._logger.addHandler(file_handler)
+
+            records = queue.SimpleQueue()
+            self._listener = QueueListener(records, file_handler)
+            self._listener.start()
+            atexit.register(self.flush)
+            self._queue_handler = BackgroundHandler(records)
+            self._logger.addHandler(self._queue_handler)
 
         # create console handler with a higher log level
         console_handler = logging.StreamHandler()
@@ -84,3 +160,13 @@ class ProjectLogger(metaclass=SingletonType):
         """Return the Python logger object"""
 
         return self._logger
+
+    def flush(self):
+        """Write all queued records and stop the background thread"""
+
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            self._logger.removeHandler(self._queue_handler)
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
@@ -0,0 +1,49 @@
+import gc
+import threading
+
+from contextlib import contextmanager
+
+
+_pause_lock = threading.Lock()
+# Number of blocks pausing the collector, and whether it was enabled
+# before the first of them
+_pause_state = [0, False]
+
+
+@contextmanager
+def paused_gc():
+    """Disable the cyclic garbage collector in the enclosed block
+
+    Creating many containers, such as when parsing the items listed by bw,
+    triggers a collection every few hundred allocations, each of which
+    traverses all objects created so far. None of these objects are
+    garbage yet, so collecting is deferred until the block is left.
+    Blocks can be nested and run by several threads at once, in which case
+    the collector is enabled again when the last of them is left.
+    """
+
+    with _pause_lock:
+        if _pause_state[0] == 0:
+            _pause_state[1] = gc.isenabled()
+            gc.disable()
+        _pause_state[0] += 1
+    try:
+        yield
+    finally:
+        with _pause_lock:
+            _pause_state[0] -= 1
+            if _pause_state[0] == 0 and _pause_state[1]:
+                gc.enable()
+
+
+def freeze_heap():
+    """Exclude all objects alive so far from later collections
+
+    Modules, config and items loaded during startup stay alive for the
+    whole process, so later collections don't traverse them again. Frozen
+    objects are still freed once they are no longer referenced, unless
+    they are part of a reference cycle, so long running processes that
+    replace what they loaded must not freeze it.
+    """
+
+    gc.freeze()
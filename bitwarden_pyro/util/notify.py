@@ -1,10 +1,10 @@
 from subprocess import CalledProcessError
 
-import subprocess as sp
 import os
-import pkg_resources
 
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
+from bitwarden_pyro.resources import resource_filename
 
 
 class Notify:
@@ -22,9 +22,7 @@ class Notify:
                     return icon
 
         # Use internal fallback icon
-        path = pkg_resources.resource_filename(
-            'bitwarden_pyro.resources', 'icon.svg'
-        )
+        path = resource_filename('icon.svg')
         self._logger.debug("Using fallback icon: %s", path)
         return path
 
@@ -41,9 +39,11 @@ class Notify:
             if self._icon is not None:
                 cmd.extend(['--icon', self._icon])
 
-            sp.run(cmd, check=True, capture_output=True)
-        except CalledProcessError:
-            raise NotifyException("Failed to send notification message")
+            Tracer().run(cmd, check=True, capture_output=True)
+        except CalledProcessError as err:
+            raise NotifyException(
+                "Failed to send notification message"
+            ) from err
 
 
 class NotifyException(Exception):
@@ -0,0 +1,79 @@
+import sys
+import subprocess as sp
+
+from collections import namedtuple
+
+
+ImportCost = namedtuple("ImportCost", "module self_us cumulative_us")
+
+REPORT_ARG = '--startup-report'
+REPORT_LIMIT = 40
+
+
+def parse_importtime(lines):
+    """Split the output of -X importtime into costs and other lines"""
+
+    costs = []
+    others = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            others.append(line)
+            continue
+
+        fields = line[len('import time:'):].split('|')
+        try:
+            costs.append(ImportCost(
+                fields[2].strip(), int(fields[0]), int(fields[1])
+            ))
+        except (IndexError, ValueError):
+            # Skip the header line of the report
+            continue
+
+    return costs, others
+
+
+def format_report(argv, costs, limit=REPORT_LIMIT):
+    """Format import costs as a table sorted by self time"""
+
+    total = sum(c.self_us for c in costs)
+    lines = [
+        f"Startup imports for: bwpyro {' '.join(argv)}".rstrip(),
+        f"{'self ms':>9} {'cumul ms':>9}  module"
+    ]
+
+    ordered = sorted(costs, key=lambda c: c.self_us, reverse=True)
+    for cost in ordered[:limit]:
+        lines.append(
+            f"{cost.self_us / 1000:>9.2f} {cost.cumulative_us / 1000:>9.2f}"
+            f"  {cost.module}"
+        )
+
+    if len(ordered) > limit:
+        lines.append(f"{'':>20}  ... {len(ordered) - limit} more modules")
+
+    lines.append(f"Total: {total / 1000:.2f} ms across {len(costs)} modules")
+    return "\n".join(lines)
+
+
+def report(argv):
+    """Run a launch with the given arguments and print its import costs
+
+    Returns:
+        The exit code of the measured launch
+    """
+
+    argv = list(argv)
+    if REPORT_ARG in argv:
+        argv.remove(REPORT_ARG)
+
+    cmd = [sys.executable, '-X', 'importtime', '-m', 'bitwarden_pyro', *argv]
+    proc = sp.run(cmd, stderr=sp.PIPE, check=False)
+
+    costs, others = parse_importtime(
+        proc.stderr.decode('utf-8', 'replace').splitlines()
+    )
+    for line in others:
+        print(line, file=sys.stderr)
+
+    print(format_report(argv, costs))
+    return proc.returncode
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import resource
+import threading
+import subprocess as sp
+
+from contextlib import contextmanager
+
+from bitwarden_pyro.util.logger import ProjectLogger, SingletonType
+
+
+class Tracer(metaclass=SingletonType):
+    """Record spans of the work done during a launch
+
+    Spans of Python stages and of spawned child processes are kept in
+    memory and can be saved in the Chrome trace event format, which can be
+    opened with chrome://tracing or Perfetto. Only the names of spawned
+    executables are recorded, never their arguments, as these can contain
+    secrets. Recording is disabled until enable is called.
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._logger = ProjectLogger().get_logger()
+
+    def enable(self):
+        """Start recording spans"""
+
+        self._enabled = True
+
+    def is_enabled(self):
+        """Return true if spans are being recorded"""
+
+        return self._enabled
+
+    @contextmanager
+    def span(self, name, category='stage', **args):
+        """Record the duration and CPU time of the enclosed block
+
+        The yielded dict holds the arguments stored with the span, and can
+        be extended by the enclosed block.
+        """
+
+        if not self._enabled:
+            yield args
+            return
+
+        who = resource.RUSAGE_CHILDREN if category == 'process' \
+            else resource.RUSAGE_SELF
+        usage = resource.getrusage(who)
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter_ns()
+            after = resource.getrusage(who)
+            args['utime_ms'] = round((after.ru_utime - usage.ru_utime) * 1000, 3)
+            args['stime_ms'] = round((after.ru_stime - usage.ru_stime) * 1000, 3)
+            args['maxrss_kb'] = after.ru_maxrss
+            self.__add({
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': (start - self._origin) / 1000,
+                'dur': (end - start) / 1000,
+                'args': args
+            })
+
+    def run(self, cmd, name=None, check=False, **kwargs):
+        """Run a command like subprocess.run, recording it as a span
+
+        Every run is logged as a process event as well, which the JSON
+        lines log format keeps as structured data.
+        """
+
+        name = name or os.path.basename(cmd[0])
+        start = time.perf_counter_ns()
+        exit_code = None
+        with self.span(name, 'process') as args:
+            try:
+                proc = sp.run(cmd, check=check, **kwargs)
+                exit_code = proc.returncode
+            except sp.CalledProcessError as exc:
+                exit_code = exc.returncode
+                raise
+            finally:
+                args['exit_code'] = exit_code
+                self.__log_process(name, start, exit_code)
+            return proc
+
+    def __log_process(self, name, start, exit_code):
+        duration = round((time.perf_counter_ns() - start) / 1e6, 3)
+        self._logger.debug(
+            "Process %s exited with %s after %.1f ms",
+            name, exit_code, duration,
+            extra={'event': {
+                'type': 'process', 'name': name, 'duration_ms': duration,
+                'exit_code': exit_code
+            }}
+        )
+
+    def check_output(self, cmd, name=None, **kwargs):
+        """Run a command like subprocess.check_output, recording a span"""
+
+        return self.run(
+            cmd, name, check=True, stdout=sp.PIPE, **kwargs
+        ).stdout
+
+    def popen(self, cmd, name=None, **kwargs):
+        """Start a command like subprocess.Popen, recording an instant event
+
+        The process is not waited for, so only its start is recorded.
+        """
+
+        name = name or os.path.basename(cmd[0])
+        proc = sp.Popen(cmd, **kwargs)
+        self._logger.debug(
+            "Process %s started with pid %d", name, proc.pid,
+            extra={'event': {'type': 'spawn', 'name': name, 'pid': proc.pid}}
+        )
+        if self._enabled:
+            self.__add({
+                'name': name, 'cat': 'process',
+                'ph': 'i', 's': 't',
+                'ts': (time.perf_counter_ns() - self._origin) / 1000,
+                'args': {'pid': proc.pid}
+            })
+        return proc
+
+    def __add(self, event):
+        event['pid'] = os.getpid()
+        event['tid'] = threading.get_ident()
+        with self._lock:
+            self._events.append(event)
+
+    def save(self, path):
+        """Write all recorded spans to a Chrome trace event file"""
+
+        with self._lock:
+            events = list(self._events)
+
+        pid = os.getpid()
+        events.append({
+            'name': 'process_name', 'ph': 'M', 'pid': pid,
+            'args': {'name': 'bwpyro'}
+        })
+
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'traceEvents': events, 'displayTimeUnit': 'ms'}, file
+                )
+            self._logger.info("Saved %d trace events to %s",
+                              len(events) - 1, path)
+        except IOError as err:
+            raise TraceException(f"Failed to write trace to {path}") from err
+
+
+class TraceException(Exception):
+    """Raised when recorded spans could not be saved"""
@@ -1,8 +1,10 @@
 import subprocess as sp
+import threading
 from subprocess import CalledProcessError
 from collections import namedtuple
 
 from bitwarden_pyro.util.logger import ProjectLogger
+from bitwarden_pyro.util.trace import Tracer
 
 
 Keybind = namedtuple("Kebind", "key event message show")
@@ -11,6 +13,11 @@ Keybind = namedtuple("Kebind", "key event message show")
 class Rofi:
     """Start and retrieve results from Rofi windows"""
 
+    # Number of entries Rofi reads before showing the window
+    PRE_READ = 25
+    # Size in bytes of the chunks written to the input of Rofi
+    CHUNK_SIZE = 65536
+
     def __init__(self, args, enter_event, hide_mesg):
         self._logger = ProjectLogger().get_logger()
         self._keybinds = {}
@@ -18,6 +25,8 @@ class Rofi:
         self._enter_event = enter_event
         self._hide_mesg = hide_mesg
         self._keybinds_code = 10
+        # Whether the last selection has been made by pressing Enter
+        self.entered = False
 
         if len(args) > 0:
             self._logger.debug("Setting rofi arguments: %s", self._args)
@@ -58,20 +67,21 @@ class Rofi:
         )
         self._keybinds_code += 1
 
-    def get_password(self):
+    def get_password(self, prompt="Master Password"):
         """Launch a window requesting a password"""
 
         try:
             self._logger.info("Launching rofi password prompt")
             cmd = [
-                "rofi", "-dmenu", "-p", "Master Password",
+                "rofi", "-dmenu", "-p", prompt,
                 "-password", "-lines", "0"
             ]
 
             if len(self._args) > 0:
                 cmd.extend(self._args)
 
-            proc = sp.run(cmd, check=True, capture_output=True)
+            proc = Tracer().run(cmd, name='rofi password',
+                                check=True, capture_output=True)
             return proc.stdout.decode("utf-8").strip()
         except CalledProcessError:
             self._logger.info("Password prompt has been closed")
@@ -87,45 +97,106 @@ class Rofi:
             if len(self._args) > 0:
                 cmd.extend(self._args)
 
-            sp.run(cmd, capture_output=True, check=True)
-        except CalledProcessError:
-            raise RofiException("Rofi failed to display error message")
+            Tracer().run(cmd, name='rofi error',
+                         capture_output=True, check=True)
+        except CalledProcessError as err:
+            raise RofiException(
+                "Rofi failed to display error message"
+            ) from err
 
     def show_items(self, items, prompt='Bitwarden'):
-        """Show a list of items and return the selectem item and action"""
-
-        try:
-            self._logger.info("Launching rofi login select")
-            echo_cmd = ["echo", items]
-            rofi_cmd = self.__extend_command([
-                "rofi", "-dmenu", "-p", prompt, "-i", "-no-custom"
-            ])
-
-            echo_proc = sp.Popen(echo_cmd, stdout=sp.PIPE)
-            rofi_proc = sp.run(
-                rofi_cmd, stdin=echo_proc.stdout, stdout=sp.PIPE, check=False
+        """Show a list of items and return the selectem item and action
+
+        Args:
+            items: Newline separated entries as bytes or a string, or an
+                iterable yielding one entry at a time as a string, or
+                newline terminated rows as bytes
+            prompt: Text shown next to the input field
+        """
+
+        self._logger.info("Launching rofi login select")
+        rofi_cmd = self.__extend_command([
+            "rofi", "-dmenu", "-p", prompt, "-i", "-no-custom",
+            "-async-pre-read", str(self.PRE_READ)
+        ])
+
+        with Tracer().span('rofi', 'process') as span:
+            rofi_proc = sp.Popen(rofi_cmd, stdin=sp.PIPE, stdout=sp.PIPE)
+
+            # Entries are written from a separate thread, so that Rofi can
+            # show the first ones while the rest are still being produced
+            writer = threading.Thread(
+                target=self.__write_entries,
+                args=(rofi_proc.stdin, items),
+                daemon=True
             )
+            writer.start()
 
-            return_code = rofi_proc.returncode
-            selected = rofi_proc.stdout.decode("utf-8").strip()
-            # Clean exit
-            if return_code == 1:
-                return None, None
-            # Selected item by enter
-            if return_code == 0:
-                return selected, self._enter_event
-            # Selected item using custom keybind
-            if return_code in self._keybinds:
-                return selected, self._keybinds.get(return_code).event
-
-            self._logger.warning(
-                "Unknown return code has been received: %s", return_code
-            )
+            output = rofi_proc.stdout.read()
+            return_code = rofi_proc.wait()
+            writer.join()
+            span['exit_code'] = return_code
+
+        self.entered = return_code == 0
+        selected = output.decode("utf-8").strip()
+        # Clean exit
+        if return_code == 1:
             return None, None
+        # Selected item by enter
+        if return_code == 0:
+            return selected, self._enter_event
+        # Selected item using custom keybind
+        if return_code in self._keybinds:
+            return selected, self._keybinds.get(return_code).event
+
+        self._logger.warning(
+            "Unknown return code has been received: %s", return_code
+        )
+        return None, None
 
-        except CalledProcessError:
-            self._logger.info("Login select has been closed")
-            return None
+    def __write_entries(self, stream, items):
+        try:
+            for chunk in self.__chunks(items):
+                stream.write(chunk)
+        except BrokenPipeError:
+            # Rofi has exited before reading all entries
+            self._logger.debug("Rofi closed its input early")
+        finally:
+            try:
+                stream.close()
+            except BrokenPipeError:
+                pass
+
+    @classmethod
+    def __chunks(cls, items):
+        """Yield entries in chunks of bounded size, ending with a newline"""
+
+        if isinstance(items, str):
+            items = items.encode("utf-8")
+
+        if isinstance(items, (bytes, bytearray, memoryview)):
+            # Slices of a memoryview don't copy the underlying payload
+            view = memoryview(items)
+            for start in range(0, len(view), cls.CHUNK_SIZE):
+                yield view[start:start + cls.CHUNK_SIZE]
+            if len(view) > 0 and view[-1] != ord("\n"):
+                yield b"\n"
+            return
+
+        batch, size = [], 0
+        for entry in items:
+            # Strings are single entries, while bytes already hold whole
+            # newline terminated rows
+            line = entry.encode("utf-8") + b"\n" \
+                if isinstance(entry, str) else entry
+            batch.append(line)
+            size += len(line)
+            if size >= cls.CHUNK_SIZE:
+                yield b"".join(batch)
+                batch, size = [], 0
+
+        if batch:
+            yield b"".join(batch)
 
 
 class RofiException(Exception):
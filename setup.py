@@ -16,9 +16,11 @@ setuptools.setup(name='bitwarden_pyro',
                  zip_safe=False,
                  include_package_data=True,
                  install_requires=['pyyaml'],
-                 packages=setuptools.find_packages(),
+                 packages=setuptools.find_packages(
+                     exclude=['tests', 'tests.*']
+                 ),
                  entry_points={
                      'console_scripts': [
-                         f'{NAME}=bitwarden_pyro.bwpyro:run',
+                         f'{NAME}=bitwarden_pyro.client:run',
                      ]
                  })
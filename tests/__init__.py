@@ -0,0 +1,5 @@
+from bitwarden_pyro.util.logger import ProjectLogger
+
+# The logger is a singleton, so creating it first keeps the code under
+# test from writing to the log file below the home directory
+ProjectLogger(file_logging=False)
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+
+def make_item(item_id, name, folder_id=None, username=None, uris=(),
+              revision='2020-01-01T00:00:00.000Z'):
+    """Return an item shaped like the output of bw list items"""
+
+    item = {
+        'id': item_id,
+        'name': name,
+        'folderId': folder_id,
+        'revisionDate': revision,
+        'type': 1,
+    }
+    if username is not None or uris:
+        item['login'] = {
+            'username': username,
+            'password': f'{name}-password',
+            'uris': [{'uri': uri, 'match': None} for uri in uris],
+        }
+
+    return item
+
+
+class HomeTestCase(unittest.TestCase):
+    """Test case running with a temporary home directory, so that caches
+    and other files written below ~ are discarded afterwards"""
+
+    def setUp(self):
+        super().setUp()
+        self._home = tempfile.TemporaryDirectory()
+        self.home = self._home.name
+
+        previous = os.environ.get('HOME')
+        os.environ['HOME'] = self.home
+        self.addCleanup(self.__restore, previous)
+        self.addCleanup(self._home.cleanup)
+
+    @staticmethod
+    def __restore(previous):
+        if previous is None:
+            os.environ.pop('HOME', None)
+        else:
+            os.environ['HOME'] = previous
@@ -0,0 +1,114 @@
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro.controller import autotype
+from bitwarden_pyro.controller.autotype import (
+    AutoType, Sequence, SequenceException
+)
+from bitwarden_pyro.util.trace import Tracer
+
+
+class SequenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.item = {'login': {'username': 'me', 'password': 'pa ss'}}
+
+    def test_compile(self):
+        steps = Sequence('{USERNAME}{TAB}{PASSWORD}{ENTER}').compile(
+            self.item
+        )
+
+        self.assertEqual(steps, [('type', 'me'), ('key', 'Tab'),
+                                 ('type', 'pa ss'), ('key', 'Return')])
+
+    def test_key_delay(self):
+        steps = Sequence('{USERNAME}{TAB}{PASSWORD}', 0.5).compile(self.item)
+
+        self.assertEqual(steps, [('type', 'me'), ('delay', 0.5),
+                                 ('key', 'Tab'), ('delay', 0.5),
+                                 ('type', 'pa ss')])
+
+    def test_delay_and_text(self):
+        steps = Sequence('user: {USERNAME}{DELAY=250}!').compile(self.item)
+
+        self.assertEqual(steps, [('type', 'user: me'), ('delay', 0.25),
+                                 ('type', '!')])
+
+    def test_unknown_placeholder(self):
+        with self.assertRaises(SequenceException):
+            Sequence('{UNKNOWN}').compile(self.item)
+
+    def test_template_of(self):
+        item = {'fields': [{'name': 'autotype', 'value': '{PASSWORD}'}]}
+
+        self.assertEqual(Sequence.template_of(item, '{USERNAME}', 'autotype'),
+                         '{PASSWORD}')
+        self.assertEqual(Sequence.template_of(item, '{USERNAME}'),
+                         '{USERNAME}')
+
+
+class AutoTypeTest(unittest.TestCase):
+
+    def __script(self, tool, steps):
+        with mock.patch.object(autotype, 'init_executable',
+                               return_value=tool), \
+                mock.patch.object(Tracer, 'run') as run:
+            AutoType().sequence(steps)
+
+        args, kwargs = run.call_args
+        return args[0], kwargs['input']
+
+    def test_xdotool_script(self):
+        cmd, script = self.__script('xdotool', [
+            ('type', 'a b\tc\n$HOME'), ('key', 'Tab'), ('delay', 0.1)
+        ])
+
+        self.assertEqual(cmd, ['xdotool', '-'])
+        self.assertEqual(script.decode('utf-8').splitlines(), [
+            'type -- a', 'key space', 'type -- b', 'key Tab', 'type -- c',
+            'key Return', 'key dollar', 'type -- HOME', 'key Tab',
+            'sleep 0.1'
+        ])
+
+    def test_xdotool_types_all_whitespace(self):
+        _, script = self.__script('xdotool', [
+            ('type', 'a\rb\x0bc\xa0d\u2003e')
+        ])
+
+        self.assertEqual(script.decode('utf-8').splitlines(), [
+            'type -- a', 'key Return', 'type -- b', 'key 0x100000b',
+            'type -- c', 'key 0xa0', 'type -- d', 'key 0x1002003',
+            'type -- e'
+        ])
+
+    def test_ydotool_single_text(self):
+        cmd, data = self.__script('sudo ydotool', [
+            ('type', 'me'), ('key', 'Tab'), ('type', 'p w')
+        ])
+
+        self.assertEqual(cmd, ['sudo', 'ydotool', 'type', '--file', '-'])
+        self.assertEqual(data, 'me\tp w'.encode('utf-8'))
+
+    def test_ydotool_segments(self):
+        with mock.patch.object(autotype, 'init_executable',
+                               return_value='sudo ydotool'), \
+                mock.patch.object(Tracer, 'run') as run, \
+                mock.patch.object(autotype.time, 'sleep') as sleep:
+            AutoType().sequence([
+                ('type', 'me'), ('delay', 0.5), ('key', 'Tab'),
+                ('type', 'pw'), ('key', 'Escape')
+            ])
+
+        # The prefix is applied to ydotool itself, never to a shell
+        self.assertEqual([(c.args[0], c.kwargs['input'])
+                          for c in run.call_args_list], [
+            (['sudo', 'ydotool', 'type', '--file', '-'], b'me'),
+            (['sudo', 'ydotool', 'type', '--file', '-'], b'\tpw'),
+            (['sudo', 'ydotool', 'key', 'Escape'], None),
+        ])
+        sleep.assert_called_once_with(0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import json
+import tempfile
+import unittest
+import importlib.util
+import subprocess as sp
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_fakes():
+    """Import the fakes of the benchmarks, which are not a package"""
+
+    path = os.path.join(ROOT, 'benchmarks', 'fakes.py')
+    spec = importlib.util.spec_from_file_location('fakes', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+fakes = load_fakes()
+
+
+class FakesTestCase(unittest.TestCase):
+    """Test case with a vault and fake executables in a temporary
+    directory"""
+
+    SIZE = 25
+
+    def setUp(self):
+        workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(workdir.cleanup)
+
+        self.vault = os.path.join(workdir.name, 'vault')
+        self.bin = os.path.join(workdir.name, 'bin')
+        self.state = os.path.join(workdir.name, 'state')
+        self.log = os.path.join(workdir.name, 'log')
+        os.makedirs(self.state)
+
+        fakes.write_vault(self.vault, self.SIZE)
+        fakes.write_executables(self.bin)
+
+    def read_json(self, name):
+        with open(os.path.join(self.vault, name), encoding='utf-8') as file:
+            return json.load(file)
+
+    def run_tool(self, *args, data=None):
+        env = dict(os.environ, BENCH_VAULT=self.vault,
+                   BENCH_STATE=self.state, BENCH_LOG=self.log)
+        proc = sp.run([os.path.join(self.bin, args[0]), *args[1:]],
+                      input=data, stdout=sp.PIPE, env=env, check=False)
+        return proc.returncode, proc.stdout.decode('utf-8')
+
+
+class VaultTest(FakesTestCase):
+
+    def test_vault_contents(self):
+        items = self.read_json('items.json')
+        folders = self.read_json('folders.json')
+
+        self.assertEqual(len(items), self.SIZE)
+        self.assertEqual(len({item['id'] for item in items}), self.SIZE)
+        self.assertEqual(len(folders), fakes.FOLDERS + 1)
+        self.assertEqual(folders[-1], {'object': 'folder', 'id': None,
+                                       'name': 'No Folder'})
+        self.assertEqual(self.read_json('item.json')['id'], '@ID@')
+
+    def test_vault_is_reproducible(self):
+        with tempfile.TemporaryDirectory() as other:
+            fakes.write_vault(other, self.SIZE)
+            with open(os.path.join(other, 'items.json'),
+                      encoding='utf-8') as file:
+                self.assertEqual(json.load(file),
+                                 self.read_json('items.json'))
+
+    def test_existing_vault_is_kept(self):
+        fakes.write_vault(self.vault, self.SIZE * 2)
+
+        self.assertEqual(len(self.read_json('items.json')), self.SIZE)
+
+
+class ExecutablesTest(FakesTestCase):
+
+    def test_bw_answers_from_vault(self):
+        code, output = self.run_tool('bw', 'list', 'items')
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output), self.read_json('items.json'))
+
+        code, output = self.run_tool('bw', 'get', 'item', 'some-id')
+        self.assertEqual(json.loads(output)['id'], 'some-id')
+
+        code, _ = self.run_tool('bw', 'unknown', 'command')
+        self.assertEqual(code, 1)
+
+    def test_invocations_are_logged(self):
+        self.run_tool('bw', 'sync', '--session')
+        self.run_tool('xclip', data=b'secret')
+
+        with open(self.log, encoding='utf-8') as file:
+            self.assertEqual(file.read().split(), ['bw', 'xclip'])
+
+    def test_rofi_selects_first_line(self):
+        code, output = self.run_tool('rofi', '-dmenu',
+                                     data=b'first\nsecond\n')
+
+        self.assertEqual(code, 0)
+        self.assertEqual(output, 'first\n')
+
+    def test_keyctl_keeps_keys(self):
+        code, _ = self.run_tool('keyctl', 'request', 'user', 'bw_session')
+        self.assertEqual(code, 1)
+
+        self.run_tool('keyctl', 'padd', 'user', 'bw_session', '@u',
+                      data=b'key')
+        code, key_id = self.run_tool('keyctl', 'request', 'user',
+                                     'bw_session')
+        self.assertEqual(code, 0)
+        self.assertEqual(self.run_tool('keyctl', 'pipe', key_id.strip())[1],
+                         'key')
+
+
+if __name__ == '__main__':
+    unittest.main()
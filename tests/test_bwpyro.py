@@ -0,0 +1,73 @@
+import threading
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro.bwpyro import BwPyro
+from bitwarden_pyro.controller.session import SessionException
+
+from tests.helpers import HomeTestCase
+
+
+class StartupStagesTest(HomeTestCase):
+    """Stages of the startup run on their own threads once the config is
+    loaded"""
+
+    STAGES = ('session', 'vault', 'tools')
+
+    def setUp(self):
+        super().setUp()
+        self.app = BwPyro(['--no-logging'], resident=True)
+        self.barrier = threading.Barrier(len(self.STAGES), timeout=5)
+        self.threads = {}
+
+        for name in ('set_keybinds', 'log_critical_path'):
+            patcher = mock.patch.object(BwPyro, f'_BwPyro__{name}')
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def __stages(self, failing=None):
+        def stage(name):
+            def run(app):
+                self.threads[name] = threading.get_ident()
+                # Only returns once every stage has started
+                self.barrier.wait()
+                if name == failing:
+                    raise SessionException("Failed to start")
+                if name == 'session':
+                    app._sessions = []
+                elif name == 'vault':
+                    app._vault = mock.Mock()
+            return run
+
+        return [mock.patch.object(BwPyro, f'_BwPyro__init_{name}',
+                                  autospec=True, side_effect=stage(name))
+                for name in self.STAGES]
+
+    def __init_ui(self, failing=None):
+        patchers = self.__stages(failing)
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.app._BwPyro__init_ui()
+
+    def test_stages_run_concurrently(self):
+        self.__init_ui()
+
+        self.assertEqual(set(self.threads), set(self.STAGES))
+        self.assertEqual(len(set(self.threads.values())), len(self.STAGES))
+        self.assertNotIn(threading.get_ident(), self.threads.values())
+        self.app._vault.set_totp.assert_called_once()
+
+    def test_failing_stage_exits(self):
+        with self.assertRaises(SystemExit) as ctx:
+            self.__init_ui(failing='session')
+
+        self.assertEqual(ctx.exception.code, 1)
+        # The other stages have been joined before exiting
+        self.assertEqual(set(self.threads), set(self.STAGES))
+
+
+if __name__ == '__main__':
+    unittest.main()
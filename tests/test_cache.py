@@ -0,0 +1,209 @@
+import os
+import time
+
+from unittest import mock
+
+from bitwarden_pyro.controller.cache import Cache, CacheFormat, CachedItems
+
+from tests.helpers import HomeTestCase, make_item
+
+
+class CacheTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.items = [
+            make_item('a', 'mail', folder_id='f', username='me',
+                      uris=['https://mail.example.com']),
+            make_item('b', 'bank', username='me'),
+            make_item('c', 'note'),
+        ]
+
+    def __read(self, cache):
+        items = cache.get()
+        self.addCleanup(items.close)
+        return items
+
+    @staticmethod
+    def __summary(items):
+        return sorted(
+            (item['id'], item['name'], item.get('folderId'),
+             (item.get('login') or {}).get('username'))
+            for item in items
+        )
+
+    def test_round_trip(self):
+        cache = Cache(1)
+        cache.save(self.items)
+        items = self.__read(Cache(1))
+
+        self.assertIsInstance(items, CachedItems)
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0]['name'], 'mail')
+        self.assertEqual(items[0]['folderId'], 'f')
+        self.assertEqual(items[0]['login'], {
+            'username': 'me',
+            'uris': [{'uri': 'https://mail.example.com'}],
+        })
+        self.assertEqual(items[-1]['id'], 'c')
+        self.assertNotIn('login', items[2])
+        self.assertEqual(list(items.fields()), [
+            ('a', 'mail', 'f'), ('b', 'bank', None), ('c', 'note', None)
+        ])
+
+    def test_secrets_are_not_written(self):
+        Cache(1).save(self.items)
+
+        path = os.path.join(Cache(1).get_path(), Cache._items_file)
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        self.assertNotIn(b'password', data)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+    def test_has_items(self):
+        self.assertFalse(Cache(1).has_items())
+
+        Cache(1).save(self.items)
+        self.assertTrue(Cache(1).has_items())
+        self.assertFalse(Cache(-1).has_items())
+
+    def test_expired_items_can_be_stale(self):
+        Cache(1).save(self.items)
+        cache = Cache(1, max_staleness=5)
+        cache._meta.time_created = time.time() - 2 * 86_400
+
+        self.assertFalse(cache.has_items())
+        self.assertTrue(cache.has_items(stale=True))
+
+    def test_update_applies_changes(self):
+        cache = Cache(1)
+        cache.save(self.items)
+
+        updated = [
+            make_item('a', 'mail', folder_id='f', username='me',
+                      uris=['https://mail.example.com']),
+            make_item('c', 'notes', revision='2021-01-01T00:00:00.000Z'),
+            make_item('d', 'shop', username='you'),
+        ]
+        cache.update(updated)
+        items = self.__read(Cache(1))
+
+        self.assertEqual(self.__summary(items), self.__summary(updated))
+        self.assertEqual(len(items), 3)
+
+    def test_update_without_changes_keeps_generation(self):
+        cache = Cache(1)
+        cache.save(self.items)
+        generation = self.__read(cache).generation
+
+        cache.update(self.items)
+        self.assertEqual(self.__read(Cache(1)).generation, generation)
+
+        cache.update(self.items[:2])
+        self.assertNotEqual(self.__read(Cache(1)).generation, generation)
+
+    def test_update_leaves_open_items_unchanged(self):
+        cache = Cache(1)
+        cache.save(self.items)
+        # Another process reading the cache while it is updated
+        reader = self.__read(Cache(1))
+
+        # Deleting the first item moves the last record into its slot
+        cache.update(self.items[1:] + [make_item('d', 'shop')])
+
+        self.assertEqual([item['name'] for item in reader],
+                         ['mail', 'bank', 'note'])
+        self.assertFalse(Cache(1).is_current(reader))
+        self.assertEqual([item['name'] for item in self.__read(Cache(1))],
+                         ['note', 'bank', 'shop'])
+
+    def __inode(self, cache):
+        return os.stat(os.path.join(cache.get_path(), Cache._items_file)
+                       ).st_ino
+
+    def test_update_without_changes_patches_time(self):
+        cache = Cache(1)
+        cache.save(self.items)
+        inode = self.__inode(cache)
+        cache._meta.time_created = 0
+        cache.update(self.items)
+
+        self.assertEqual(self.__inode(cache), inode)
+        self.assertAlmostEqual(Cache(1)._meta.time_created, time.time(),
+                               delta=60)
+        self.assertTrue(Cache(1).has_items())
+
+    def test_update_inserts_in_place(self):
+        cache = Cache(1)
+        cache.save(self.items)
+        inode = self.__inode(cache)
+        reader = self.__read(Cache(1))
+
+        cache.update(self.items + [make_item('d', 'shop', username='you')])
+
+        self.assertEqual(self.__inode(cache), inode)
+        # Readers only see the records they have already mapped
+        self.assertEqual(len(reader), 3)
+        self.assertFalse(Cache(1).is_current(reader))
+        items = self.__read(Cache(1))
+        self.assertEqual(self.__summary(items), self.__summary(
+            self.items + [make_item('d', 'shop', username='you')]
+        ))
+
+    def test_update_replaces_changed_records(self):
+        cache = Cache(1)
+        cache.save(self.items)
+        inode = self.__inode(cache)
+
+        cache.update(self.items[:2] + [
+            make_item('c', 'notes', revision='2021-01-01T00:00:00.000Z')
+        ])
+
+        self.assertNotEqual(self.__inode(cache), inode)
+        self.assertEqual(self.__read(Cache(1))[2]['name'], 'notes')
+
+    def test_update_compacts_when_full(self):
+        cache = Cache(1)
+        cache.save(self.items)
+
+        many = [make_item(str(i), f'item {i}')
+                for i in range(CacheFormat.MIN_FREE_SLOTS + 10)]
+        cache.update(many)
+        items = self.__read(Cache(1))
+
+        self.assertEqual(self.__summary(items), self.__summary(many))
+        self.assertGreaterEqual(items.header.capacity, len(many))
+
+    def test_outdated_format_is_ignored(self):
+        cache = Cache(1)
+        path = os.path.join(cache.get_path(), Cache._items_file)
+        with open(path, 'wb') as file:
+            file.write(b'BWPC' + bytes(64))
+
+        self.assertFalse(Cache(1).has_items())
+        cache.update(self.items)
+        self.assertEqual(len(self.__read(Cache(1))), 3)
+
+    def test_folders_follow_items(self):
+        folders = [{'object': 'folder', 'id': 'f', 'name': 'Mail'},
+                   {'object': 'folder', 'id': None, 'name': 'No Folder'}]
+        cache = Cache(1)
+        cache.save(self.items)
+        cache.save_folders(folders)
+
+        self.assertEqual(Cache(1).get_folders(), [
+            {'id': 'f', 'name': 'Mail'}, {'id': None, 'name': 'No Folder'}
+        ])
+
+        # Folders saved for previous items are not served with new ones
+        Cache(1).save(self.items)
+        self.assertIsNone(Cache(1).get_folders())
+
+    def test_folders_expire_with_items(self):
+        cache = Cache(1)
+        cache.save(self.items)
+        cache.save_folders([{'id': 'f', 'name': 'Mail'}])
+
+        with mock.patch('time.time', return_value=time.time() + 86_400):
+            self.assertIsNone(Cache(1).get_folders())
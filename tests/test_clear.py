@@ -0,0 +1,165 @@
+import os
+import sys
+import signal
+import tempfile
+import threading
+import unittest
+import subprocess as sp
+
+from types import SimpleNamespace
+from unittest import mock
+
+from bitwarden_pyro.controller import clear
+from bitwarden_pyro.controller.clear import ClearScheduler, digest
+from bitwarden_pyro.util.logger import SingletonType
+
+
+class FakeClipboard:
+    """Clipboard recording the predicates of the clears it is asked for"""
+
+    def __init__(self):
+        self.predicates = []
+        self.cleared = threading.Event()
+
+    def clear_if(self, predicate):
+        self.predicates.append(predicate)
+        self.cleared.set()
+
+
+class DigestTest(unittest.TestCase):
+
+    def test_ignores_trailing_newlines(self):
+        salt = os.urandom(16)
+
+        self.assertEqual(digest('secret\n', salt), digest(b'secret', salt))
+        self.assertEqual(digest('secret\r\n', salt), digest('secret', salt))
+        self.assertNotEqual(digest('secret ', salt), digest('secret', salt))
+
+    def test_depends_on_salt(self):
+        self.assertNotEqual(
+            digest('secret', b'a' * 16), digest('secret', b'b' * 16)
+        )
+
+
+class SchedulerTestCase(unittest.TestCase):
+    """Test case with a fresh scheduler keeping its pid file in a
+    temporary runtime directory"""
+
+    def setUp(self):
+        runtime = tempfile.TemporaryDirectory()
+        self.addCleanup(runtime.cleanup)
+        os.chmod(runtime.name, 0o700)
+
+        patcher = mock.patch.dict(
+            os.environ, {'XDG_RUNTIME_DIR': runtime.name}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        SingletonType._instances.pop(ClearScheduler, None)
+        self.addCleanup(SingletonType._instances.pop, ClearScheduler, None)
+        self.scheduler = ClearScheduler()
+        self.pid_file = os.path.join(runtime.name, 'bwpyro-clear.pid')
+
+    def read_pid_file(self):
+        with open(self.pid_file, encoding='ascii') as file:
+            return file.read()
+
+
+class ResidentClearTest(SchedulerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.scheduler.set_resident()
+        self.clipboard = FakeClipboard()
+
+    def test_clears_after_delay(self):
+        self.scheduler.schedule(self.clipboard, 'secret', 0.01)
+
+        self.assertTrue(self.clipboard.cleared.wait(5))
+        predicate, = self.clipboard.predicates
+        self.assertTrue(predicate('secret\n'))
+        self.assertFalse(predicate('changed'))
+
+    def test_schedule_cancels_previous_clear(self):
+        self.scheduler.schedule(self.clipboard, 'first', 60)
+        self.scheduler.schedule(self.clipboard, 'second', 60)
+        self.scheduler.flush()
+
+        predicate, = self.clipboard.predicates
+        self.assertTrue(predicate('second'))
+        self.assertFalse(predicate('first'))
+
+    def test_flush_without_pending_clear(self):
+        self.scheduler.flush()
+
+        self.assertEqual(self.clipboard.predicates, [])
+
+
+class HelperClearTest(SchedulerTestCase):
+
+    def __spawn(self, *procs):
+        patcher = mock.patch.object(clear, 'spawn_helper', side_effect=procs)
+        spawn = patcher.start()
+        self.addCleanup(patcher.stop)
+        return spawn
+
+    @staticmethod
+    def __start_helper():
+        # Stands in for a helper, as its command line names the module
+        proc = sp.Popen([sys.executable, '-c', 'import time; time.sleep(30)',
+                         ClearScheduler._module])
+        return proc
+
+    def test_records_helper_pid(self):
+        spawn = self.__spawn(SimpleNamespace(pid=123456789))
+        self.scheduler.schedule(None, 'secret', 30)
+
+        module, request, _ = spawn.call_args[0]
+        self.assertEqual(module, ClearScheduler._module)
+        self.assertEqual(request['delay'], 30)
+        self.assertNotIn('secret', str(request))
+        self.assertEqual(self.read_pid_file(), '123456789')
+
+    def test_schedule_terminates_previous_helper(self):
+        helper = self.__start_helper()
+        self.addCleanup(helper.wait)
+        self.addCleanup(helper.kill)
+        self.__spawn(helper, SimpleNamespace(pid=123456789))
+
+        self.scheduler.schedule(None, 'first', 30)
+        self.scheduler.schedule(None, 'second', 30)
+
+        self.assertEqual(helper.wait(5), -signal.SIGTERM)
+        self.assertEqual(self.read_pid_file(), '123456789')
+
+    def test_leaves_reused_pid_alone(self):
+        # This process does not run the helper module
+        self.__spawn(SimpleNamespace(pid=os.getpid()),
+                     SimpleNamespace(pid=123456789))
+
+        with mock.patch.object(clear.os, 'kill') as kill:
+            self.scheduler.schedule(None, 'first', 30)
+            self.scheduler.schedule(None, 'second', 30)
+
+        kill.assert_not_called()
+
+    def test_release_forgets_own_pid_only(self):
+        self.__spawn(SimpleNamespace(pid=123456789))
+        self.scheduler.schedule(None, 'secret', 30)
+
+        self.scheduler.release(987654321)
+        self.assertEqual(self.read_pid_file(), '123456789')
+
+        self.scheduler.release(123456789)
+        self.assertEqual(self.read_pid_file(), '')
+
+    def test_helper_exited_early(self):
+        self.__spawn(None)
+        self.scheduler.schedule(None, 'secret', 30)
+
+        self.assertFalse(os.path.exists(self.pid_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
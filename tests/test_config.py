@@ -0,0 +1,99 @@
+import os
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro.model.actions import ItemActions
+from bitwarden_pyro.util.arguments import parse_arguments
+from bitwarden_pyro.util.config import ConfigLoader, ConfigException
+
+from tests.helpers import HomeTestCase
+
+
+class ConfigTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.home, 'config')
+        self.snapshot = os.path.expanduser(ConfigLoader._snapshot_path)
+
+    def __write(self, text, mtime=None):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def __load(self, *argv):
+        return ConfigLoader(parse_arguments(['--config', self.path, *argv]))
+
+    def __load_parsing(self, *argv):
+        """Load the config, returning it and whether the file was parsed"""
+
+        with mock.patch.object(
+                ConfigLoader, '_ConfigLoader__insert_file', autospec=True,
+                side_effect=ConfigLoader._ConfigLoader__insert_file
+        ) as insert:
+            config = self.__load(*argv)
+
+        return config, insert.called
+
+    def test_values_are_typed(self):
+        self.__write('security:\n  cache: 7\nkeyboard:\n  enter: all\n'
+                     'interface:\n  frecency: false\n')
+        config = self.__load()
+
+        self.assertEqual(config.get_int('security.cache'), 7)
+        self.assertEqual(config.get('security.cache'), '7')
+        self.assertEqual(config.get_itemaction('keyboard.enter'),
+                         ItemActions.ALL)
+        self.assertFalse(config.get_boolean('interface.frecency'))
+
+    def test_invalid_value_names_key(self):
+        self.__write('security:\n  cache: often\n')
+
+        with self.assertRaisesRegex(ConfigException, 'security.cache'):
+            self.__load()
+
+    def test_snapshot_replaces_parsing(self):
+        self.__write('security:\n  cache: 7\n', mtime=1_000_000)
+        _, parsed = self.__load_parsing()
+        self.assertTrue(parsed)
+        self.assertTrue(os.path.isfile(self.snapshot))
+
+        config, parsed = self.__load_parsing()
+        self.assertFalse(parsed)
+        self.assertEqual(config.get_int('security.cache'), 7)
+        self.assertEqual(config.get_itemaction('keyboard.enter'),
+                         ItemActions.COPY)
+
+    def test_changed_file_invalidates_snapshot(self):
+        self.__write('security:\n  cache: 7\n', mtime=1_000_000)
+        self.__load()
+
+        # Same size, only the modification time tells the files apart
+        self.__write('security:\n  cache: 8\n', mtime=2_000_000)
+        config, parsed = self.__load_parsing()
+
+        self.assertTrue(parsed)
+        self.assertEqual(config.get_int('security.cache'), 8)
+
+    def test_arguments_override_snapshot(self):
+        self.__write('security:\n  cache: 7\n')
+        self.__load()
+
+        config, parsed = self.__load_parsing('--cache', '3')
+        self.assertFalse(parsed)
+        self.assertEqual(config.get_int('security.cache'), 3)
+
+        self.assertEqual(self.__load().get_int('security.cache'), 7)
+
+    def test_missing_file_is_created(self):
+        config = self.__load()
+
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertEqual(config.get_int('security.cache'),
+                         ConfigLoader.get_default('security', 'cache'))
+
+
+if __name__ == '__main__':
+    unittest.main()
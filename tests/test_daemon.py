@@ -0,0 +1,117 @@
+import time
+import threading
+import unittest
+
+from bitwarden_pyro.controller.daemon import Daemon, DaemonBusyException
+
+
+class FakeApp:
+    """Application whose launches wait until they are released"""
+
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.closed = False
+
+    def start(self):
+        self.started.set()
+        self.release.wait(5)
+
+    def get_timeout(self):
+        return self.timeout
+
+    def close(self):
+        self.closed = True
+
+
+class DaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.apps = []
+        self.daemon = Daemon(self.__create, path='/nonexistent/bwpyro.sock')
+
+    def __create(self, argv):
+        app = FakeApp()
+        self.apps.append(app)
+        return app
+
+    def __launch_in_background(self):
+        thread = threading.Thread(target=self.daemon.launch, args=([], {}))
+        thread.start()
+        self.addCleanup(thread.join)
+        return thread
+
+    def test_launch_keeps_app(self):
+        self.assertEqual(self.daemon.launch([], {}), 0)
+        self.assertEqual(self.daemon.launch([], {}), 0)
+
+        self.assertEqual(len(self.apps), 1)
+        self.assertFalse(self.apps[0].closed)
+
+    def test_concurrent_launch_is_busy(self):
+        self.daemon.launch([], {})
+        app = self.apps[0]
+        app.release.clear()
+        app.started.clear()
+
+        self.__launch_in_background()
+        self.assertTrue(app.started.wait(5))
+        try:
+            with self.assertRaises(DaemonBusyException):
+                self.daemon.launch([], {})
+        finally:
+            app.release.set()
+
+    def test_expire_idle_app(self):
+        self.daemon.launch([], {})
+        app = self.apps[0]
+        app.timeout = 0
+        time.sleep(0.01)
+
+        self.daemon.expire()
+        self.assertTrue(app.closed)
+
+    def test_expire_skips_running_app(self):
+        self.daemon.launch([], {})
+        app = self.apps[0]
+        app.release.clear()
+        app.started.clear()
+
+        thread = self.__launch_in_background()
+        self.assertTrue(app.started.wait(5))
+        try:
+            app.timeout = 0
+            time.sleep(0.01)
+            self.daemon.expire()
+            self.assertFalse(app.closed)
+        finally:
+            app.release.set()
+
+        thread.join()
+        # Launches dropping their timeout to zero are not kept
+        self.assertTrue(app.closed)
+
+    def test_failed_launch_replies_and_drops_app(self):
+        self.daemon.launch([], {})
+        app = self.apps[0]
+        app.start = lambda: 1 / 0
+
+        self.assertEqual(self.daemon.launch([], {}), 1)
+        self.assertTrue(app.closed)
+
+        # The next launch starts over with a new application
+        self.assertEqual(self.daemon.launch([], {}), 0)
+        self.assertEqual(len(self.apps), 2)
+
+    def test_failed_creation_replies(self):
+        def create(_):
+            raise RuntimeError("Broken configuration")
+        daemon = Daemon(create, path='/nonexistent/bwpyro.sock')
+
+        self.assertEqual(daemon.launch([], {}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
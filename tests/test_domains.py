@@ -0,0 +1,88 @@
+import unittest
+
+from bitwarden_pyro.model.domains import DomainTrie, UriMatch
+
+from tests.helpers import make_item
+
+
+class DomainTrieTest(unittest.TestCase):
+
+    def setUp(self):
+        self.trie = DomainTrie.build([
+            make_item('mail', 'Mail', uris=['https://mail.example.com/inbox']),
+            make_item('shop', 'Shop', uris=['shop.example.co.uk']),
+            make_item('element', 'Element', uris=['https://app.element.io']),
+        ])
+        self.trie.add('host', 'https://admin.example.org:8443', UriMatch.HOST)
+        self.trie.add('exact', 'https://example.net/login', UriMatch.EXACT)
+        self.trie.add('prefix', 'https://example.net/app',
+                      UriMatch.STARTS_WITH)
+        self.trie.add('regex', r'^https://[a-z]+\.example\.net/',
+                      UriMatch.REGEX)
+        self.trie.add('never', 'https://example.com', UriMatch.NEVER)
+
+    def test_base_domain(self):
+        self.assertEqual(DomainTrie.base_domain('a.b.example.com'),
+                         'example.com')
+        self.assertEqual(DomainTrie.base_domain('a.shop.co.uk'),
+                         'shop.co.uk')
+        self.assertEqual(DomainTrie.base_domain('10.0.0.1'), '10.0.0.1')
+
+    def test_match_host_by_domain(self):
+        self.assertEqual(self.trie.match_host('www.example.com'), ['mail'])
+        self.assertEqual(self.trie.match_host('Example.COM.'), ['mail'])
+        self.assertEqual(self.trie.match_host('www.shop.example.co.uk'),
+                         ['shop'])
+        self.assertEqual(self.trie.match_host('other.co.uk'), [])
+
+    def test_match_host_by_host(self):
+        self.assertEqual(self.trie.match_host('admin.example.org', 8443),
+                         ['host'])
+        self.assertEqual(self.trie.match_host('admin.example.org'), [])
+        self.assertEqual(self.trie.match_host('www.example.org', 8443), [])
+
+    def test_match_url(self):
+        self.assertEqual(self.trie.match_url('https://example.net/login'),
+                         ['exact'])
+        self.assertEqual(
+            self.trie.match_url('https://example.net/app/settings'),
+            ['prefix']
+        )
+        self.assertEqual(self.trie.match_url('https://www.example.net/'),
+                         ['regex'])
+
+    def test_match_window_trailing_url(self):
+        title = 'Inbox - https://mail.example.com/inbox - Mozilla Firefox'
+        self.assertEqual(self.trie.match_window(title), ['mail'])
+        self.assertEqual(
+            self.trie.match_window('Shop — shop.example.co.uk'), ['shop']
+        )
+
+    def test_match_window_ignores_urls_set_by_page(self):
+        title = 'Visit mail.example.com now - Mozilla Firefox'
+        self.assertEqual(self.trie.match_window(title), [])
+
+        title = ('mail.example.com https://mail.example.com - '
+                 'https://evil.example.org/ - Mozilla Firefox')
+        self.assertEqual(self.trie.match_window(title), [])
+
+    def test_match_window_class(self):
+        self.assertEqual(self.trie.match_window('Room - Element', 'element'),
+                         ['element'])
+        self.assertEqual(self.trie.match_window('', None), [])
+
+    def test_match_title_ignores_class(self):
+        self.assertEqual(self.trie.match_title('Room - Element'), [])
+        self.assertEqual(self.trie.match_title('Element - app.element.io'),
+                         ['element'])
+
+    def test_serialisation(self):
+        trie = DomainTrie.from_dict(self.trie.to_dict())
+
+        self.assertEqual(trie.match_host('www.example.com'), ['mail'])
+        self.assertEqual(trie.match_url('https://example.net/login'),
+                         ['exact'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from bitwarden_pyro.model.index import VaultIndex
+
+from tests.helpers import make_item
+
+
+class VaultIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [
+            make_item('a', 'mail', folder_id='f1'),
+            make_item('b', 'bank', folder_id='f2'),
+            make_item('c', 'mail', folder_id='f2'),
+            make_item('d', 'shop'),
+        ]
+        self.index = VaultIndex(self.items)
+
+    def test_get_by_id(self):
+        self.assertIs(self.index.get_by_id('c'), self.items[2])
+        self.assertEqual(self.index.get_position('d'), 3)
+        self.assertIsNone(self.index.get_by_id('missing'))
+
+    def test_get_by_name(self):
+        self.assertEqual(self.index.get_by_name('mail'),
+                         [self.items[0], self.items[2]])
+        self.assertEqual(self.index.get_name_positions(2), [0, 2])
+        self.assertEqual(self.index.get_by_name('missing'), [])
+
+    def test_duplicates(self):
+        self.assertTrue(self.index.is_duplicate('mail'))
+        self.assertFalse(self.index.is_duplicate('bank'))
+
+    def test_folders(self):
+        self.assertEqual(self.index.get_positions('f2'), [1, 2])
+        self.assertEqual(self.index.get_by_folder('f1'), [self.items[0]])
+        self.assertEqual(self.index.get_positions('missing'), [])
+
+    def test_groups(self):
+        self.assertEqual(self.index.get_groups(),
+                         {'mail': 2, 'bank': 1, 'shop': 1})
+        self.assertEqual(self.index.get_groups('f2'), {'bank': 1, 'mail': 1})
+        self.assertEqual(self.index.get_group_heads(), [0, 1, 3])
+        # Heads of a folder are relative to the items of the folder
+        self.assertEqual(self.index.get_group_heads('f2'), [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
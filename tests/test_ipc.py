@@ -0,0 +1,128 @@
+import os
+import sys
+import socket
+import tempfile
+import threading
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro import client
+from bitwarden_pyro.util.ipc import DaemonClient, DaemonReplyException, \
+    DaemonUnavailableException, UnsafeDirectoryException, check_private_dir
+
+
+class PrivateDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, 'run')
+        os.mkdir(self.path, 0o700)
+
+    def test_accepts_private_dir(self):
+        check_private_dir(self.path)
+
+    def test_rejects_dir_shared_with_others(self):
+        for mode in (0o755, 0o770, 0o701):
+            with self.subTest(mode=oct(mode)):
+                os.chmod(self.path, mode)
+                with self.assertRaises(UnsafeDirectoryException):
+                    check_private_dir(self.path)
+
+    def test_rejects_symlink(self):
+        link = os.path.join(self._tmp.name, 'link')
+        os.symlink(self.path, link)
+
+        with self.assertRaises(UnsafeDirectoryException):
+            check_private_dir(link)
+
+    def test_rejects_dir_of_other_user(self):
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            with self.assertRaises(UnsafeDirectoryException):
+                check_private_dir(self.path)
+
+    def test_rejects_missing_dir(self):
+        with self.assertRaises(UnsafeDirectoryException):
+            check_private_dir(os.path.join(self.path, 'missing'))
+
+
+class DaemonClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        os.chmod(self._tmp.name, 0o700)
+        self.path = os.path.join(self._tmp.name, 'bwpyro.sock')
+
+    def __serve(self, reply):
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(1)
+        self.addCleanup(server.close)
+
+        def accept():
+            conn, _ = server.accept()
+            with conn, conn.makefile('rb') as stream:
+                stream.readline()
+                conn.sendall(reply)
+
+        thread = threading.Thread(target=accept)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_reply(self):
+        self.__serve(b'{"status": 3}\n')
+
+        self.assertEqual(DaemonClient(self.path).request('ping'),
+                         {'status': 3})
+
+    def test_missing_daemon_is_unavailable(self):
+        with self.assertRaises(DaemonUnavailableException):
+            DaemonClient(self.path).request('ping')
+
+    def test_shared_dir_is_unavailable(self):
+        self.__serve(b'{"status": 0}\n')
+        os.chmod(self._tmp.name, 0o755)
+
+        with self.assertRaises(DaemonUnavailableException):
+            DaemonClient(self.path).request('ping')
+        # Let the server thread finish
+        os.chmod(self._tmp.name, 0o700)
+        DaemonClient(self.path).request('ping')
+
+    def test_missing_reply(self):
+        self.__serve(b'')
+
+        with self.assertRaises(DaemonReplyException):
+            DaemonClient(self.path).request('ping')
+
+
+class ClientRunTest(unittest.TestCase):
+
+    def __run(self, error):
+        bwpyro = mock.Mock()
+        with mock.patch.object(sys, 'argv', ['bwpyro']), \
+                mock.patch.object(client.DaemonClient, 'launch',
+                                  side_effect=error), \
+                mock.patch.dict(sys.modules,
+                                {'bitwarden_pyro.bwpyro': bwpyro}), \
+                mock.patch('bitwarden_pyro.bwpyro', bwpyro, create=True), \
+                mock.patch('sys.stderr'):
+            try:
+                client.run()
+            except SystemExit as exc:
+                return bwpyro, exc.code
+
+        return bwpyro, None
+
+    def test_falls_back_without_daemon(self):
+        bwpyro, _ = self.__run(DaemonUnavailableException("No daemon"))
+
+        bwpyro.run.assert_called_once()
+
+    def test_never_launches_twice(self):
+        bwpyro, status = self.__run(DaemonReplyException("No reply"))
+
+        bwpyro.run.assert_not_called()
+        self.assertEqual(status, 1)
@@ -0,0 +1,125 @@
+import gc
+import sys
+import threading
+import unittest
+
+from bitwarden_pyro.controller.vault import Vault
+from bitwarden_pyro.model.item import ItemRecord
+from bitwarden_pyro.util.memory import paused_gc
+
+from tests.helpers import HomeTestCase, make_item
+from tests.test_vault import FakeTransport
+
+
+class ItemRecordTest(unittest.TestCase):
+
+    def setUp(self):
+        self.item = make_item('a', 'mail', folder_id='work', username='me',
+                              uris=['https://mail.example.com', None])
+        self.record = ItemRecord.from_item(self.item)
+
+    def test_reads_like_item(self):
+        self.assertEqual(dict(self.record), {
+            'id': 'a',
+            'name': 'mail',
+            'folderId': 'work',
+            'login': {
+                'username': 'me',
+                'uris': [{'uri': 'https://mail.example.com'}, {'uri': ''}],
+            },
+        })
+        self.assertEqual(len(self.record), 4)
+        self.assertNotIn('password', str(dict(self.record)))
+
+    def test_item_without_login(self):
+        record = ItemRecord.from_item(make_item('n', 'note'), 'work')
+
+        self.assertEqual(dict(record),
+                         {'id': 'n', 'name': 'note', 'folderId': None,
+                          'account': 'work'})
+        self.assertIsNone(record.get('login'))
+        self.assertIsNone(record.value('login.uris.uri'))
+
+    def test_values_of_paths(self):
+        self.assertEqual(
+            [self.record.value(path) for path in ItemRecord.PATHS],
+            ['a', 'mail', 'work', 'me', ['https://mail.example.com', ''], None]
+        )
+        with self.assertRaises(KeyError):
+            self.record.value('login.password')
+
+    def test_records_are_compact(self):
+        self.assertFalse(hasattr(self.record, '__dict__'))
+
+        # Strings shared by many records are held once
+        other = ItemRecord.from_item(make_item(
+            'b', 'bank', folder_id='WORK'.lower(), username='ME'.lower()
+        ))
+        self.assertIs(other.username, self.record.username)
+        self.assertIs(other.folder_id, self.record.folder_id)
+        self.assertIs(other.folder_id, sys.intern('work'))
+
+
+class UncachedVaultTest(HomeTestCase):
+
+    def test_full_items_come_from_bw(self):
+        transport = FakeTransport([make_item('a', 'mail', username='me')])
+        # Caching is disabled
+        vault = Vault(-1, transport)
+        self.addCleanup(vault.close)
+        vault.load_items()
+
+        record, = vault.get_items()
+        self.assertIsInstance(record, ItemRecord)
+        self.assertEqual(vault.get_item_full(record)['login']['password'],
+                         'mail-password')
+        self.assertEqual(transport.requests, ['list_items', 'a'])
+
+
+class PausedGcTest(unittest.TestCase):
+
+    def setUp(self):
+        enabled = gc.isenabled()
+        self.addCleanup(gc.enable if enabled else gc.disable)
+        gc.enable()
+
+    def test_nested_blocks(self):
+        with paused_gc():
+            with paused_gc():
+                self.assertFalse(gc.isenabled())
+            self.assertFalse(gc.isenabled())
+
+        self.assertTrue(gc.isenabled())
+
+    def test_blocks_of_several_threads(self):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def pause():
+            with paused_gc():
+                entered.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=pause)
+        thread.start()
+        self.assertTrue(entered.wait(5))
+
+        with paused_gc():
+            pass
+        # The other thread is still in its block
+        self.assertFalse(gc.isenabled())
+
+        release.set()
+        thread.join()
+        self.assertTrue(gc.isenabled())
+
+    def test_disabled_collector_stays_disabled(self):
+        gc.disable()
+        with paused_gc():
+            pass
+
+        self.assertFalse(gc.isenabled())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import stat
+import uuid
+import shutil
+import tempfile
+import unittest
+
+from bitwarden_pyro.controller.keyring import (
+    KernelKeyring, KeyctlKeyring, KeyringException
+)
+
+
+# Stand-in for keyctl keeping keys in files named after them
+FAKE_KEYCTL = '''#!/bin/sh
+dir="$(dirname "$0")"
+case "$1" in
+    request) [ -f "$dir/key-$3" ] || exit 1; echo "$3" ;;
+    pipe) [ -f "$dir/key-$2" ] || exit 1; cat "$dir/key-$2" ;;
+    padd) [ "$4" = @u ] || exit 1; cat > "$dir/key-$3"; echo "$3" ;;
+    timeout) [ -f "$dir/key-$2" ] || exit 1 ;;
+    purge) rm -f "$dir/key-$3" ;;
+    *) exit 1 ;;
+esac
+'''
+
+
+class KeyringTests:
+    """Tests shared by every keyring backend"""
+
+    def make_keyring(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        super().setUp()
+        self.keyring = self.make_keyring()
+        # Keys are added to the keyring of the user running the tests
+        self.name = f'bwpyro-test-{uuid.uuid4().hex}'
+        self.addCleanup(self.keyring.purge, self.name)
+
+    def test_request_missing_key(self):
+        self.assertIsNone(self.keyring.request(self.name))
+
+    def test_add_and_read(self):
+        key_id = self.keyring.add(self.name, 'session key')
+
+        self.assertEqual(self.keyring.request(self.name), key_id)
+        self.assertEqual(self.keyring.read(key_id), 'session key')
+
+    def test_add_replaces_key(self):
+        self.keyring.add(self.name, 'first')
+        self.keyring.add(self.name, 'second')
+
+        key_id = self.keyring.request(self.name)
+        self.assertEqual(self.keyring.read(key_id), 'second')
+
+    def test_read_long_key(self):
+        value = 'k' * 1000
+        key_id = self.keyring.add(self.name, value)
+
+        self.assertEqual(self.keyring.read(key_id), value)
+
+    def test_set_timeout(self):
+        key_id = self.keyring.add(self.name, 'session key')
+        self.keyring.set_timeout(key_id, 60)
+
+        self.assertEqual(self.keyring.read(key_id), 'session key')
+
+    def test_purge(self):
+        self.keyring.add(self.name, 'session key')
+        self.keyring.purge(self.name)
+
+        self.assertIsNone(self.keyring.request(self.name))
+        # Purging without keys is not an error
+        self.keyring.purge(self.name)
+
+
+@unittest.skipUnless(KernelKeyring.probe() is not None,
+                     "Key management syscalls are not available")
+class KernelKeyringTest(KeyringTests, unittest.TestCase):
+
+    def make_keyring(self):
+        return KernelKeyring()
+
+    def test_read_missing_key(self):
+        key_id = self.keyring.add(self.name, 'session key')
+        self.keyring.purge(self.name)
+
+        with self.assertRaises(KeyringException):
+            self.keyring.read(key_id)
+
+
+@unittest.skipUnless(shutil.which('keyctl') is not None,
+                     "keyctl is not installed")
+class KeyctlKeyringTest(KeyringTests, unittest.TestCase):
+
+    def make_keyring(self):
+        return KeyctlKeyring()
+
+
+class FakeKeyctlKeyringTest(KeyringTests, unittest.TestCase):
+
+    def make_keyring(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        path = os.path.join(directory.name, 'keyctl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(FAKE_KEYCTL)
+        os.chmod(path, stat.S_IRWXU)
+
+        return KeyctlKeyring(path)
+
+    def test_read_missing_key(self):
+        with self.assertRaises(KeyringException):
+            self.keyring.read(self.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import json
+import logging
+import threading
+import unittest
+
+from logging.handlers import QueueHandler
+from unittest import mock
+
+from bitwarden_pyro.settings import NAME
+from bitwarden_pyro.util.logger import LogFileHandler, ProjectLogger, \
+    SingletonType
+
+from tests.helpers import HomeTestCase
+
+
+class LogFileTest(HomeTestCase):
+    """Logs written by a new project logger to the temporary home"""
+
+    def setUp(self):
+        super().setUp()
+        logger = logging.getLogger(NAME)
+        handlers = list(logger.handlers)
+        previous = SingletonType._instances.pop(ProjectLogger)
+        self.addCleanup(self.__restore, logger, handlers, previous)
+        self.directory = os.path.join(self.home, '.cache', NAME)
+
+    @staticmethod
+    def __restore(logger, handlers, previous):
+        ProjectLogger().flush()
+        logger.handlers = handlers
+        SingletonType._instances[ProjectLogger] = previous
+
+    def __log(self, log_format, log):
+        project = ProjectLogger(file_logging=True, log_format=log_format)
+        logger = project.get_logger()
+        # Keep the console quiet
+        logger.handlers[-1].setLevel(logging.CRITICAL)
+
+        log(logger)
+        project.flush()
+
+        extension = 'jsonl' if log_format == 'json' else 'log'
+        path = os.path.join(self.directory, f'{NAME}.{extension}')
+        with open(path, encoding='utf-8') as file:
+            return file.read().splitlines()
+
+    def test_file_is_created_when_first_written(self):
+        ProjectLogger(file_logging=True)
+
+        self.assertFalse(os.path.exists(self.directory))
+
+    def test_records_are_written_by_another_thread(self):
+        writers = []
+        emit = LogFileHandler.emit
+
+        def record_thread(handler, record):
+            writers.append(threading.current_thread())
+            emit(handler, record)
+
+        with mock.patch.object(LogFileHandler, 'emit', record_thread):
+            lines = self.__log('text', lambda l: l.info("Loaded"))
+
+        self.assertTrue(lines[0].endswith('- Loaded'))
+        self.assertEqual(len(writers), 1)
+        self.assertIsNot(writers[0], threading.current_thread())
+
+    def test_message_is_merged_when_logged(self):
+        def log(logger):
+            items = ['a']
+            logger.info("Items %s", items)
+            items.append('b')
+            try:
+                raise ValueError("bad value")
+            except ValueError:
+                logger.exception("Failed")
+
+        lines = self.__log('text', log)
+
+        self.assertTrue(lines[0].endswith("- Items ['a']"))
+        self.assertTrue(
+            lines[1].endswith('- Failed - bad value [ValueError]')
+        )
+
+    def test_json_lines(self):
+        def log(logger):
+            logger.debug("Process %s exited", 'rofi', extra={'event': {
+                'type': 'process', 'name': 'rofi', 'exit_code': 0
+            }})
+            logger.info("Done")
+
+        records = [json.loads(line) for line in self.__log('json', log)]
+
+        self.assertEqual([r['message'] for r in records],
+                         ['Process rofi exited', 'Done'])
+        self.assertEqual(records[0]['level'], 'DEBUG')
+        self.assertEqual(records[0]['event'], {
+            'type': 'process', 'name': 'rofi', 'exit_code': 0
+        })
+        self.assertNotIn('event', records[1])
+
+    def test_flush_is_idempotent(self):
+        project = ProjectLogger(file_logging=True)
+        project.flush()
+        project.flush()
+
+        self.assertEqual(
+            sum(isinstance(h, QueueHandler)
+                for h in project.get_logger().handlers), 0
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+
+from bitwarden_pyro.controller.cache import Cache
+from bitwarden_pyro.controller.menus import MenuCache
+from bitwarden_pyro.controller.search import SearchIndex
+
+from tests.helpers import HomeTestCase, make_item
+
+
+class MenuCacheTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.rendered = []
+
+    def __render(self, items):
+        def render():
+            self.rendered.append([item['name'] for item in items])
+            return range(len(items)), '\n'.join(i['name'] for i in items)
+
+        return render
+
+    def __save(self, names):
+        cache = Cache(30)
+        cache.save([make_item(name, name) for name in names])
+        return cache, cache.get()
+
+    def test_reads_menu_from_disk(self):
+        cache, items = self.__save(['a', 'b', 'c'])
+        MenuCache(cache.get_path()).get('names', items.generation,
+                                        self.__render(items))
+
+        positions, payload, offsets = MenuCache(cache.get_path()).get(
+            'names', items.generation, self.__render(items)
+        )
+
+        self.assertEqual(len(self.rendered), 1)
+        self.assertEqual(list(positions), [0, 1, 2])
+        self.assertEqual(payload, b'a\nb\nc\n')
+        self.assertEqual(list(offsets), [0, 2, 4, 6])
+
+    def test_ignores_menu_of_replaced_cache(self):
+        cache, items = self.__save(['a', 'b', 'c'])
+        MenuCache(cache.get_path()).get('names', items.generation,
+                                        self.__render(items))
+        items.close()
+
+        # A missing items file starts the cache over, while the menus
+        # rendered from the previous items are left on disk
+        os.unlink(os.path.join(cache.get_path(), Cache._items_file))
+        cache, items = self.__save(['x', 'y'])
+        positions, payload, _ = MenuCache(cache.get_path()).get(
+            'names', items.generation, self.__render(items)
+        )
+
+        self.assertEqual(list(positions), [0, 1])
+        self.assertEqual(payload, b'x\ny\n')
+
+    def test_ignores_search_index_of_replaced_cache(self):
+        cache, items = self.__save(['alpha', 'beta', 'gamma'])
+        SearchIndex(cache.get_path()).open(items, items.generation)
+        items.close()
+
+        os.unlink(os.path.join(cache.get_path(), Cache._items_file))
+        cache, items = self.__save(['delta', 'epsilon'])
+        index = SearchIndex(cache.get_path())
+        index.open(items, items.generation)
+
+        self.assertEqual(index.search(items, 'gamma'), [])
+        self.assertEqual(index.search(items, 'eps'), [1])
+
+    def test_ignores_folders_of_replaced_cache(self):
+        cache, items = self.__save(['a'])
+        cache.save_folders([{'id': 'f', 'name': 'Folder'}])
+        items.close()
+
+        os.unlink(os.path.join(cache.get_path(), Cache._items_file))
+        cache, _ = self.__save(['b'])
+
+        self.assertIsNone(cache.get_folders())
+
+    def test_generation_changes_on_save(self):
+        cache, items = self.__save(['a'])
+        cache.save([make_item('a', 'a')])
+
+        self.assertNotEqual(cache.get().generation, items.generation)
@@ -0,0 +1,114 @@
+import os
+import time
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro.controller import refresh
+from bitwarden_pyro.controller.refresh import Refresher
+from bitwarden_pyro.controller.vault import Vault
+from bitwarden_pyro.model.account import Account
+
+from tests.helpers import HomeTestCase, make_item
+from tests.test_vault import FakeTransport
+
+
+class FakeProcess:
+    """Helper process running until it is told to exit"""
+
+    pid = 123456789
+
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+
+class RefreshLockTest(HomeTestCase):
+
+    def test_lock_is_exclusive(self):
+        fd = Refresher.lock()
+        self.assertIsNotNone(fd)
+
+        try:
+            self.assertIsNone(Refresher.lock())
+        finally:
+            os.close(fd)
+
+        fd = Refresher.lock()
+        self.assertIsNotNone(fd)
+        os.close(fd)
+
+
+class StaleWhileRevalidateTest(HomeTestCase):
+
+    DAY = 86_400
+
+    def setUp(self):
+        super().setUp()
+        self.items = [make_item('a', 'alpha', username='me'),
+                      make_item('b', 'beta', username='me')]
+
+        vault = Vault(1, FakeTransport(self.items), max_staleness=3)
+        vault.load_items()
+        vault.close()
+
+    def __launch(self, age):
+        """Load items the way a launch does, age days after they were
+        cached"""
+
+        transport = FakeTransport(self.items)
+        with mock.patch('time.time', return_value=time.time() + age):
+            vault = Vault(1, transport, max_staleness=3)
+            self.addCleanup(vault.close)
+            vault.load_items()
+
+        return vault, transport
+
+    def test_serves_expired_items(self):
+        vault, transport = self.__launch(2 * self.DAY)
+
+        self.assertEqual(transport.requests, [])
+        self.assertEqual(vault.get_stale_accounts(), [None])
+        self.assertEqual([item.name for item in vault.get_items()],
+                         ['alpha', 'beta'])
+
+    def test_fetches_items_beyond_max_staleness(self):
+        vault, transport = self.__launch(4 * self.DAY)
+
+        self.assertEqual(transport.requests, ['list_items'])
+        self.assertEqual(vault.get_stale_accounts(), [])
+
+    def test_starts_one_refresh(self):
+        vault, _ = self.__launch(2 * self.DAY)
+        process = FakeProcess()
+        refresher = Refresher(1)
+        keys = [(Account(), 'session-key')
+                for _ in vault.get_stale_accounts()]
+
+        with mock.patch.object(refresh, 'spawn_helper',
+                               return_value=process) as spawn:
+            refresher.start(keys)
+            refresher.start(keys)
+
+        spawn.assert_called_once()
+        module, request, _ = spawn.call_args[0]
+        self.assertEqual(module, Refresher._module)
+        self.assertEqual(request['accounts'], [[None, None, 'session-key']])
+        self.assertTrue(request['sync'])
+
+        self.assertFalse(refresher.has_finished())
+        process.returncode = 0
+        self.assertTrue(refresher.has_finished())
+
+    def test_refresh_clears_stale_accounts(self):
+        vault, transport = self.__launch(2 * self.DAY)
+        vault.refresh()
+
+        self.assertEqual(transport.requests, ['sync', 'list_items'])
+        self.assertEqual(vault.get_stale_accounts(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro.model.actions import ItemActions, WindowActions
+from bitwarden_pyro.view.rofi import Rofi
+
+
+# Stands in for rofi, keeping its arguments and input, and selecting the
+# first entry. With ROFI_EARLY, it exits after reading a single entry.
+FAKE_ROFI = '''#!/bin/sh
+printf '%s\\n' "$@" > "$ROFI_DIR/args"
+if [ -n "$ROFI_EARLY" ]; then
+    IFS= read -r line
+    echo "$line"
+else
+    cat > "$ROFI_DIR/input"
+    head -n 1 "$ROFI_DIR/input"
+fi
+exit "${ROFI_CODE:-0}"
+'''
+
+
+class RofiTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+
+        path = os.path.join(self.dir, 'rofi')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(FAKE_ROFI)
+        os.chmod(path, stat.S_IRWXU)
+
+        self.env = {
+            'PATH': f"{self.dir}:{os.environ.get('PATH', '')}",
+            'ROFI_DIR': self.dir,
+        }
+        self.rofi = Rofi([], ItemActions.COPY, True)
+
+    def __show(self, items, **env):
+        with mock.patch.dict(os.environ, dict(self.env, **env)):
+            return self.rofi.show_items(items)
+
+    def __read(self, name):
+        with open(os.path.join(self.dir, name), 'rb') as file:
+            return file.read()
+
+    def test_large_menu_is_streamed(self):
+        # Larger than a single argument can be
+        payload = b''.join(b'entry %d\n' % i for i in range(30000))
+        self.assertGreater(len(payload), 128 * 1024)
+
+        self.assertEqual(self.__show(payload),
+                         ('entry 0', ItemActions.COPY))
+        self.assertEqual(self.__read('input'), payload)
+        self.assertIn(b'-async-pre-read\n', self.__read('args'))
+
+    def test_entries_are_encoded(self):
+        self.__show(iter(['first', 'sécond']))
+        self.assertEqual(self.__read('input'),
+                         'first\nsécond\n'.encode('utf-8'))
+
+        self.__show([b'row 1\n', b'row 2\n'])
+        self.assertEqual(self.__read('input'), b'row 1\nrow 2\n')
+
+        self.__show('first\nsecond')
+        self.assertEqual(self.__read('input'), b'first\nsecond\n')
+
+    def test_rofi_closing_input_early(self):
+        entries = (f'entry {i}' for i in range(100000))
+
+        self.assertEqual(self.__show(entries, ROFI_EARLY='1'),
+                         ('entry 0', ItemActions.COPY))
+
+    def test_exit_codes(self):
+        self.rofi.add_keybind('Alt+s', WindowActions.SYNC, 'Sync', True)
+
+        self.assertEqual(self.__show(['item'], ROFI_CODE='1'), (None, None))
+        self.assertEqual(self.__show(['item'], ROFI_CODE='10'),
+                         ('item', WindowActions.SYNC))
+        self.assertFalse(self.rofi.entered)
+
+    def test_chunks_are_bounded(self):
+        chunks = list(Rofi._Rofi__chunks(
+            'x' * 10 for _ in range(Rofi.CHUNK_SIZE)
+        ))
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks[:-1]:
+            self.assertLess(len(chunk), Rofi.CHUNK_SIZE + 11)
+        self.assertEqual(sum(len(c) for c in chunks),
+                         Rofi.CHUNK_SIZE * 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
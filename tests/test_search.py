@@ -0,0 +1,117 @@
+import os
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro.controller.cache import Cache
+from bitwarden_pyro.controller.search import SearchIndex
+
+from tests.helpers import HomeTestCase, make_item
+
+
+ITEMS = [
+    make_item('id-0', 'GitHub', username='octocat',
+              uris=['https://github.com/login']),
+    make_item('id-1', 'GitLab', username='tanuki',
+              uris=['https://gitlab.com']),
+    make_item('id-2', 'Bank', username='me@example.com'),
+    make_item('id-3', 'abc bcd'),
+    make_item('id-4', 'Example Shop', uris=['http://shop.example.com']),
+]
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.open(ITEMS, ITEMS)
+
+    def test_matches_every_word(self):
+        self.assertEqual(self.index.search(ITEMS, 'git'), [0, 1])
+        self.assertEqual(self.index.search(ITEMS, 'git lab'), [1])
+        self.assertEqual(self.index.search(ITEMS, 'github missing'), [])
+
+    def test_ignores_case(self):
+        self.assertEqual(self.index.search(ITEMS, 'GITHUB'), [0])
+        self.assertEqual(self.index.search(ITEMS, 'shop EXAMPLE'), [4])
+
+    def test_searches_usernames_and_uris(self):
+        self.assertEqual(self.index.search(ITEMS, 'tanuki'), [1])
+        self.assertEqual(self.index.search(ITEMS, 'example.com'), [2, 4])
+        self.assertEqual(self.index.search(ITEMS, 'github.com/login'), [0])
+
+    def test_leaves_out_schemes(self):
+        self.assertEqual(self.index.search(ITEMS, 'https'), [])
+        self.assertEqual(self.index.search(ITEMS, 'http'), [])
+
+    def test_verifies_candidates(self):
+        # Both trigrams of the word are in the name, but not the word
+        self.assertEqual(self.index.search(ITEMS, 'abcd'), [])
+        self.assertEqual(self.index.search(ITEMS, 'bcd'), [3])
+
+    def test_scans_short_queries(self):
+        self.assertEqual(self.index.search(ITEMS, 'gi'), [0, 1])
+        self.assertEqual(self.index.search(ITEMS, 'gi la'), [1])
+        self.assertEqual(self.index.search(ITEMS, 'ba'), [2])
+
+    def test_mixes_short_and_long_words(self):
+        self.assertEqual(self.index.search(ITEMS, 'git hu'), [0])
+
+    def test_finds_ids(self):
+        self.assertEqual(self.index.find_id('id-3', ITEMS), 3)
+        self.assertEqual(self.index.find_id('id-0', ITEMS), 0)
+        self.assertIsNone(self.index.find_id('missing', ITEMS))
+
+    def test_rebuilds_for_other_items(self):
+        items = [make_item('id-9', 'Mail')]
+        self.index.open(items, items)
+
+        self.assertEqual(self.index.search(items, 'mail'), [0])
+        self.assertEqual(self.index.search(items, 'git'), [])
+
+
+class CachedSearchIndexTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = Cache(30)
+        self.cache.save(ITEMS)
+        self.items = self.cache.get()
+        self.addCleanup(self.items.close)
+
+    def test_searches_cached_items(self):
+        index = SearchIndex(self.cache.get_path())
+        index.open(self.items, self.items.generation)
+
+        self.assertEqual(index.search(self.items, 'git lab'), [1])
+        self.assertEqual(index.search(self.items, 'gi'), [0, 1])
+        self.assertEqual(index.find_id('id-4', self.items), 4)
+
+    def test_reads_index_from_disk(self):
+        SearchIndex(self.cache.get_path()).open(
+            self.items, self.items.generation
+        )
+        self.assertTrue(os.path.exists(
+            os.path.join(self.cache.get_path(), SearchIndex._search_file)
+        ))
+
+        index = SearchIndex(self.cache.get_path())
+        with mock.patch.object(SearchIndex, 'build',
+                               side_effect=AssertionError) as build:
+            index.open(self.items, self.items.generation)
+
+        build.assert_not_called()
+        self.assertEqual(index.search(self.items, 'shop'), [4])
+
+    def test_rebuilds_index_of_other_generation(self):
+        SearchIndex(self.cache.get_path()).open(
+            self.items, self.items.generation
+        )
+
+        index = SearchIndex(self.cache.get_path())
+        with mock.patch.object(SearchIndex, 'build',
+                               wraps=SearchIndex.build) as build:
+            index.open(self.items, self.items.generation + 1)
+
+        build.assert_called_once()
+        self.assertEqual(index.search(self.items, 'bank'), [2])
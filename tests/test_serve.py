@@ -0,0 +1,245 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+import socketserver
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from bitwarden_pyro.controller import serve
+from bitwarden_pyro.controller.serve import ServeTransport
+from bitwarden_pyro.controller.transport import TransportException
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Reply to requests like bw serve, from the data of the server"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.__reply(self.server.routes.get(('GET', self.path)))
+
+    def do_POST(self):
+        self.__reply(self.server.routes.get(('POST', self.path)))
+
+    def __reply(self, data):
+        self.server.requests.append(self.path)
+        if data is None:
+            payload = {'success': False, 'message': 'Not found'}
+        else:
+            payload = {'success': True, 'data': data}
+
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+class _UnixStubServer(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+    """Stub of bw serve listening on a Unix socket"""
+
+    daemon_threads = True
+
+    def __init__(self, path, routes):
+        self.connections = 0
+        self.requests = []
+        self.routes = routes
+        super().__init__(path, _StubHandler)
+
+
+ROUTES = {
+    ('GET', '/status'): {'object': 'status'},
+    ('GET', '/list/object/items'): {
+        'object': 'list', 'data': [{'id': 'a'}, {'id': 'b'}]
+    },
+    ('GET', '/object/item/a'): {'id': 'a', 'login': {}},
+    ('POST', '/sync'): {'object': 'message'},
+}
+
+
+class _FakeFallback:
+    """Subprocess transport recording the calls falling back to it"""
+
+    def __init__(self):
+        self.calls = []
+        self.key = None
+
+    def set_key(self, key):
+        self.key = key
+
+    def list_items(self):
+        self.calls.append('list_items')
+        return [{'id': 'fallback'}]
+
+    def get_item(self, item_id):
+        self.calls.append('get_item')
+        return {'id': item_id, 'fallback': True}
+
+
+class ServeTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.requests = []
+        self.server.routes = ROUTES
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.fallback = _FakeFallback()
+        host, port = self.server.server_address
+        self.transport = ServeTransport(f'{host}:{port}', autostart=False,
+                                        fallback=self.fallback)
+        self.transport.set_key('key')
+        self.addCleanup(self.transport.close)
+
+    def test_parse_address(self):
+        self.assertEqual(ServeTransport.parse_address('localhost:8087'),
+                         ('localhost', 8087, None))
+        self.assertEqual(ServeTransport.parse_address('unix:/tmp/bw.sock'),
+                         (None, None, '/tmp/bw.sock'))
+        with self.assertRaises(TransportException):
+            ServeTransport.parse_address('localhost')
+
+    def test_requests_use_server(self):
+        self.assertEqual(self.transport.list_items(),
+                         [{'id': 'a'}, {'id': 'b'}])
+        self.assertEqual(self.transport.get_item('a'),
+                         {'id': 'a', 'login': {}})
+        self.transport.sync()
+
+        self.assertEqual(self.fallback.calls, [])
+        self.assertEqual(self.server.requests, [
+            '/status', '/list/object/items', '/object/item/a', '/sync'
+        ])
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            self.transport.get_item('a')
+
+        self.assertEqual(self.server.connections, 1)
+
+    def test_failed_request_falls_back(self):
+        self.assertEqual(self.transport.get_item('missing'),
+                         {'id': 'missing', 'fallback': True})
+        self.assertEqual(self.fallback.calls, ['get_item'])
+
+    def test_unavailable_server_falls_back(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.transport.close()
+
+        with mock.patch.object(serve.sp, 'Popen') as popen:
+            self.assertEqual(self.transport.list_items(),
+                             [{'id': 'fallback'}])
+            self.assertEqual(self.transport.get_item('a'),
+                             {'id': 'a', 'fallback': True})
+
+        # Without autostart, no server is ever started
+        popen.assert_not_called()
+        self.assertEqual(self.fallback.calls, ['list_items', 'get_item'])
+
+    def test_key_is_passed_to_fallback(self):
+        self.transport.set_key('other')
+
+        self.assertEqual(self.fallback.key, 'other')
+
+
+
+class UnixServeTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.dir = os.path.join(self._tmp.name, 'run')
+        os.mkdir(self.dir, 0o700)
+        self.path = os.path.join(self.dir, 'bw.sock')
+        self.server = None
+        self.fallback = _FakeFallback()
+
+    def __serve(self):
+        self.server = _UnixStubServer(self.path, ROUTES)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def __transport(self, autostart=False):
+        transport = ServeTransport(f'unix:{self.path}', autostart=autostart,
+                                   fallback=self.fallback)
+        transport.set_key('key')
+        self.addCleanup(transport.close)
+        return transport
+
+    def test_default_address_is_private_socket(self):
+        with mock.patch.dict(os.environ, XDG_RUNTIME_DIR=self.dir):
+            self.assertEqual(ServeTransport.parse_address(''),
+                             (None, None, os.path.join(self.dir,
+                                                       'bwpyro-bw.sock')))
+
+    def test_requests_use_server(self):
+        self.__serve()
+
+        self.assertEqual(self.__transport().get_item('a'),
+                         {'id': 'a', 'login': {}})
+        self.assertEqual(self.fallback.calls, [])
+
+    def test_shared_directory_is_not_used(self):
+        self.__serve()
+        os.chmod(self.dir, 0o755)
+
+        self.assertEqual(self.__transport().get_item('a'),
+                         {'id': 'a', 'fallback': True})
+        self.assertEqual(self.server.requests, [])
+
+    def test_server_of_other_user_is_not_used(self):
+        self.__serve()
+
+        with mock.patch.object(serve, 'peer_uid',
+                               return_value=os.getuid() + 1):
+            self.assertEqual(self.__transport().get_item('a'),
+                             {'id': 'a', 'fallback': True})
+        self.assertEqual(self.server.requests, [])
+
+    def test_started_server_socket_is_private(self):
+        # A socket left behind by a previous server
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+        umasks = []
+
+        def popen(cmd, **_):
+            umask = os.umask(0)
+            os.umask(umask)
+            umasks.append(umask)
+            self.__serve()
+            return mock.Mock(**{'poll.return_value': None})
+
+        with mock.patch.object(serve.sp, 'Popen', side_effect=popen):
+            transport = self.__transport(autostart=True)
+            self.assertEqual(transport.get_item('a'),
+                             {'id': 'a', 'login': {}})
+
+        self.assertEqual(umasks, [0o177])
+        self.assertEqual(self.fallback.calls, [])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
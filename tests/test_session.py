@@ -0,0 +1,91 @@
+import uuid
+import unittest
+
+from unittest import mock
+
+from bitwarden_pyro.controller.keyring import KernelKeyring, KeyctlKeyring
+from bitwarden_pyro.controller.session import Session, KeyReadException
+from bitwarden_pyro.controller.totp import TotpStore
+from bitwarden_pyro.model.account import Account
+from bitwarden_pyro.util.trace import Tracer
+
+
+@unittest.skipUnless(KernelKeyring.probe() is not None,
+                     "Key management syscalls are not available")
+class SessionTest(unittest.TestCase):
+
+    def setUp(self):
+        # Named accounts keep their keys apart from the default session
+        account = Account(f'test-{uuid.uuid4().hex}')
+        self.session = Session(60, 'kernel', account)
+        self.keyring = self.session.get_keyring()
+        self.name = f'{Session.KEY_NAME}_{account.name}'
+        self.addCleanup(self.keyring.purge, self.name)
+
+    def test_get_key_from_keyring(self):
+        self.assertFalse(self.session.has_key())
+
+        self.keyring.add(self.name, 'session key')
+        self.assertTrue(self.session.has_key())
+        self.assertEqual(self.session.get_key(), 'session key')
+
+    def test_key_in_memory_refreshes_timeout(self):
+        self.keyring.add(self.name, 'session key')
+        self.session.get_key()
+
+        with mock.patch.object(self.keyring, 'set_timeout') as set_timeout, \
+                mock.patch.object(self.keyring, 'read') as read:
+            self.assertEqual(self.session.get_key(), 'session key')
+
+        set_timeout.assert_called_once_with(mock.ANY, 60)
+        read.assert_not_called()
+
+    def test_key_in_memory_expires_with_keyring(self):
+        self.keyring.add(self.name, 'session key')
+        self.session.get_key()
+
+        self.keyring.purge(self.name)
+        self.assertFalse(self.session.has_key())
+        with self.assertRaises(KeyReadException):
+            self.session.get_key()
+        self.assertIsNone(self.session.key)
+
+
+class SessionKeyringTest(unittest.TestCase):
+
+    def test_kernel_keyring_created_once(self):
+        # The probing syscall succeeds, whether or not it is available
+        with mock.patch.object(KernelKeyring, '__init__', autospec=True,
+                               return_value=None) as init, \
+                mock.patch.object(KernelKeyring, '_KernelKeyring__call'), \
+                mock.patch.object(KernelKeyring, '_keyctl', create=True):
+            session = Session(60, 'auto')
+
+        init.assert_called_once()
+        self.assertIsInstance(session.get_keyring(), KernelKeyring)
+
+    def test_falls_back_to_keyctl(self):
+        with mock.patch.object(KernelKeyring, 'probe', return_value=None), \
+                mock.patch.object(Session, '_Session__has_executable'):
+            session = Session(60, 'auto')
+
+        self.assertIsInstance(session.get_keyring(), KeyctlKeyring)
+
+
+class SessionLockTest(unittest.TestCase):
+
+    def test_lock_purges_secrets_of_account(self):
+        keyring = mock.Mock()
+        with mock.patch.object(Session, '_Session__init_keyring',
+                               return_value=keyring), \
+                mock.patch.object(Tracer, 'run'):
+            Session(60, 'auto', Account('work')).lock()
+
+        self.assertEqual(
+            [c.args[0] for c in keyring.purge.call_args_list],
+            [f'{Session.KEY_NAME}_work', TotpStore.key_name('work')]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
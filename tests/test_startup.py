@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import unittest
+import subprocess as sp
+
+from bitwarden_pyro.util.startup import ImportCost, format_report, \
+    parse_importtime
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only some startup paths need
+HEAVY_MODULES = (
+    'yaml', 'http.client', 'bitwarden_pyro.util.config',
+    'bitwarden_pyro.controller.vault', 'bitwarden_pyro.controller.serve',
+    'bitwarden_pyro.controller.daemon',
+)
+
+
+def imported_modules(script):
+    """Return the modules imported by a script run in a new interpreter"""
+
+    script += '\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))'
+    proc = sp.run([sys.executable, '-c', script], cwd=ROOT, check=True,
+                  stdout=sp.PIPE, stderr=sp.DEVNULL)
+    return set(json.loads(proc.stdout.decode('utf-8').splitlines()[-1]))
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_modules_do_not_import_controllers(self):
+        modules = imported_modules(
+            'import bitwarden_pyro.client, bitwarden_pyro.bwpyro\n'
+            'from bitwarden_pyro.util.arguments import parse_arguments\n'
+            'parse_arguments([])'
+        )
+
+        self.assertIn('bitwarden_pyro.bwpyro', modules)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_version_skips_bwpyro(self):
+        modules = imported_modules(
+            'import sys\n'
+            'from bitwarden_pyro import client\n'
+            'sys.argv = ["bwpyro", "--version"]\n'
+            'try:\n'
+            '    client.run()\n'
+            'except SystemExit:\n'
+            '    pass'
+        )
+
+        self.assertNotIn('bitwarden_pyro.bwpyro', modules)
+
+
+class StartupReportTest(unittest.TestCase):
+
+    LINES = [
+        'import time: self [us] | cumulative | imported package',
+        'import time:       120 |        120 |   _io',
+        'import time:       800 |       2300 | bitwarden_pyro.bwpyro',
+        'import time:      1500 |       1500 |   yaml',
+        'Error: something went wrong',
+    ]
+
+    def test_parse_importtime(self):
+        costs, others = parse_importtime(self.LINES)
+
+        self.assertEqual(costs, [
+            ImportCost('_io', 120, 120),
+            ImportCost('bitwarden_pyro.bwpyro', 800, 2300),
+            ImportCost('yaml', 1500, 1500),
+        ])
+        self.assertEqual(others, ['Error: something went wrong'])
+
+    def test_report_sorted_by_self_time(self):
+        costs, _ = parse_importtime(self.LINES)
+        lines = format_report(['--lock'], costs, limit=2).splitlines()
+
+        self.assertEqual(lines[0], 'Startup imports for: bwpyro --lock')
+        self.assertEqual([line.split()[-1] for line in lines[2:4]],
+                         ['yaml', 'bitwarden_pyro.bwpyro'])
+        self.assertIn('1 more modules', lines[4])
+        self.assertEqual(lines[-1], 'Total: 2.42 ms across 3 modules')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+
+from types import SimpleNamespace
+
+from bitwarden_pyro.controller.keyring import KeyringException
+from bitwarden_pyro.controller.totp import Totp, TotpStore, TotpException
+
+
+# Secrets and codes of the test vectors in appendix B of RFC 6238
+SECRETS = {
+    'SHA1': b'12345678901234567890',
+    'SHA256': b'12345678901234567890123456789012',
+    'SHA512': b'1234567890' * 6 + b'1234',
+}
+VECTORS = [
+    (59, '94287082', '46119246', '90693936'),
+    (1111111109, '07081804', '68084774', '25091201'),
+    (1111111111, '14050471', '67062674', '99943326'),
+    (1234567890, '89005924', '91819424', '93441116'),
+    (2000000000, '69279037', '90698825', '38618901'),
+    (20000000000, '65353130', '77737706', '47863826'),
+]
+# Base32 encoding of the SHA1 secret
+BASE32 = 'GEZDGNBVGY3TQOJQGEZDGNBVGY3TQOJQ'
+
+
+class TotpTest(unittest.TestCase):
+
+    def test_rfc_vectors(self):
+        for now, *codes in VECTORS:
+            for algorithm, code in zip(('SHA1', 'SHA256', 'SHA512'), codes):
+                with self.subTest(now=now, algorithm=algorithm):
+                    totp = Totp(SECRETS[algorithm], digits=8,
+                                algorithm=algorithm)
+                    self.assertEqual(totp.code(now), code)
+
+    def test_parses_base32_key(self):
+        totp = Totp.parse(BASE32.lower())
+
+        self.assertEqual(totp.code(59), '287082')
+        self.assertEqual((totp.digits, totp.period, totp.algorithm),
+                         (6, 30, 'SHA1'))
+
+    def test_ignores_spaces_and_padding(self):
+        spaced = ' '.join(BASE32[i:i + 4] for i in range(0, len(BASE32), 4))
+
+        self.assertEqual(Totp.decode(spaced), SECRETS['SHA1'])
+        self.assertEqual(Totp.decode('MZXW6==='), b'foo')
+
+    def test_parses_otpauth_uri(self):
+        totp = Totp.parse(
+            f'otpauth://totp/Example:alice?secret={BASE32}'
+            '&algorithm=sha1&digits=8&period=60&issuer=Example'
+        )
+
+        self.assertEqual((totp.digits, totp.period), (8, 60))
+        # The period of 60 seconds halves the counter of the vectors
+        self.assertEqual(totp.code(118), '94287082')
+
+    def test_parses_steam_uri(self):
+        totp = Totp.parse(f'steam://{BASE32}')
+        code = totp.code(59)
+
+        self.assertTrue(totp.steam)
+        self.assertEqual(len(code), Totp.STEAM_DIGITS)
+        self.assertTrue(set(code) <= set(Totp.STEAM_ALPHABET))
+        self.assertEqual(Totp.parse(
+            f'otpauth://totp/Steam:alice?secret={BASE32}&encoder=steam'
+        ).code(59), code)
+
+    def test_remaining(self):
+        totp = Totp(SECRETS['SHA1'])
+
+        self.assertEqual(totp.remaining(59), 1)
+        self.assertEqual(totp.remaining(60), 30)
+
+    def test_rejects_invalid_secrets(self):
+        for value in ('not base32!', 'otpauth://hotp/x?secret=' + BASE32,
+                      'otpauth://totp/x?digits=6',
+                      f'otpauth://totp/x?secret={BASE32}&digits=six',
+                      f'otpauth://totp/x?secret={BASE32}&algorithm=MD5'):
+            with self.subTest(value=value):
+                with self.assertRaises(TotpException):
+                    Totp.parse(value)
+
+
+class FakeKeyring:
+    """Keyring keeping keys in a dictionary"""
+
+    def __init__(self):
+        self.keys = {}
+        self.timeouts = {}
+        self.fail = False
+
+    def request(self, name):
+        if self.fail:
+            raise KeyringException("Keyring is unavailable")
+        return name if name in self.keys else None
+
+    def read(self, key_id):
+        return self.keys[key_id]
+
+    def add(self, name, value):
+        if self.fail:
+            raise KeyringException("Keyring is unavailable")
+        self.keys[name] = value
+        return name
+
+    def set_timeout(self, key_id, timeout):
+        self.timeouts[key_id] = timeout
+
+
+class TotpStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.keyring = FakeKeyring()
+        self.store = TotpStore(self.keyring, 60)
+
+    def test_stores_secrets(self):
+        self.store.put('a', 'secret-a')
+        self.store.put('b', 'secret-b')
+
+        self.assertEqual(self.store.get('a'), 'secret-a')
+        self.assertEqual(self.store.get('b'), 'secret-b')
+        self.assertIsNone(self.store.get('c'))
+        self.assertEqual(self.keyring.timeouts[TotpStore.KEY_NAME], 60)
+
+    def test_keeps_most_recent_secrets(self):
+        for index in range(TotpStore.MAX_SECRETS + 1):
+            self.store.put(str(index), f'secret-{index}')
+        # Storing a secret again makes it the most recent one
+        self.store.put('1', 'secret-1')
+        self.store.put('new', 'secret-new')
+
+        self.assertIsNone(self.store.get('0'))
+        self.assertIsNone(self.store.get('2'))
+        self.assertEqual(self.store.get('1'), 'secret-1')
+        self.assertEqual(self.store.get('new'), 'secret-new')
+
+    def test_disabled_without_timeout(self):
+        store = TotpStore(self.keyring, 0)
+        store.put('a', 'secret-a')
+
+        self.assertEqual(self.keyring.keys, {})
+        self.assertIsNone(store.get('a'))
+
+    def test_ignores_keyring_errors(self):
+        self.store.put('a', 'secret-a')
+        self.keyring.fail = True
+
+        self.assertIsNone(self.store.get('a'))
+        self.store.put('b', 'secret-b')
+
+    def test_accounts_use_own_keys(self):
+        TotpStore(self.keyring, 60, 'work').put('a', 'secret-work')
+        self.store.put('a', 'secret-default')
+
+        self.assertEqual(sorted(self.keyring.keys),
+                         [TotpStore.KEY_NAME, TotpStore.key_name('work')])
+        self.assertEqual(TotpStore(self.keyring, 60, 'work').get('a'),
+                         'secret-work')
+        self.assertIsNone(TotpStore(self.keyring, 60, 'home').get('a'))
+
+    def test_never_outlives_session_key(self):
+        session = SimpleNamespace(auto_lock=30, account=None,
+                                  get_keyring=lambda: self.keyring)
+        TotpStore.for_session(session, 60).put('a', 'secret-a')
+        self.assertEqual(self.keyring.timeouts[TotpStore.KEY_NAME], 30)
+
+        session.auto_lock = -1
+        TotpStore.for_session(session, 60).put('a', 'secret-a')
+        self.assertEqual(self.keyring.timeouts[TotpStore.KEY_NAME], 60)
@@ -0,0 +1,310 @@
+import time
+import threading
+
+from unittest import mock
+
+from bitwarden_pyro.controller import vault
+from bitwarden_pyro.controller.cache import Cache
+from bitwarden_pyro.controller.totp import Totp, TotpStore
+from bitwarden_pyro.controller.vault import MergedItems, Vault
+from bitwarden_pyro.model.account import Account
+from bitwarden_pyro.model.item import ItemRecord
+from bitwarden_pyro.model.actions import ItemActions, WindowActions
+from bitwarden_pyro.util.formatter import ItemFormatter, create_converter
+
+from tests.helpers import HomeTestCase, make_item
+from tests.test_totp import FakeKeyring
+
+
+class FakeTransport:
+    """Transport returning a fixed list of items instead of running bw"""
+
+    def __init__(self, items, folders=()):
+        self.items = items
+        self.folders = list(folders)
+        self.requests = []
+
+    def set_key(self, key):
+        pass
+
+    def list_items(self):
+        self.requests.append('list_items')
+        return self.items
+
+    def list_folders(self):
+        return self.folders
+
+    def get_item(self, item_id):
+        self.requests.append(item_id)
+        return next(item for item in self.items if item['id'] == item_id)
+
+    def sync(self):
+        self.requests.append('sync')
+
+    def close(self):
+        pass
+
+
+class VaultMenuTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.transport = FakeTransport([
+            make_item('a', 'alpha', username='me'),
+            make_item('b', 'beta', username='me'),
+            make_item('c', 'gamma', username='me'),
+            make_item('d', 'delta', username='me'),
+        ])
+        self.vault = Vault(1, self.transport)
+        self.addCleanup(self.vault.close)
+        self.vault.load_items()
+
+    def __logins(self, top=0):
+        converter = create_converter(['name'])
+        positions, payload, top = self.vault.get_menu(
+            WindowActions.LOGINS,
+            lambda items: ItemFormatter.group_format(items, converter), top
+        )
+        # Ranked menus are made of the rows of the rendered menu
+        if not isinstance(payload, bytes):
+            payload = b''.join(payload)
+        return positions, payload.decode('utf-8'), top
+
+    def test_menu_without_usage(self):
+        positions, text, top = self.__logins(2)
+
+        self.assertEqual(list(positions), [0, 1, 2, 3])
+        self.assertEqual(text.splitlines(), [
+            '#1: alpha', '#2: beta', '#3: gamma', '#4: delta'
+        ])
+        self.assertEqual(top, [0, 1])
+
+    def test_top_rows_follow_ranking(self):
+        self.vault.record_usage(self.vault.get_at(2), ItemActions.COPY)
+        self.vault.record_usage(self.vault.get_at(3), ItemActions.COPY)
+        self.vault.record_usage(self.vault.get_at(3), ItemActions.COPY)
+
+        _, text, top = self.__logins(3)
+
+        self.assertEqual(text.splitlines(), [
+            '#4: delta', '#3: gamma', '#1: alpha', '#2: beta'
+        ])
+        self.assertEqual(top, [3, 2, 0])
+
+    def test_no_top_rows(self):
+        self.assertEqual(self.__logins()[2], [])
+
+    def test_prefetch(self):
+        _, _, top = self.__logins(2)
+        self.vault.prefetch([self.vault.get_at(p) for p in top])
+
+        item = self.vault.get_item_full(self.vault.get_at(1))
+        self.assertEqual(item['login']['password'], 'beta-password')
+        self.vault.discard_prefetched()
+        self.assertEqual(sorted(self.transport.requests[1:]), ['a', 'b'])
+
+    def test_close_cancels_pending_prefetches(self):
+        release = threading.Event()
+        get_item = self.transport.get_item
+        self.transport.get_item = lambda item_id: (release.wait(5),
+                                                   get_item(item_id))[1]
+
+        self.vault.prefetch([self.vault.get_at(p) for p in range(4)])
+        self.vault.close()
+        release.set()
+        time.sleep(0.1)
+
+        # Only the fetches already running when closing have completed
+        fetched = self.transport.requests[1:]
+        self.assertLessEqual(len(fetched), Vault.PREFETCH_WORKERS)
+
+
+class VaultMatchTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.vault = Vault(1, FakeTransport([
+            make_item('e', 'Element', username='me',
+                      uris=['https://app.element.io']),
+        ]))
+        self.addCleanup(self.vault.close)
+        self.vault.load_items()
+
+    def test_url_match_is_exact(self):
+        items, exact = self.vault.match_window('Room - app.element.io',
+                                               'firefox')
+
+        self.assertEqual([item['id'] for item in items], ['e'])
+        self.assertTrue(exact)
+
+    def test_class_match_is_not_exact(self):
+        items, exact = self.vault.match_window('Room - Element', 'element')
+
+        self.assertEqual([item['id'] for item in items], ['e'])
+        self.assertFalse(exact)
+
+    def test_no_match(self):
+        self.assertEqual(self.vault.match_window('Inbox', 'thunderbird'),
+                         ([], False))
+
+
+class VaultFoldersTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.items = [make_item('a', 'alpha', folder_id='f', username='me')]
+        self.folders = [{'object': 'folder', 'id': 'f', 'name': 'Mail'}]
+
+    def __vault(self):
+        transport = FakeTransport(self.items, self.folders)
+        vault = Vault(1, transport)
+        self.addCleanup(vault.close)
+        return vault, transport
+
+    def test_folders_are_fetched_with_items(self):
+        vault, transport = self.__vault()
+        vault.load_items()
+
+        with mock.patch.object(transport, 'list_folders') as list_folders:
+            folders = vault.get_folders()
+
+        list_folders.assert_not_called()
+        self.assertEqual([f['name'] for f in folders], ['Mail'])
+
+    def test_folders_are_read_from_cache(self):
+        self.__vault()[0].load_items()
+
+        vault, transport = self.__vault()
+        vault.load_items()
+        with mock.patch.object(transport, 'list_folders') as list_folders:
+            folders = vault.get_folders()
+
+        list_folders.assert_not_called()
+        self.assertEqual(folders, [{'id': 'f', 'name': 'Mail'}])
+
+
+class MergedItemsTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.work = Cache(30, 'work')
+        self.work.save([
+            make_item('w1', 'Work mail', username='me', uris=['mail.work']),
+            make_item('w2', 'Work chat', folder_id='f'),
+        ])
+        self.home_cache = Cache(30, 'home')
+        self.home_cache.save([make_item('h1', 'Bank', username='me')])
+        self.shards = [('work', self.work.get()),
+                       ('home', self.home_cache.get())]
+        for _, items in self.shards:
+            self.addCleanup(items.close)
+
+    def test_items_follow_each_other(self):
+        merged = MergedItems(self.shards)
+
+        self.assertEqual(len(merged), 3)
+        self.assertEqual([item['id'] for item in merged], ['w1', 'w2', 'h1'])
+        self.assertEqual(merged[2]['id'], 'h1')
+        self.assertEqual(merged[-3]['id'], 'w1')
+        self.assertEqual([item['id'] for item in merged[1:]], ['w2', 'h1'])
+        with self.assertRaises(IndexError):
+            merged[3]
+
+    def test_items_are_tagged_with_account(self):
+        merged = MergedItems(self.shards)
+
+        self.assertEqual(merged[0].account, 'work')
+        self.assertEqual(merged[2].account, 'home')
+        self.assertEqual([item.account for item in merged],
+                         ['work', 'work', 'home'])
+
+    def test_fields(self):
+        records = [ItemRecord.from_item(make_item('p1', 'Plain'), 'plain')]
+        merged = MergedItems(self.shards + [('plain', records)])
+
+        self.assertEqual(merged.parts(), [items for _, items in self.shards]
+                         + [records])
+        self.assertEqual(list(merged.fields()), [
+            ('w1', 'Work mail', None), ('w2', 'Work chat', 'f'),
+            ('h1', 'Bank', None), ('p1', 'Plain', None),
+        ])
+        self.assertEqual(list(merged.search_fields()), [
+            ('Work mail', 'me', 'mail.work'), ('Work chat', None, None),
+            ('Bank', 'me', None), ('Plain', None, None),
+        ])
+        self.assertEqual(list(merged.search_fields([3, 0])), [
+            ('Plain', None, None), ('Work mail', 'me', 'mail.work'),
+        ])
+
+    def test_generation_combines_caches(self):
+        generation = MergedItems(self.shards).generation
+
+        self.assertEqual(MergedItems(self.shards).generation, generation)
+        self.assertTrue(0 <= generation < 2 ** 64)
+
+        self.home_cache.save([make_item('h1', 'Bank', username='me')])
+        shards = [self.shards[0], ('home', self.home_cache.get())]
+        self.addCleanup(shards[1][1].close)
+        self.assertNotEqual(MergedItems(shards).generation, generation)
+
+    def test_no_generation_without_cache(self):
+        records = [ItemRecord.from_item(make_item('p1', 'Plain'), 'plain')]
+        merged = MergedItems(self.shards + [('plain', records)])
+
+        self.assertFalse(hasattr(merged, 'generation'))
+
+
+class AccountsTotpTest(HomeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # An organisation item listed by both accounts, with its own
+        # secret in every account
+        self.transports = {}
+        for name, secret in (('work', 'JBSWY3DPEHPK3PXP'),
+                             ('home', 'GEZDGNBVGY3TQOJQ')):
+            item = make_item('shared', 'Shared', username=name)
+            item['login']['totp'] = secret
+            self.transports[f'/data/{name}'] = FakeTransport([item])
+
+        def transport(env):
+            return self.transports[env[Account.APPDATA_VARIABLE]]
+
+        with mock.patch.object(vault, 'SubprocessTransport',
+                               side_effect=transport):
+            self.vault = Vault(1, accounts=[
+                Account('work', '/data/work'), Account('home', '/data/home')
+            ])
+        self.addCleanup(self.vault.close)
+        self.vault.load_items()
+
+        self.keyring = FakeKeyring()
+        self.vault.set_totp({
+            name: TotpStore(self.keyring, 60, name)
+            for name in ('work', 'home')
+        })
+
+    def __item(self, account):
+        return next(item for item in self.vault.get_items()
+                    if item.account == account)
+
+    def test_secrets_are_kept_by_account(self):
+        for account, secret in (('work', 'JBSWY3DPEHPK3PXP'),
+                                ('home', 'GEZDGNBVGY3TQOJQ')):
+            with self.subTest(account=account), \
+                    mock.patch('time.time', return_value=1111111109):
+                code = self.vault.get_item_topt(self.__item(account))
+                self.assertEqual(code, Totp.parse(secret).code(1111111109))
+
+        self.assertEqual(sorted(self.keyring.keys), [
+            TotpStore.key_name('home'), TotpStore.key_name('work')
+        ])
+
+    def test_stored_secrets_are_kept_by_account(self):
+        self.vault.get_item_topt(self.__item('work'))
+        self.vault.get_item_topt(self.__item('home'))
+        self.vault.get_item_topt(self.__item('home'))
+
+        # Every account only requested its own item once
+        for transport in self.transports.values():
+            self.assertEqual(transport.requests, ['list_items', 'shared'])